@@ -19,22 +19,25 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import hashlib
-import imp
+import importlib.abc
+import importlib.util
 import os
 import shutil
 import sys
-import zipfile
-from distutils.dir_util import copy_tree
-from urllib.request import urlretrieve
 
-from mklist.generate import generate_parts_lst
 from pkg_resources import get_distribution, DistributionNotFound
 
-from ldraw.config import get_config, write_config
+from ldraw.archive import ARCHIVE_NAME, LibraryArchive, write_parts_lst
+from ldraw.config import LDRAW_URL, get_config, write_config
 from ldraw.dirs import get_data_dir, get_config_dir, get_cache_dir
+from ldraw.fetch import extract, fetch
 from ldraw.generation.colours import gen_colours
-from ldraw.generation.parts import gen_parts
+from ldraw.generation.emitter import ENGINES
+from ldraw.generation.manifest import Manifest
+from ldraw.generation.parts import LAYOUTS, gen_parts
 from ldraw.parts import Parts
+from ldraw.partslst import generate_parts_lst
+from ldraw.updates import archive_level, record_level
 from ldraw.utils import ensure_exists
 
 try:
@@ -43,37 +46,32 @@ except DistributionNotFound:
     # package is not installed
     pass
 
-LDRAW_URL = 'http://www.ldraw.org/library/updates/complete.zip'
 LIBRARY_INIT = """\"\"\" the ldraw.library module, auto-generated \"\"\"
 __all__ = [\'colours\']
 """
 
 
-def load_lib_from(fullname, library_dir):
-    """ load library from a dir """
-    dot_split = fullname.split('.')
-    dot_split.pop(0)
-    lib_name = dot_split[-1]
-    lib_dir = os.path.join(library_dir, *tuple(dot_split[:-1]))
-    info = imp.find_module(lib_name, [lib_dir])
-    library_module = imp.load_module(lib_name, *info)
-    return library_module
-
-
-def load_lib(library_path, fullname):
-    """ try to load from library """
-    return load_lib_from(fullname, library_path)
+def library_spec(fullname, library_dir):
+    """ the module spec of a module of the library generated in a dir """
+    location = os.path.join(library_dir, *fullname.split('.')[1:])
+    if os.path.isdir(location):
+        return importlib.util.spec_from_file_location(
+            fullname, os.path.join(location, '__init__.py'),
+            submodule_search_locations=[location])
+    if os.path.isfile(location + '.py'):
+        return importlib.util.spec_from_file_location(fullname, location + '.py')
+    return None
 
 
 def try_download_generate_lib():
     # Download the library and generate it, if needed
     config = get_config()
-    parts_lst_path = config['parts.lst']
+    parts_lst_path = config.parts_lst
     output_dir = os.path.dirname(parts_lst_path)
     if not os.path.exists(output_dir) and not os.path.exists(parts_lst_path):
         download(output_dir)
     data_dir = get_data_dir()
-    library_path = config.get('library')
+    library_path = config.library
     if library_path is not None:
         generate(parts_lst_path, library_path)
         return library_path
@@ -89,9 +87,14 @@ def try_download_generate_lib():
             return data_dir
 
 
-class CustomImporter:
-    """ Added to sys.meta_path as an import hook """
+class CustomImporter(importlib.abc.MetaPathFinder):
+    """
+    Added to sys.meta_path as an import hook, finds the modules
+    of ldraw.library in the generated library
+    """
     virtual_module = 'ldraw.library'
+    # the generated library, checked once per process
+    library_path = None
 
     @classmethod
     def valid_module(cls, fullname):
@@ -100,68 +103,63 @@ class CustomImporter:
             if not rest or rest.startswith('.'):
                 return True
 
-    def find_module(self, fullname, path=None):  # pylint:disable=unused-argument
+    @classmethod
+    def get_library_path(cls):
         """
-        This method is called by Python if this class
-        is on sys.path. fullname is the fully-qualified
-        name of the module to look for, and path is either
-        __path__ (for submodules and subpackages) or None (for
-        a top-level module/package).
-
-        Called every time an import
-        statement is detected (or __import__ is called), before
-        Python's built-in package/module-finding code kicks in.
+        The path of the generated library: the first time, the library is downloaded
+        and generated if needed, then the path is reused for the next imports
         """
-        if self.valid_module(fullname):
-            # As per PEP #302 (which implemented the sys.meta_path protocol),
-            # if fullname is the name of a module/package that we want to
-            # report as found, then we need to return a loader object.
-            # In this simple example, that will just be self.
-
-            return self
-
-        # If we don't provide the requested module, return None, as per
-        # PEP #302.
+        if cls.library_path is None:
+            # if the library already exists and correctly generated,
+            # the __hash__ will prevent re-generation
+            cls.library_path = try_download_generate_lib()
+        return cls.library_path
 
-        return None
+    def find_spec(self, fullname, path=None, target=None):  # pylint:disable=unused-argument
+        """
+        Called by Python for every import, before its built-in finders:
+        returns the spec of the ldraw.library modules, None for the other modules
+        """
+        if not self.valid_module(fullname):
+            return None
+        return library_spec(fullname, self.get_library_path())
 
     @classmethod
     def clean(cls):
+        """ forgets the imported ldraw.library modules and the library path """
         for fullname in list(sys.modules.keys()):
             if cls.valid_module(fullname):
                 del sys.modules[fullname]
-
-    def get_code(self, fullname):
-        return None
-
-    def load_module(self, fullname):
-        """
-        This method is called by Python if CustomImporter.find_module
-        does not return None. fullname is the fully-qualified name
-        of the module/package that was requested.
-        """
-
-        if not self.valid_module(fullname):
-            # Raise ImportError as per PEP #302 if the requested module/package
-            # couldn't be loaded. This should never be reached in this
-            # simple example, but it's included here for completeness. :)
-            raise ImportError(fullname)
-
-        # if the library already exists and correctly generated,
-        # the __hash__ will prevent re-generation
-        generated_library_path = try_download_generate_lib()
-        mod = load_lib(generated_library_path, fullname)
-        sys.modules[fullname] = mod
-        return mod
+        cls.library_path = None
 
 
-def generate(parts_lst, output_dir, force=False):
-    """ main function for the library generation """
+def generate(parts_lst, output_dir, force=False, jobs=None, engine=None, layout=None):
+    """
+    main function for the library generation
+    :param jobs: number of processes rendering the parts modules, from the config if None
+    :param engine: how the modules are rendered, 'emitter' or 'pystache', from the config if None
+    :param layout: 'modules' or 'lazy' parts package, from the config if None
+    """
+    # pylint: disable=too-many-arguments
+    config = get_config()
+    if jobs is None:
+        jobs = config.jobs
+    if engine is None:
+        engine = config.template_engine
+    if engine not in ENGINES:
+        raise ValueError('unknown template engine: %s' % engine)
+    if layout is None:
+        layout = config.library_layout
+    if layout not in LAYOUTS:
+        raise ValueError('unknown library layout: %s' % layout)
     library_path = os.path.join(output_dir, 'library')
     ensure_exists(library_path)
     hash_path = os.path.join(library_path, '__hash__')
 
     md5_parts_lst = hashlib.md5(open(parts_lst, 'rb').read()).hexdigest()
+    if layout != 'modules':
+        # generate again when the layout changes
+        md5_parts_lst += ':' + layout
 
     if os.path.exists(hash_path):
         md5 = open(hash_path, 'r').read()
@@ -176,30 +174,51 @@ def generate(parts_lst, output_dir, force=False):
         library__init__.write(LIBRARY_INIT)
     shutil.copy('ldraw-license.txt', os.path.join(library_path, 'license.txt'))
 
-    gen_colours(parts, output_dir)
-    gen_parts(parts, output_dir)
+    # only the files whose content changed since the last generation are written
+    manifest = Manifest(library_path, force)
+    gen_colours(parts, output_dir, manifest, engine)
+    gen_parts(parts, output_dir, manifest, jobs, engine, layout)
+    manifest.save()
 
     open(hash_path, 'w').write(md5_parts_lst)
 
 
-def download(output_dir):
-    """ download complete.zip, mklist, main function"""
-    tmp_ldraw = get_cache_dir()
+def download(output_dir, url=None, sha256=None, extract_library=None):
+    """
+    download complete.zip, mklist, main function
+    :param url: where complete.zip is downloaded from, the ``mirror`` option
+    of the config or ldraw.org if None
+    :param sha256: expected SHA-256 of complete.zip, the ``mirror_sha256`` option
+    of the config if None, not verified if not set
+    :param extract_library: extract the library, or keep complete.zip in the output dir
+    and read the parts from it, the ``extract_library`` option of the config if None
+    """
+    config = get_config()
+    if url is None:
+        url = config.mirror
+    if sha256 is None:
+        sha256 = config.mirror_sha256
+    if extract_library is None:
+        extract_library = config.extract_library
     parts_lst_path = os.path.join(output_dir, 'parts.lst')
 
-    retrieved = os.path.join(tmp_ldraw, "complete.zip")
+    retrieved = os.path.join(get_cache_dir(), "complete.zip")
 
-    print('retrieve the complete.zip from ldraw.org ...')
-    urlretrieve(LDRAW_URL, filename=retrieved)
-
-    print('unzipping the complete.zip ...')
-    zip_ref = zipfile.ZipFile(retrieved, 'r')
-    zip_ref.extractall(tmp_ldraw)
-    zip_ref.close()
+    print('retrieve the complete.zip from %s ...' % url)
+    fetch(url, retrieved, sha256)
 
     output_dir = ensure_exists(output_dir)
+    if not extract_library:
+        archive_path = os.path.join(output_dir, ARCHIVE_NAME)
+        shutil.move(retrieved, archive_path)
+        print('mklist...')
+        with LibraryArchive(archive_path) as archive:
+            write_parts_lst(archive, parts_lst_path)
+            record_level(output_dir, archive_level(archive.members))
+        return
 
-    copy_tree(os.path.join(tmp_ldraw, 'ldraw'), os.path.join(output_dir))
+    print('unzipping the complete.zip ...')
+    record_level(output_dir, archive_level(extract(retrieved, output_dir, prefix='ldraw/')))
 
     print('mklist...')
     generate_parts_lst('description',
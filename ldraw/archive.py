@@ -0,0 +1,144 @@
+"""
+Reading of the LDraw parts library straight from its zip archive, without extracting it
+"""
+import codecs
+import io
+import mmap
+import os
+import struct
+import zipfile
+import zlib
+
+from ldraw.partslst import header_row, sort_rows, write_rows
+
+# the library archive kept instead of the extracted files, next to the parts.lst
+ARCHIVE_NAME = 'complete.zip'
+
+LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+LOCAL_HEADER_SIGNATURE = b'PK\003\004'
+# bytes decoded to find the first line of a part file, the first buffer
+# that mklist decodes, a file with a non UTF-8 byte in it is skipped
+HEAD_SIZE = io.DEFAULT_BUFFER_SIZE
+
+
+class LibraryArchive(object):
+    """
+    A zip archive of the LDraw library, like complete.zip. The central directory is read
+    once into an index of the members, and their data is read from a memory map of the file.
+    The members are named by their path in the archive, relative to the prefix, or by
+    the archive path joined with the member name, like the paths of the extracted files.
+    """
+
+    def __init__(self, path, prefix='ldraw/'):
+        self.path = path
+        self.prefix = prefix
+        with zipfile.ZipFile(path, 'r') as archive:
+            self.members = {info.filename[len(prefix):]: info for info in archive.infolist()
+                            if info.filename.startswith(prefix) and not info.filename.endswith('/')}
+        with open(path, 'rb') as archive_file:
+            self._map = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """ releases the memory map of the file, once the members read are not used anymore """
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+    def __contains__(self, path):
+        return self.name(path) in self.members
+
+    def name(self, path):
+        """ the name of a member from its path under the archive path, or its name """
+        if path.startswith(self.path + os.sep):
+            path = path[len(self.path) + 1:]
+        return path.replace(os.sep, '/')
+
+    def member_path(self, name):
+        """ the path of a member, under the archive path """
+        return os.path.join(self.path, *name.split('/'))
+
+    def _info(self, path):
+        try:
+            return self.members[self.name(path)]
+        except KeyError:
+            raise FileNotFoundError('no member %s in %s' % (path, self.path))
+
+    def _data(self, info):
+        """ the stored data of a member, a view of the memory map """
+        header = LOCAL_HEADER.unpack_from(self._map, info.header_offset)
+        if header[0] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile('bad local header of %s in %s' % (info.filename, self.path))
+        start = info.header_offset + LOCAL_HEADER.size + header[-2] + header[-1]
+        return memoryview(self._map)[start:start + info.compress_size]
+
+    def read(self, path, size=-1):
+        """
+        The content of a member, without copy for the stored members
+        :param path: path or name of the member
+        :param size: only read the first bytes, all if -1
+        :return: a bytes-like object
+        """
+        info = self._info(path)
+        data = self._data(info)
+        if info.compress_type == zipfile.ZIP_STORED:
+            return data if size < 0 else data[:size]
+        if info.compress_type != zipfile.ZIP_DEFLATED:
+            raise zipfile.BadZipFile('unsupported compression of %s in %s'
+                                     % (info.filename, self.path))
+        if size < 0:
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data, size)
+
+    def read_text(self, path):
+        """ the text of a member """
+        return str(self.read(path), 'utf-8')
+
+    def open_text(self, path):
+        """ a text file object reading a member, line endings are kept """
+        return io.StringIO(self.read_text(path), newline='')
+
+    def first_line(self, path):
+        """
+        The first line of a member, read like a text file with universal newlines
+        :raise UnicodeDecodeError: if the start of the member isn't UTF-8
+        """
+        head = bytes(self.read(path, HEAD_SIZE))
+        # a character can be cut at the end of the buffer, like in a text file
+        text = codecs.getincrementaldecoder('utf-8')().decode(head)
+        if len(head) == HEAD_SIZE and '\r' not in text and '\n' not in text:
+            text = str(self.read(path), 'utf-8')
+        ends = [text.find(end) for end in ('\r', '\n') if end in text]
+        if ends:
+            text = text[:min(ends)] + '\n'
+        return text
+
+
+def get_parts_lst(archive, mode='description'):
+    """
+    The rows of the parts.lst of the parts of an archive, the same as mklist
+    gets from the extracted parts directory
+    """
+    rows = []
+    for name in archive.members:
+        directory, _, filename = name.rpartition('/')
+        if directory != 'parts' or not filename.endswith('.dat'):
+            continue
+        try:
+            row = header_row(filename, archive.first_line(name))
+        except UnicodeDecodeError:
+            continue
+        if row is not None:
+            rows.append(row)
+    return sort_rows(rows, mode)
+
+
+def write_parts_lst(archive, parts_lst_path, mode='description'):
+    """ writes the parts.lst of the parts of an archive """
+    write_rows(get_parts_lst(archive, mode), parts_lst_path)
@@ -0,0 +1,238 @@
+"""
+Caching of parsed part files
+"""
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+from ldraw.dirs import get_cache_dir
+from ldraw.utils import ensure_exists
+
+# bump this when the classes of the parsed objects change
+CACHE_VERSION = 3
+# bump this when the content of the header index changes
+INDEX_VERSION = 2
+
+CACHE_ERRORS = (OSError, IOError, EOFError, pickle.UnpicklingError,
+                AttributeError, ImportError, IndexError, TypeError, ValueError)
+
+
+def _source_stat(path):
+    """
+    the stat of a file, or of the archive holding it for a member of a LibraryArchive,
+    whose path is the archive path joined with the member name
+    """
+    try:
+        return os.stat(path)
+    except NotADirectoryError:
+        return _source_stat(os.path.dirname(path))
+
+
+def _cache_key(path):
+    stat = _source_stat(path)
+    return CACHE_VERSION, os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+class PartCache(object):
+    """
+    On-disk cache of parsed part files, in pickle format.
+    An entry is only valid for the same path, modification time and size
+    of the part file it was parsed from.
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.path.join(get_cache_dir(), 'parts')
+        self.directory = ensure_exists(directory)
+
+    def _entry_path(self, path):
+        digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + os.extsep + 'pickle')
+
+    def load(self, path):
+        """
+        Gets the parsed objects of a part file
+        :param path: path of the part file
+        :return: a tuple of objects, or None if not cached or stale
+        """
+        try:
+            key = _cache_key(path)
+            with open(self._entry_path(path), 'rb') as entry:
+                if pickle.load(entry) != key:
+                    return None
+                return pickle.load(entry)
+        except CACHE_ERRORS:
+            return None
+
+    def store(self, path, objects):
+        """
+        Stores the parsed objects of a part file
+        :param path: path of the part file
+        :param objects: tuple of objects parsed from the file
+        """
+        try:
+            key = _cache_key(path)
+        except OSError:
+            return
+        entry_path = self._entry_path(path)
+        tmp_path = '%s.%i.tmp' % (entry_path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as entry:
+                pickle.dump(key, entry, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(objects, entry, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except (OSError, IOError, pickle.PicklingError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """ removes all the entries of the cache """
+        for item in os.listdir(self.directory):
+            if item.endswith(os.extsep + 'pickle'):
+                os.remove(os.path.join(self.directory, item))
+
+
+def _file_digest(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as index_file:
+        for block in iter(lambda: index_file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class HeaderIndex(object):
+    """
+    On-disk index of the data read from the headers of the part files listed
+    in a parts.lst, like their categories, in named JSON entries.
+    An entry is only valid for the same path and content of the parts.lst.
+    """
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.path.join(get_cache_dir(), 'headers')
+        self.directory = ensure_exists(directory)
+
+    def _entry_path(self, parts_lst, name):
+        digest = hashlib.sha1(os.path.abspath(parts_lst).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + os.extsep + name + os.extsep + 'json')
+
+    def load(self, parts_lst, name='categories'):
+        """
+        Gets an entry of the index for a parts.lst
+        :param parts_lst: path of the parts.lst file
+        :param name: name of the entry
+        :return: the data of the entry, or None if not indexed or stale
+        """
+        try:
+            digest = _file_digest(parts_lst)
+            with open(self._entry_path(parts_lst, name), 'r') as entry:
+                index = json.load(entry)
+            if index['version'] != INDEX_VERSION or index['parts.lst'] != digest:
+                return None
+            return index['data']
+        except (OSError, IOError, ValueError, KeyError, TypeError):
+            return None
+
+    def store(self, parts_lst, data, name='categories'):
+        """
+        Stores an entry of the index for a parts.lst
+        :param parts_lst: path of the parts.lst file
+        :param data: JSON serializable data of the entry
+        :param name: name of the entry
+        """
+        try:
+            index = {'version': INDEX_VERSION, 'parts.lst': _file_digest(parts_lst), 'data': data}
+        except (OSError, IOError):
+            return
+        entry_path = self._entry_path(parts_lst, name)
+        tmp_path = '%s.%i.tmp' % (entry_path, os.getpid())
+        try:
+            with open(tmp_path, 'w') as entry:
+                json.dump(index, entry, separators=(',', ':'))
+            os.replace(tmp_path, entry_path)
+        except (OSError, IOError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """ removes all the entries of the index """
+        for item in os.listdir(self.directory):
+            if item.endswith(os.extsep + 'json'):
+                os.remove(os.path.join(self.directory, item))
+
+
+class LRUPartCache(object):
+    """
+    In-memory cache of parsed part files, holding immutable tuples of objects.
+    The objects themselves are shared, Part.objects hands out copies of them.
+    It is bounded both in number of parts and in total number of objects,
+    the least recently used parts being evicted first.
+    Misses are looked up in the optional backend cache (e.g. a PartCache).
+    """
+
+    def __init__(self, max_parts=1024, max_objects=1000000, backend=None):
+        self.max_parts = max_parts
+        self.max_objects = max_objects
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def _add(self, path, objects):
+        if path in self._entries:
+            self.size -= len(self._entries.pop(path))
+        if len(objects) > self.max_objects:
+            return
+        self._entries[path] = objects
+        self.size += len(objects)
+        while len(self._entries) > self.max_parts or self.size > self.max_objects:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def load(self, path):
+        """
+        Gets the parsed objects of a part file
+        :param path: path of the part file
+        :return: a tuple of objects, or None if not cached
+        """
+        try:
+            objects = self._entries[path]
+        except KeyError:
+            self.misses += 1
+            objects = self.backend.load(path) if self.backend is not None else None
+            if objects is not None:
+                objects = tuple(objects)
+                self._add(path, objects)
+            return objects
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return objects
+
+    def store(self, path, objects):
+        """
+        Stores the parsed objects of a part file
+        :param path: path of the part file
+        :param objects: objects parsed from the file
+        """
+        objects = tuple(objects)
+        self._add(path, objects)
+        if self.backend is not None:
+            self.backend.store(path, objects)
+
+    def clear(self):
+        """ removes all the entries held in memory, the backend is kept """
+        self._entries.clear()
+        self.size = 0
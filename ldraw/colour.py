@@ -20,15 +20,54 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
+# the direct colours 0x2RRGGBB of the part lines
+DIRECT_COLOURS = range(0x2000000, 0x3000000)
+# the rgb of the colours without one
+DEFAULT_RGB = "#ffffff"
+
+
+def _pov_pigment(red, green, blue, alpha):
+    rgb = (red / 255.0, green / 255.0, blue / 255.0)
+    transmit = 1.0 - alpha / 255.0
+    if transmit:
+        return "rgbt <%1.1f, %1.1f, %1.1f, %1.1f>" % (rgb + (transmit,))
+    return "rgb <%1.1f, %1.1f, %1.1f>" % rgb
+
+
 class Colour(object):
     # pylint: disable=too-many-arguments, too-few-public-methods
-    """ a Colour, uniquely identified by a code """
+    """
+    a Colour, uniquely identified by a code. Colours are immutable, and hold what
+    the writers need: ``rgba`` (0-255 ints), ``svg_fill`` and ``pov_pigment``,
+    from their rgb and alpha or from white and opaque if they have none
+    """
+    __slots__ = ('code', 'name', 'rgb', 'alpha', 'colour_attributes',
+                 'rgba', 'svg_fill', 'pov_pigment')
+
     def __init__(self, code=None, name=None, rgb=None, alpha=None, colour_attributes=None):
-        self.code = code
-        self.name = name
-        self.rgb = rgb
-        self.alpha = alpha
-        self.colour_attributes = colour_attributes
+        set_attribute = super(Colour, self).__setattr__
+        set_attribute('code', code)
+        set_attribute('name', name)
+        set_attribute('rgb', rgb)
+        set_attribute('alpha', alpha)
+        set_attribute('colour_attributes', colour_attributes)
+        svg_fill = rgb if rgb is not None else DEFAULT_RGB
+        try:
+            red, green, blue = int(svg_fill[1:3], 16), int(svg_fill[3:5], 16), int(svg_fill[5:7], 16)
+        except ValueError:
+            svg_fill, (red, green, blue) = DEFAULT_RGB, (255, 255, 255)
+        rgba = (red, green, blue, alpha if alpha is not None else 255)
+        set_attribute('rgba', rgba)
+        set_attribute('svg_fill', svg_fill)
+        set_attribute('pov_pigment', _pov_pigment(*rgba))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Colour objects are immutable")
+
+    def __reduce__(self):
+        if _COLOURS.get(self.code) is self:
+            return get_colour, (self.code,)
+        return Colour, (self.code, self.name, self.rgb, self.alpha, self.colour_attributes)
 
     def __eq__(self, other):
         if isinstance(other, Colour):
@@ -37,3 +76,36 @@ class Colour(object):
 
     def __hash__(self):
         return hash(self.code)
+
+
+# the shared Colour of each code, see get_colour
+_COLOURS = {}
+
+
+def get_colour(code):
+    """
+    The Colour of a code, the same object for all the lines using the code.
+    A direct colour 0x2RRGGBB has its rgb, the other codes are resolved
+    by the colours of a library, see Colours.
+    """
+    try:
+        return _COLOURS[code]
+    except KeyError:
+        pass
+    if isinstance(code, int) and code in DIRECT_COLOURS:
+        colour = Colour(code, rgb="#%06X" % (code & 0xFFFFFF), alpha=255)
+    else:
+        colour = Colour(code)
+    return _COLOURS.setdefault(code, colour)
+
+
+class Colours(dict):
+    """
+    The Colours of a library by code, like Parts.colours_by_code:
+    a code that the library doesn't define gets its shared Colour, see get_colour
+    """
+
+    def __missing__(self, code):
+        if isinstance(code, Colour):
+            return code
+        return get_colour(code)
@@ -9,31 +9,92 @@ import yaml
 
 from ldraw.dirs import get_config_dir, get_data_dir
 
+LDRAW_URL = 'http://www.ldraw.org/library/updates/complete.zip'
+UPDATES_URL = 'http://www.ldraw.org/library/updates/'
+
 
 def get_config_file_path():
     """ get the config file path """
     return join(get_config_dir(), 'config.yml')
 
 
+def _option(key, default=None):
+    """ a property for an option of the configuration """
+    return property(lambda self: self.get(key, default), doc="the %s option" % key)
+
+
+class Config(dict):
+    """
+    The configuration: the dict of the options of config.yml,
+    with attributes for the known options, giving their default if not set
+    """
+    parts_lst = _option('parts.lst')
+    library = _option('library')
+    others_threshold = _option('others_threshold', 5)
+    parse_cache = _option('parse_cache', True)
+    part_cache_size = _option('part_cache_size', 1024)
+    part_cache_objects = _option('part_cache_objects', 1000000)
+    header_index = _option('header_index', True)
+    jobs = _option('jobs', 1)
+    template_engine = _option('template_engine', 'emitter')
+    library_layout = _option('library_layout', 'modules')
+    mirror = _option('mirror', LDRAW_URL)
+    mirror_sha256 = _option('mirror_sha256')
+    extract_library = _option('extract_library', True)
+    updates = _option('updates', UPDATES_URL)
+
+
+# the configuration last read, by config file path: (modification time, Config)
+_CONFIGS = {}
+
+
+def _read_config(config_file_path):
+    try:
+        with open(config_file_path, 'r') as config_file:
+            return Config(yaml.load(config_file, Loader=yaml.SafeLoader) or {})
+    except (OSError, yaml.YAMLError, IOError, EnvironmentError):
+        return Config({
+            'parts.lst': join(get_data_dir(), 'ldraw', 'parts.lst')
+        })
+
+
 def get_config():
-    """ get the configuration from config.yml, create it if not there """
-    data_dir = get_data_dir()
+    """
+    get the configuration from config.yml, create it if not there.
+    The configuration is only read again when config.yml changed,
+    it is shared by all the callers and shouldn't be modified, see write_config
+    """
+    config_file_path = get_config_file_path()
     try:
-        config = yaml.load(open(get_config_file_path(), 'r'), Loader=yaml.SafeLoader)
-        return config
-    except (OSError, yaml.YAMLError, IOError, EnvironmentError) as e:
-        return {
-            'parts.lst': join(data_dir, 'ldraw', 'parts.lst')
-        }
+        mtime = os.stat(config_file_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    try:
+        cached_mtime, config = _CONFIGS[config_file_path]
+        if cached_mtime == mtime:
+            return config
+    except KeyError:
+        pass
+    config = _read_config(config_file_path)
+    _CONFIGS[config_file_path] = (mtime, config)
+    return config
+
+
+def reload_config():
+    """ reads the configuration from config.yml again """
+    _CONFIGS.clear()
+    return get_config()
 
 
 def write_config(config_dict):
     """ write the config to config.yml """
-    yaml.dump(config_dict, open(get_config_file_path(), 'w'))
+    with open(get_config_file_path(), 'w') as config_file:
+        yaml.dump(dict(config_dict), config_file)
+    _CONFIGS.clear()
 
 
 if __name__ == '__main__':
     print('Configuration file path:')
     print(get_config_file_path())
     print('Configuration used:')
-    yaml.dump(get_config(), sys.stdout, default_flow_style=False)
\ No newline at end of file
+    yaml.dump(dict(get_config()), sys.stdout, default_flow_style=False)
\ No newline at end of file
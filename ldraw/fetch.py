@@ -0,0 +1,194 @@
+"""
+Download and extraction of the LDraw parts library archive
+"""
+import hashlib
+import os
+import re
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from progress.bar import Bar
+
+CHUNK_SIZE = 1 << 16
+# suffix of the file keeping the ETag or Last-Modified of a partial download
+VALIDATOR_SUFFIX = '.validator'
+# number of threads extracting the archive
+EXTRACT_JOBS = 4
+
+
+class DownloadError(IOError):
+    """ An exception happening while downloading the library """
+    pass
+
+
+def _file_sha256(path, digest):
+    with open(path, 'rb') as partial:
+        for block in iter(lambda: partial.read(CHUNK_SIZE), b''):
+            digest.update(block)
+
+
+def _range_total(headers):
+    """ the size of the file in the Content-Range of a 416 response, None if not given """
+    match = re.match(r'bytes \*/(\d+)$', headers.get('Content-Range', '') if headers else '')
+    return int(match.group(1)) if match else None
+
+
+def _validator(response):
+    """ what identifies the version of a downloaded file: its strong ETag, or Last-Modified """
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def _open(url, start=0, validator=None):
+    """
+    A response for the file, or for its end from start if the file is still the one
+    identified by the validator.
+    :return: the response, or None if the partial file of start bytes is the whole file
+    """
+    request = Request(url)
+    if start:
+        request.add_header('Range', 'bytes=%i-' % start)
+        request.add_header('If-Range', validator)
+    try:
+        response = urlopen(request)
+    except HTTPError as error:
+        if error.code != 416 or not start:
+            raise DownloadError('Failed to download %s: %s' % (url, error))
+        if _range_total(error.headers) == start:
+            # the range starts at the end of the file: the partial file is complete
+            return None
+        # the partial file is bigger than the file, or its size is unknown: start again
+        return _open(url)
+    if start and response.status == 206 and \
+            not response.headers.get('Content-Range', '').startswith('bytes %i-' % start):
+        response.close()
+        return _open(url)
+    return response
+
+
+def _read_text(path):
+    try:
+        with open(path, 'r') as text_file:
+            return text_file.read() or None
+    except (OSError, IOError):
+        return None
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def fetch(url, path, sha256=None):
+    """
+    Downloads a file in chunks. An interrupted download is kept in path.part
+    and resumed with a HTTP range request, when the server supports it.
+    The ETag or Last-Modified of the file is kept next to path.part, the download
+    is only resumed if the file didn't change since, otherwise it starts again.
+    :param url: URL of the file
+    :param path: where to write the file
+    :param sha256: expected SHA-256 hex digest of the file, not verified if None
+    :raise DownloadError: if the download failed or the file has another digest
+    """
+    partial_path = path + '.part'
+    validator_path = partial_path + VALIDATOR_SUFFIX
+    start = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    validator = _read_text(validator_path) if start else None
+    if validator is None:
+        # a partial file of an unknown version of the file isn't resumed
+        start = 0
+    try:
+        response = _open(url, start, validator)
+    except (OSError, IOError) as error:
+        raise DownloadError('Failed to download %s: %s' % (url, error))
+
+    digest = hashlib.sha256()
+    if response is not None:
+        with response:
+            if start and response.status != 206:
+                # the server sends the whole file
+                start = 0
+            if not start:
+                validator = _validator(response)
+                if validator is None:
+                    _remove(validator_path)
+                else:
+                    with open(validator_path, 'w') as validator_file:
+                        validator_file.write(validator)
+            length = response.headers.get('Content-Length')
+            progress_bar = Bar('downloading ...', max=start + int(length) if length else 0)
+            progress_bar.goto(start)
+            if start:
+                _file_sha256(partial_path, digest)
+            with open(partial_path, 'ab' if start else 'wb') as partial:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    partial.write(chunk)
+                    digest.update(chunk)
+                    if progress_bar.max:
+                        progress_bar.next(len(chunk))
+            progress_bar.finish()
+    else:
+        _file_sha256(partial_path, digest)
+
+    if sha256 is not None and digest.hexdigest() != sha256.lower():
+        _remove(partial_path, validator_path)
+        raise DownloadError('Downloaded %s has SHA-256 %s, expected %s'
+                            % (url, digest.hexdigest(), sha256))
+    os.replace(partial_path, path)
+    _remove(validator_path)
+
+
+def _extract_members(archive_path, members, output_dir, prefix):
+    with zipfile.ZipFile(archive_path, 'r') as archive:
+        for name in members:
+            target = os.path.join(output_dir, *name[len(prefix):].split('/'))
+            if name.endswith('/'):
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.open(name) as source, open(target, 'wb') as extracted:
+                shutil.copyfileobj(source, extracted, CHUNK_SIZE)
+
+
+def extract(archive_path, output_dir, prefix='ldraw/', jobs=EXTRACT_JOBS):
+    """
+    Extracts the members of a zip archive under a prefix straight into a directory,
+    the parts, the primitives and the other files being extracted in parallel threads
+    :param archive_path: path of the zip file
+    :param output_dir: where to extract the files
+    :param prefix: directory of the archive that is extracted, removed from the paths
+    :param jobs: number of threads
+    :return: the names of the extracted files, relative to the prefix
+    """
+    with zipfile.ZipFile(archive_path, 'r') as archive:
+        names = [name for name in archive.namelist() if name.startswith(prefix)]
+
+    groups = {}
+    for name in names:
+        relative = name[len(prefix):]
+        if '..' in relative.split('/') or relative.startswith('/'):
+            raise DownloadError('Unsafe path in %s: %s' % (archive_path, name))
+        top = relative.split('/', 1)[0].lower() if '/' in relative else ''
+        groups.setdefault(top, []).append(name)
+
+    # the parts and primitives directories hold most of the files, they are split
+    # so that they are extracted by several threads
+    batches = []
+    for top, members in sorted(groups.items()):
+        size = max(1, len(members) // jobs) if top in ('parts', 'p') else len(members)
+        batches.extend(members[i:i + size] for i in range(0, len(members), size))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_extract_members, archive_path, batch, output_dir, prefix)
+                   for batch in batches]
+        for future in futures:
+            future.result()
+    return [name[len(prefix):] for name in names if not name.endswith('/')]
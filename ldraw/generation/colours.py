@@ -7,6 +7,7 @@ import os
 
 import pystache
 
+from ldraw.generation.emitter import Template
 from ldraw.resources import get_resource
 from ldraw.utils import clean, camel
 
@@ -22,23 +23,26 @@ def get_c_dict(colour):
             'rgb': colour.rgb, 'colour_attributes': colour.colour_attributes}
 
 
-def gen_colours(parts, output_dir):
+def gen_colours(parts, output_dir, manifest=None, engine='emitter'):
     """
     Generates a colours.py from library data
+    :param engine: 'emitter' or 'pystache', see ldraw.generation.parts.render_file
     """
     print('generate ldraw.library.colours...')
 
-    colours_mustache = get_resource(os.path.join('templates', 'colours.mustache'))
-    colours_template_file = codecs.open(colours_mustache, 'r', encoding='utf-8')
-    colours_template = pystache.parse(colours_template_file.read())
-
     context = {'colours': [get_c_dict(c) for c in parts.colours_by_name.values()]}
     context['colours'].sort(key=lambda r: r['code'])
+    if manifest is not None and not manifest.changed('colours.py', context):
+        return
 
-    colours_str = pystache.render(colours_template, context=context)
+    colours_mustache = get_resource(os.path.join('templates', 'colours.mustache'))
     library_path = os.path.join(output_dir, 'library')
-
     colours_py = os.path.join(library_path, 'colours.py')
 
     with codecs.open(colours_py, 'w', encoding='utf-8') as generated_file:
-        generated_file.write(colours_str)
+        if engine == 'pystache':
+            with codecs.open(colours_mustache, 'r', encoding='utf-8') as colours_template_file:
+                colours_template = pystache.parse(colours_template_file.read())
+            generated_file.write(pystache.render(colours_template, context=context))
+        else:
+            Template.from_file(colours_mustache).write(context, generated_file)
@@ -0,0 +1,127 @@
+"""
+Direct rendering of the mustache templates of the generated library, without pystache.
+
+Only the subset of mustache used by the templates is supported: escaped {{ name }}
+and unescaped {{{ name }}} variables, and sections over lists of dicts whose
+opening and closing tags are alone on their lines. Each part of a template is
+compiled to a %-format string, so that the output is the same as pystache's.
+"""
+import re
+from html import escape
+
+SECTION_TAG = re.compile(r"^[ \t]*{{[ \t]*([#/])[ \t]*(\w+)[ \t]*}}[ \t]*\r?\n?$")
+VARIABLE_TAG = re.compile(r"{{{[ \t]*(\w+)[ \t]*}}}|{{[ \t]*(&?)[ \t]*(\w+)[ \t]*}}")
+
+# number of rendered lines written to the file at once
+WRITE_LINES = 1024
+
+# the ways of rendering the templates of the generated library
+ENGINES = ('emitter', 'pystache')
+
+
+class TemplateError(Exception):
+    """ A template using mustache features that the emitter doesn't support """
+    pass
+
+
+def _compile_text(text):
+    """ a %-format string and the (name, escaped) variables filling it """
+    fields = []
+    pieces = []
+    end = 0
+    for match in VARIABLE_TAG.finditer(text):
+        pieces.append(text[end:match.start()].replace('%', '%%'))
+        if match.group(1) is not None:
+            fields.append((match.group(1), False))
+        else:
+            fields.append((match.group(3), not match.group(2)))
+        pieces.append('%s')
+        end = match.end()
+    pieces.append(text[end:].replace('%', '%%'))
+    format_string = ''.join(pieces)
+    if '{{' in VARIABLE_TAG.sub('', text):
+        raise TemplateError('unsupported tag in: %r' % text)
+    return format_string, tuple(fields)
+
+
+def _compile(lines, section=None):
+    """ the nodes of a template: (format string, fields) and (section name, nodes) """
+    nodes = []
+    text = []
+    while lines:
+        line = lines.pop(0)
+        match = SECTION_TAG.match(line)
+        if match is None:
+            text.append(line)
+            continue
+        if text:
+            nodes.append(_compile_text(''.join(text)))
+            text = []
+        kind, name = match.groups()
+        if kind == '#':
+            nodes.append((name, _compile(lines, name)))
+        elif name == section:
+            return nodes
+        else:
+            raise TemplateError('unexpected closing tag: %s' % name)
+    if section is not None:
+        raise TemplateError('unclosed section: %s' % section)
+    if text:
+        nodes.append(_compile_text(''.join(text)))
+    return nodes
+
+
+def _lookup(contexts, name):
+    for context in contexts:
+        if name in context:
+            return context[name]
+    return ''
+
+
+def _value(contexts, name, escaped):
+    value = _lookup(contexts, name)
+    if not isinstance(value, str):
+        value = str(value)
+    return escape(value, quote=True) if escaped else value
+
+
+class Template(object):
+    """ A compiled mustache template """
+
+    def __init__(self, text):
+        self.nodes = _compile(text.splitlines(True))
+
+    @classmethod
+    def from_file(cls, path):
+        """ compiles a template file """
+        with open(path, 'r', encoding='utf-8') as template_file:
+            return cls(template_file.read())
+
+    def _emit(self, nodes, contexts, write):
+        for first, second in nodes:
+            if isinstance(second, list):
+                for item in _lookup(contexts, first) or ():
+                    self._emit(second, (item,) + contexts, write)
+            elif second:
+                write(first % tuple(_value(contexts, name, escaped) for name, escaped in second))
+            else:
+                write(first.replace('%%', '%'))
+
+    def write(self, context, output):
+        """ renders the template with a context into a text file object """
+        buffered = []
+
+        def write(text):
+            buffered.append(text)
+            if len(buffered) == WRITE_LINES:
+                output.write(''.join(buffered))
+                del buffered[:]
+
+        self._emit(self.nodes, (context,), write)
+        output.write(''.join(buffered))
+
+    def render(self, context):
+        """ renders the template with a context into a string """
+        rendered = []
+        self._emit(self.nodes, (context,), rendered.append)
+        return ''.join(rendered)
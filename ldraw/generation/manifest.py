@@ -0,0 +1,68 @@
+"""
+Hashes of the generated library files, to only write again the files that changed
+"""
+import hashlib
+import json
+import os
+
+from ldraw.resources import get_resource
+
+MANIFEST = '__manifest__'
+
+
+def _templates_digest():
+    digest = hashlib.sha1()
+    templates_dir = get_resource('templates')
+    for name in sorted(os.listdir(templates_dir)):
+        with open(os.path.join(templates_dir, name), 'rb') as template:
+            digest.update(name.encode('utf-8'))
+            digest.update(template.read())
+    return digest.hexdigest()
+
+
+class Manifest(object):
+    """
+    The hashes of the template contexts the files of a generated library were
+    rendered from, stored in the library. When generating again, a file is only
+    rendered and written if its context or the templates changed.
+    """
+
+    def __init__(self, library_path, force=False):
+        self.library_path = library_path
+        self.path = os.path.join(library_path, MANIFEST)
+        self.templates = _templates_digest()
+        self.previous = {}
+        self.files = {}
+        if force:
+            return
+        try:
+            with open(self.path, 'r') as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest['templates'] == self.templates:
+                self.previous = manifest['files']
+        except (OSError, IOError, ValueError, KeyError, TypeError):
+            pass
+
+    def changed(self, relative_path, context):
+        """
+        Records the context of a generated file
+        :param relative_path: path of the file, relative to the library
+        :param context: JSON serializable context the file is rendered from
+        :return: True if the file has to be written
+        """
+        serialized = json.dumps(context, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+        self.files[relative_path] = digest
+        return (self.previous.get(relative_path) != digest or
+                not os.path.exists(os.path.join(self.library_path, relative_path)))
+
+    def save(self):
+        """ removes the files that are not generated anymore, and writes the manifest """
+        for relative_path in set(self.previous) - set(self.files):
+            try:
+                os.remove(os.path.join(self.library_path, relative_path))
+            except OSError:
+                pass
+        with open(self.path, 'w') as manifest_file:
+            json.dump({'templates': self.templates, 'files': self.files}, manifest_file,
+                      sort_keys=True, indent=0)
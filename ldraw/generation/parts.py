@@ -3,12 +3,16 @@
 Generates the ldraw.library.parts namespace
 """
 import codecs
+import functools
+import json
 import os
 import itertools
+from concurrent.futures import ProcessPoolExecutor
 
 from progress.bar import Bar
 import pystache
 
+from ldraw.generation.emitter import Template
 from ldraw.resources import get_resource
 from ldraw.utils import clean, camel, ensure_exists, flatten
 from ldraw.parts import PartError
@@ -21,17 +25,103 @@ PARTS_TEMPLATE = get_resource(os.path.join('templates', 'parts.mustache'))
 PARTS_TEMPLATE = codecs.open(PARTS_TEMPLATE, 'r', encoding='utf-8')
 PARTS_TEMPLATE = pystache.parse(PARTS_TEMPLATE.read())
 
+LAZY_TEMPLATE = get_resource(os.path.join('templates', 'lazy.mustache'))
+LAZY_TEMPLATE = codecs.open(LAZY_TEMPLATE, 'r', encoding='utf-8')
+LAZY_TEMPLATE = pystache.parse(LAZY_TEMPLATE.read())
+
+TEMPLATES = {
+    'parts': PARTS_TEMPLATE,
+    'parts__init__': PARTS__INIT__TEMPLATE,
+    'lazy': LAZY_TEMPLATE,
+}
+
+EMITTERS = {name: Template.from_file(get_resource(os.path.join('templates', name + '.mustache')))
+            for name in TEMPLATES}
+
 SECTION_SEP = '|'
 
+# number of files sent at once to a process of the pool
+FILES_PER_TASK = 8
+
+# the layouts of the generated parts package: a module of assignments per section,
+# or lazy modules reading the parts from a single index
+LAYOUTS = ('modules', 'lazy')
+LAZY_INDEX = '__index__.json'
 
-def write_section_file(parts_dir, list_of_parts, mod_path):
-    """ Writes a single section files"""
+
+def render_file(task, engine='emitter'):
+    """
+    Renders a template into a file
+    :param task: (template name, context, path of the file),
+    the context is written as JSON for the 'index' template
+    :param engine: 'emitter' streams the file from the compiled template,
+    'pystache' renders it with pystache, both give the same file
+    :return: the path of the file
+    """
+    template, context, path = task
+    ensure_exists(os.path.dirname(path))
+    with codecs.open(path, 'w', encoding='utf-8') as generated_file:
+        if template == 'index':
+            json.dump(context, generated_file, sort_keys=True, separators=(',', ':'))
+        elif engine == 'pystache':
+            generated_file.write(pystache.render(TEMPLATES[template], context=context))
+        else:
+            EMITTERS[template].write(context, generated_file)
+    return path
+
+
+def render_files(tasks, jobs=1, engine='emitter'):
+    """
+    Renders the files of a list of render_file tasks,
+    in a pool of processes if jobs > 1. Each file only depends on its own task,
+    so the files are the same whatever the number of processes.
+    """
+    if not tasks:
+        return
+    render = functools.partial(render_file, engine=engine)
+    progress_bar = Bar('writing the parts modules ...', max=len(tasks))
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for _ in executor.map(render, tasks, chunksize=FILES_PER_TASK):
+                progress_bar.next()
+    else:
+        for task in tasks:
+            render(task)
+            progress_bar.next()
+    progress_bar.finish()
+
+
+def lazy_tasks(tasks, parts_dir):
+    """
+    Turns the tasks of the modules of the parts package into the tasks of the lazy layout:
+    the same modules, reading their parts or submodules from a single index
+    """
+    index = {'modules': {}, 'packages': {}}
+    index_path = os.path.join(parts_dir, LAZY_INDEX)
+    stubs = []
+    for template, context, path in tasks:
+        if template == 'parts':
+            key = os.path.splitext(os.path.relpath(path, parts_dir))[0]
+            key = key.replace(os.sep, '.')
+            index['modules'][key] = [[part['class_name'], part['code']] for part in context['parts']]
+        else:
+            key = os.path.relpath(os.path.dirname(path), parts_dir)
+            key = '' if key == os.curdir else key.replace(os.sep, '.')
+            index['packages'][key] = [section['module_name'] for section in context['sections']]
+        relative_index = os.path.relpath(index_path, os.path.dirname(path)).replace(os.sep, '/')
+        stubs.append(('lazy', {'index': relative_index, 'module': key}, path))
+    return stubs + [('index', index, index_path)]
+
+
+def write_section_file(parts_dir, list_of_parts, mod_path, tasks=None):
+    """ Writes a single section files, or adds it to a list of tasks """
     list_of_parts.sort(key=lambda o: o['description'])
-    part_str = pystache.render(PARTS_TEMPLATE, context={'parts': list_of_parts})
     parts_py = os.path.join(parts_dir, mod_path)
-    ensure_exists(os.path.dirname(parts_py))
-    with codecs.open(parts_py, 'w', encoding='utf-8') as generated_file:
-        generated_file.write(part_str)
+    task = ('parts', {'parts': list_of_parts}, parts_py)
+    if tasks is None:
+        render_file(task)
+    else:
+        tasks.append(task)
 
 
 def get_part_dict(parts, description):
@@ -50,13 +140,18 @@ def get_part_dict(parts, description):
         return {}
 
 
-def gen_parts(parts, output_dir):
+def gen_parts(parts, output_dir, manifest=None, jobs=1, engine='emitter', layout='modules'):
     """
     Generates the ldraw.library.parts namespace
     :param parts: Parts object
     :param output_dir: where to output the library
+    :param manifest: optional Manifest, to only write the files that changed
+    :param jobs: number of processes rendering the files
+    :param engine: how the files are rendered, see render_file
+    :param layout: 'modules' or 'lazy', see LAYOUTS
     :return:
     """
+    # pylint: disable=too-many-arguments
     print('generate ldraw.library.parts, this might take a long time...')
 
     library_path = os.path.join(output_dir, 'library')
@@ -66,11 +161,19 @@ def gen_parts(parts, output_dir):
 
     packages = _get_packages(sections)
 
+    tasks = []
     for package_name, modules in packages.items():
-        generate_parts__init__(library_path, modules, package_name)
+        generate_parts__init__(library_path, modules, package_name, tasks)
 
     for section_name, section_parts in sections.items():
-        generate_section(parts, parts_dir, section_name, section_parts)
+        generate_section(parts, parts_dir, section_name, section_parts, tasks)
+
+    if layout == 'lazy':
+        tasks = lazy_tasks(tasks, parts_dir)
+    if manifest is not None:
+        tasks = [(template, context, path) for template, context, path in tasks
+                 if manifest.changed(os.path.relpath(path, library_path), context)]
+    render_files(tasks, jobs, engine)
 
 
 def _get_packages(sections):
@@ -99,14 +202,9 @@ def module_path(section):
     return section.replace(SECTION_SEP, os.sep) + '.py'
 
 
-def generate_section(parts, parts_dir, section_name, section_parts):
+def generate_section(parts, parts_dir, section_name, section_parts, tasks=None):
     """ generate all the sections in ldraw.library.parts namespace"""
-    parts_list = []
-    progress_bar = Bar('section %s ...' % section_name, max=len(section_parts))
-    for description in section_parts:
-        parts_list.append(get_part_dict(parts, description))
-        progress_bar.next()
-    progress_bar.finish()
+    parts_list = [get_part_dict(parts, description) for description in section_parts]
     parts_list = [x for x in parts_list if x != {}]
     if section_name == 'others':
         parts_list.sort(key=lambda r: r.get('category', 'others'))
@@ -115,18 +213,19 @@ def generate_section(parts, parts_dir, section_name, section_parts):
             if name is None:
                 name = 'others'
 
-            write_section_file(parts_dir, grouped, module_path(name))
+            write_section_file(parts_dir, grouped, module_path(name), tasks)
     else:
-        write_section_file(parts_dir, parts_list, module_path(section_name))
+        write_section_file(parts_dir, parts_list, module_path(section_name), tasks)
 
 
-def generate_parts__init__(library_path, modules, package_name):
+def generate_parts__init__(library_path, modules, package_name, tasks=None):
     """ generate the appropriate __init__.py to make submodules in ldraw.library.parts """
-    parts__init__str = pystache.render(PARTS__INIT__TEMPLATE, context={'sections': modules})
     if package_name == '':
         parts__init__ = os.path.join(library_path, 'parts', '__init__.py')
     else:
         parts__init__ = os.path.join(library_path, 'parts', package_name, '__init__.py')
-    ensure_exists(os.path.dirname(parts__init__))
-    with codecs.open(parts__init__, 'w', encoding='utf-8') as parts__init__file:
-        parts__init__file.write(parts__init__str)
+    task = ('parts__init__', {'sections': modules}, parts__init__)
+    if tasks is None:
+        render_file(task)
+    else:
+        tasks.append(task)
@@ -19,11 +19,12 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 # pylint: disable=invalid-name, too-few-public-methods, missing-docstring
-import copy
 import math
 from numbers import Number
 from functools import reduce
 
+import numpy
+
 
 class MatrixError(Exception):
     pass
@@ -72,6 +73,7 @@ def _rows_multiplication(r1, r2):
 
 class Matrix(object):
     """ a transformation matrix """
+    __slots__ = ('rows',)
 
     def __init__(self, rows):
         self.rows = rows
@@ -113,7 +115,7 @@ class Matrix(object):
 
     def copy(self):
         """ make a copy of this matrix """
-        return Matrix(copy.deepcopy(self.rows))
+        return Matrix([row[:] for row in self.rows])
 
     def rotate(self, angle, axis, units=Degrees):
         """ rotate the matrix by an angle around an axis """
@@ -178,6 +180,7 @@ def Identity():
 
 class Vector(object):
     """ a Vector in 3D"""
+    __slots__ = ('x', 'y', 'z')
 
     def __init__(self, x, y, z):
         self.x, self.y, self.z = x, y, z
@@ -265,6 +268,7 @@ class Vector(object):
 
 class Vector2D(object):
     """ a Vector in 2D """
+    __slots__ = ('x', 'y')
 
     def __init__(self, x, y):
         self.x, self.y = x, y
@@ -336,3 +340,58 @@ class CoordinateSystem(object):
 
     def project(self, p):
         return Vector(p.dot(self.x), p.dot(self.y), p.dot(self.z))
+
+
+# Batched versions of the operations above, working on numpy arrays of points
+# with the coordinates on the last axis, e.g. of shape (N, 3).
+# They evaluate the same expressions as Matrix, Vector and CoordinateSystem,
+# so that they give the same results.
+
+def as_array(vectors):
+    """ an (N, 3) array from a sequence of Vector """
+    return numpy.array([(v.x, v.y, v.z) for v in vectors], dtype=float).reshape(-1, 3)
+
+
+def transform_points(points, matrix, position=None):
+    """ matrix * p + position, for all the points p of an array """
+    r = matrix.rows
+    x, y, z = points[..., 0], points[..., 1], points[..., 2]
+    transformed = numpy.empty(points.shape)
+    transformed[..., 0] = r[0][0] * x + r[0][1] * y + r[0][2] * z
+    transformed[..., 1] = r[1][0] * x + r[1][1] * y + r[1][2] * z
+    transformed[..., 2] = r[2][0] * x + r[2][1] * y + r[2][2] * z
+    if position is not None:
+        transformed += (position.x, position.y, position.z)
+    return transformed
+
+
+def project_points(points, system):
+    """ system.project(p), for all the points p of an array """
+    x, y, z = points[..., 0], points[..., 1], points[..., 2]
+    projected = numpy.empty(points.shape)
+    for i, axis in enumerate((system.x, system.y, system.z)):
+        projected[..., i] = x * axis.x + y * axis.y + z * axis.z
+    return projected
+
+
+def cross_points(a, b):
+    """ a.cross(b), for all the points a and b of two arrays """
+    crossed = numpy.empty(numpy.broadcast(a, b).shape)
+    crossed[..., 0] = a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1]
+    crossed[..., 1] = a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2]
+    crossed[..., 2] = a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+    return crossed
+
+
+def degenerate_triangles(point1, point2, point3):
+    """ True where the triangles (point1, point2, point3) of three arrays have no area """
+    return ~cross_points(point3 - point1, point2 - point1).any(axis=-1)
+
+
+def in_front(projections, sizes):
+    """
+    True where all the points of the polygons in an (N, 4, 3) array of projections
+    are in front of the camera, only the first sizes[i] points of polygon i are considered
+    """
+    used = numpy.arange(projections.shape[1]) < numpy.asarray(sizes)[:, None]
+    return ~((projections[..., 2] >= 0) & used).any(axis=1)
@@ -0,0 +1,77 @@
+"""
+Lazy modules of a generated library: their attributes are read from
+a single index of the library on first use
+"""
+import json
+import os
+import sys
+import types
+
+_INDEXES = {}
+
+
+def load_index(path):
+    """ the index of a library, loaded once """
+    path = os.path.abspath(path)
+    try:
+        return _INDEXES[path]
+    except KeyError:
+        with open(path, 'r', encoding='utf-8') as index_file:
+            index = json.load(index_file)
+        index['modules'] = {key: dict(parts) for key, parts in index['modules'].items()}
+        _INDEXES[path] = index
+        return index
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module type giving access to the __getattr__ and __dir__ functions of a module,
+    for the Python versions without PEP 562
+    """
+
+    def __getattr__(self, name):
+        try:
+            module_getattr = self.__dict__['__getattr__']
+        except KeyError:
+            raise AttributeError(name)
+        return module_getattr(name)
+
+    def __dir__(self):
+        return self.__dict__['__dir__']()
+
+
+def lazy_module(name, path, index_path, key):
+    """
+    Makes a generated module lazy
+    :param name: name of the module
+    :param path: path of the module file
+    :param index_path: path of the index, relative to the directory of the module
+    :param key: key of the module in the index, its dotted path relative to the parts package
+    """
+    module = sys.modules[name]
+    index_path = os.path.join(os.path.dirname(path), index_path)
+
+    def content():
+        index = load_index(index_path)
+        return index['modules'].get(key, {}), index['packages'].get(key)
+
+    def __getattr__(attribute):
+        parts, submodules = content()
+        if attribute == '__all__':
+            value = list(submodules if submodules is not None else parts)
+        elif attribute in parts:
+            value = parts[attribute]
+        else:
+            # submodules are imported by the import system, as for the other packages
+            raise AttributeError("module %r has no attribute %r" % (name, attribute))
+        setattr(module, attribute, value)
+        return value
+
+    def __dir__():
+        parts, submodules = content()
+        return sorted(set(module.__dict__) | set(parts) | set(submodules or ()))
+
+    module.__getattr__ = __getattr__
+    module.__dir__ = __dir__
+    if sys.version_info < (3, 7):
+        module.__class__ = LazyModule
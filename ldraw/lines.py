@@ -1,62 +1,116 @@
 # pylint: disable=too-few-public-methods, too-many-arguments
 
 """ classes for lines in parts path """
+from array import array
 
+from ldraw.geometry import Vector
 
-class OptionalLine(object):
-    """ an optional Line """
 
-    def __init__(self, colour, point1, point2, point3, point4):
-        self.colour = colour
-        self.point1 = point1
-        self.point2 = point2
-        self.point3 = point3
-        self.point4 = point4
+def _coordinate(offset):
+    def get_coordinate(self):
+        return self.coordinates[self.start + offset]
 
+    def set_coordinate(self, value):
+        self.coordinates[self.start + offset] = value
 
-class Quadrilateral(object):
-    """ a quadrilateral """
+    return property(get_coordinate, set_coordinate)
 
-    def __init__(self, colour, point1, point2, point3, point4):
+
+class PointView(Vector):
+    """
+    A point of a primitive, a Vector whose coordinates are read from and written to
+    the array of coordinates of the primitive, so that changing it changes the primitive.
+    The primitives of Part.objects are copies of the cached ones, which are never changed.
+    """
+    __slots__ = ('coordinates', 'start')
+    x, y, z = _coordinate(0), _coordinate(1), _coordinate(2)
+
+    def __init__(self, coordinates, start):  # pylint:disable=super-init-not-called
+        self.coordinates = coordinates
+        self.start = start
+
+    def __reduce__(self):
+        return Vector, (self.x, self.y, self.z)
+
+
+def _point(index):
+    """ a point of a primitive, stored in its array of coordinates """
+    start, stop = 3 * index, 3 * index + 3
+
+    def get_point(self):
+        return PointView(self.coordinates, start)
+
+    def set_point(self, point):
+        self.coordinates[start:stop] = array('d', (point.x, point.y, point.z))
+
+    return property(get_point, set_point, doc="point %i, as a Vector" % (index + 1))
+
+
+class _Primitive(object):
+    """
+    A primitive made of points: the coordinates of the points are kept
+    in a flat array of doubles rather than in Vector objects
+    """
+    __slots__ = ('colour', 'coordinates')
+
+    def __init__(self, colour, *points):
         self.colour = colour
-        self.point1 = point1
-        self.point2 = point2
-        self.point3 = point3
-        self.point4 = point4
+        self.coordinates = array('d', [value for point in points
+                                       for value in (point.x, point.y, point.z)])
+
+    @classmethod
+    def from_coordinates(cls, colour, coordinates):
+        """ a primitive from the array of the coordinates of its points """
+        primitive = cls.__new__(cls)
+        primitive.colour = colour
+        primitive.coordinates = coordinates
+        return primitive
 
     @property
     def points(self):
-        """ returns the points array """
-        return [self.point1, self.point2, self.point3, self.point4]
+        """ returns the points array, PointViews of the coordinates """
+        coordinates = self.coordinates
+        return [PointView(coordinates, i) for i in range(0, len(coordinates), 3)]
+
+    def copy(self):
+        """ a copy of this primitive, with its own coordinates """
+        return self.from_coordinates(self.colour, self.coordinates[:])
+
 
+class OptionalLine(_Primitive):
+    """ an optional Line """
+    __slots__ = ()
+    point1, point2, point3, point4 = _point(0), _point(1), _point(2), _point(3)
+
+    def __init__(self, colour, point1, point2, point3, point4):
+        super().__init__(colour, point1, point2, point3, point4)
+
+
+class Quadrilateral(_Primitive):
+    """ a quadrilateral """
+    __slots__ = ()
+    point1, point2, point3, point4 = _point(0), _point(1), _point(2), _point(3)
+
+    def __init__(self, colour, point1, point2, point3, point4):
+        super().__init__(colour, point1, point2, point3, point4)
 
-class Line(object):
+
+class Line(_Primitive):
     """ a 3D line """
+    __slots__ = ()
+    point1, point2 = _point(0), _point(1)
 
     def __init__(self, colour, point1, point2):
-        self.colour = colour
-        self.point1 = point1
-        self.point2 = point2
-
-    @property
-    def points(self):
-        """ returns the points array """
-        return [self.point1, self.point2]
+        super().__init__(colour, point1, point2)
 
 
-class Triangle(object):
+class Triangle(_Primitive):
     """ a triangle """
+    __slots__ = ()
+    point1, point2, point3 = _point(0), _point(1), _point(2)
 
     def __init__(self, colour, point1, point2, point3):
-        self.colour = colour
-        self.point1 = point1
-        self.point2 = point2
-        self.point3 = point3
-
-    @property
-    def points(self):
-        """ returns the points array """
-        return [self.point1, self.point2, self.point3]
+        super().__init__(colour, point1, point2, point3)
 
 
 class MetaCommand(object):
@@ -66,9 +120,17 @@ class MetaCommand(object):
         self.type = type
         self.text = text
 
+    def copy(self):
+        """ a copy of this metacommand """
+        return MetaCommand(self.type, self.text)
+
 
 class Comment(object):
     """ a comment """
 
     def __init__(self, text):
         self.text = text
+
+    def copy(self):
+        """ a copy of this comment """
+        return Comment(self.text)
@@ -23,15 +23,22 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import re
 import codecs
-from collections import defaultdict
+import zipfile
+from array import array
+from collections import defaultdict, namedtuple
 
+import numpy
 from attrdict import AttrDict
 
-from ldraw.colour import Colour
+from ldraw.archive import ARCHIVE_NAME, LibraryArchive, get_parts_lst
+from ldraw.cache import HeaderIndex, LRUPartCache, PartCache
+from ldraw.colour import Colour, Colours, get_colour
 from ldraw.config import get_config
 from ldraw.geometry import Matrix, Vector
 from ldraw.lines import OptionalLine, Quadrilateral, Line, Triangle, MetaCommand, Comment
+from ldraw.partslst import line_format
 from ldraw.pieces import Piece
+from ldraw.search import SearchIndex
 
 
 class PartError(Exception):
@@ -40,7 +47,11 @@ class PartError(Exception):
 
 
 DOT_DAT = re.compile(r"\.DAT", flags=re.IGNORECASE)
-ENDS_DOT_DAT = re.compile(r"\.DAT$", flags=re.IGNORECASE)
+
+# the minifig sections, in the order the words of their parts are looked for
+MINIFIG_SECTIONS = (('hats', 'Hat'), ('heads', 'Head'), ('torsos', 'Torso'), ('hips', 'Hip'),
+                    ('legs', 'Leg'), ('arms', 'Arm'), ('hands', 'Hand'), ('accessories', 'Accessory'))
+MINIFIG_WORDS = re.compile("|".join(word for _, word in MINIFIG_SECTIONS))
 
 
 class Parts(object):
@@ -49,18 +60,30 @@ class Parts(object):
     ColourAttributes = ("CHROME", "PEARLESCENT", "RUBBER", "MATTE_METALLIC",
                         "METAL")
 
-    def __init__(self, parts_lst=None, others_threshold=None):
+    # pylint: disable=too-many-statements
+    def __init__(self, parts_lst=None, others_threshold=None, cache=None, headers=None):
         config = get_config()
         if parts_lst is None:
-            parts_lst = config['parts.lst']
+            parts_lst = config.parts_lst
         if others_threshold is None:
-            others_threshold = config.get('others_threshold', 5)
+            others_threshold = config.others_threshold
+        if cache is None:
+            backend = PartCache() if config.parse_cache else None
+            cache = LRUPartCache(config.part_cache_size, config.part_cache_objects, backend)
+        if headers is None and config.header_index:
+            headers = HeaderIndex()
+        self.cache = cache
+        self.headers = headers
         self.path = None
+        self.archive = None
         self.parts_dirs = []
         self.parts_subdirs = {}
+        self.paths_by_code = {}
+        self._dirs_mtimes = None
         self.parts_by_name = {}
         self.parts_by_code = {}
         self.parts_by_code_name = {}
+        self._search_index = None
 
         self.primitives_by_name = {}
         self.primitives_by_code = {}
@@ -70,31 +93,13 @@ class Parts(object):
         self.colour_attributes = {}
 
         self.colours_by_name = {}
-        self.colours_by_code = {}
+        self.colours_by_code = Colours()
 
         self.parts = AttrDict(
-            minifig=AttrDict(
-                hats={},
-                heads={},
-                torsos={},
-                hips={},
-                legs={},
-                arms={},
-                hands={},
-                accessories={}
-            )
+            minifig=AttrDict((key, {}) for key, _ in MINIFIG_SECTIONS)
         )
 
-        self.minifig_descriptions = {
-            'torsos': 'Torso',
-            'hips': 'Hip',
-            'arms': 'Arm',
-            'heads': 'Head',
-            'accessories': 'Accessory',
-            'hands': 'Hand',
-            'hats': 'Hat',
-            'legs': 'Leg'
-        }
+        self.minifig_descriptions = dict(MINIFIG_SECTIONS)
 
         self.parts_by_category = defaultdict(lambda: {})
 
@@ -106,7 +111,7 @@ class Parts(object):
                 self.parts_by_category['others'].update(self.parts_by_category.pop(k))
 
         # reference in others
-        for v in self.parts_by_category.values():
+        for v in list(self.parts_by_category.values()):
             self.parts_by_category['others'].update(v)
 
         for k in list(self.parts_by_category.keys()):
@@ -120,79 +125,121 @@ class Parts(object):
         pass
 
     def load(self, parts_lst):
-        """ load parts from a path """
+        """
+        load parts from a path: a parts.lst next to the parts directories or to
+        the complete.zip archive, or the archive itself
+        """
         try:
-            self.try_load(parts_lst)
-        except IOError:
+            if zipfile.is_zipfile(parts_lst):
+                self.archive = LibraryArchive(parts_lst)
+                self._load_parts_lines(line_format(**row) for row in get_parts_lst(self.archive))
+            else:
+                self.try_load(parts_lst)
+        except (IOError, zipfile.BadZipFile):
             raise PartError("Failed to load parts file: %s" % parts_lst)
 
         # If we successfully loaded the files then record the path and look for
         # part files.
         self.path = parts_lst
         directory = os.path.split(self.path)[0]
+        if self.archive is None:
+            # the extracted files, like the files of the updates,
+            # take precedence over the files of a complete.zip
+            self._load_directory(directory)
+            if os.path.isfile(os.path.join(directory, ARCHIVE_NAME)):
+                try:
+                    self.archive = LibraryArchive(os.path.join(directory, ARCHIVE_NAME))
+                except (IOError, zipfile.BadZipFile):
+                    raise PartError("Failed to load library archive: %s" % directory)
+        if self.archive is not None:
+            self._load_archive()
+
+        def get_category(part_description):
+            return part_description.strip(' ~=_').split()[0]
+
+        categories = self.headers.load(parts_lst) if self.headers is not None else None
+        changed = categories is None
+        if changed:
+            categories = {}
+        for code, description in self.parts_by_code_name:
+            default_category = get_category(description)
+            try:
+                category = categories[code]
+            except KeyError:
+                category = categories[code] = self.part(code=code).category
+                changed = True
+            self.parts_by_category[default_category.lower()][description] = code
+            if category:
+                self.parts_by_category[category.lower()][description] = code
+        if changed and self.headers is not None:
+            self.headers.store(parts_lst, categories)
+
+    def _load_directory(self, directory):
         for item in os.listdir(directory):
             obj = os.path.join(directory, item)
             if item.lower() == "parts" and os.path.isdir(obj):
                 self.parts_dirs.append(obj)
-                self._find_parts_subdirs(obj)
             elif item.lower() == "p" and os.path.isdir(obj):
                 self.parts_dirs.append(obj)
-                self._find_parts_subdirs(obj)
             elif item.lower() == "ldconfig" + os.extsep + "ldr":
                 self._load_colours(obj)
             elif item.lower() == "p" + os.extsep + "lst" and os.path.isfile(obj):
                 self._load_primitives(obj)
 
-        def get_category(part_description):
-            return part_description.strip(' ~=_').split()[0]
-
-        for code, description in self.parts_by_code_name:
-            part = self.part(code=code)
-            self.parts_by_code_name[(code, description)] = part
-            default_category = get_category(description)
-            category = part.category
-            self.parts_by_category[default_category.lower()][description] = code
-            if category:
-                self.parts_by_category[category.lower()][description] = code
+    def _load_archive(self):
+        for name in self.archive.members:
+            if name.lower() == "ldconfig" + os.extsep + "ldr" and not self.colours_by_code:
+                self._load_colours(self.archive.member_path(name))
+            elif name.lower() == "p" + os.extsep + "lst" and not self.primitives_by_code:
+                self._load_primitives(self.archive.member_path(name))
 
     def try_load(self, parts_lst):
         """ try loading parts from a parts.lst file """
-        parts_lst_file = codecs.open(parts_lst, 'r', encoding='utf-8')
-        for line in parts_lst_file.readlines():
-            pieces = re.split(DOT_DAT, line)
+        with open(parts_lst, 'rb') as parts_lst_file:
+            text = str(parts_lst_file.read(), 'utf-8')
+        self._load_parts_lines(text.splitlines())
+
+    def _load_parts_lines(self, lines):
+        """ fills the parts dicts from the lines of a parts.lst, in one pass """
+        parts_by_name = self.parts_by_name
+        parts_by_code = self.parts_by_code
+        parts_by_code_name = self.parts_by_code_name
+        split = DOT_DAT.split
+        for line in lines:
+            pieces = split(line)
             if len(pieces) != 2:
                 break
 
-            code, description = self.section_find(pieces)
-            self.parts_by_name[description] = code
-            self.parts_by_code[code] = description
-            self.parts_by_code_name[(code, description)] = None
+            code = pieces[0]
+            description = pieces[1].strip()
+            if description.startswith("Minifig "):
+                code, description = self.section_find(pieces)
+            parts_by_name[description] = code
+            parts_by_code[code] = description
+            parts_by_code_name[(code, description)] = None
 
     def section_find(self, pieces):
         """ returns code, description from a pieces element """
         code = pieces[0]
         description = pieces[1].strip()
-        for key, section in self.parts['minifig'].items():
-            searched = self.minifig_descriptions[key]
-            index_find = description.find(searched)
-
-            if index_find != -1 and (
-                    index_find + len(searched) == len(description) or
-                    description[index_find + len(searched)] == " "):
-                if description.startswith("Minifig "):
-                    description = description[8:]
-                    if description.startswith("(") and description.endswith(")"):
-                        description = description[1:-1]
-                    section[description] = code
+        if not description.startswith("Minifig "):
+            # only the Minifig items go in the minifig sections
+            return code, description
+        # the section of the first word whose first occurrence ends a word,
+        # the accessories are those Minifig items which do not fall into any other section
+        first_ends = {}
+        for match in MINIFIG_WORDS.finditer(description):
+            first_ends.setdefault(match.group(), match.end())
+        section = 'accessories'
+        for key, searched in MINIFIG_SECTIONS:
+            end = first_ends.get(searched)
+            if end is not None and (end == len(description) or description[end] == " "):
+                section = key
                 break
-        else:
-            # The accessories are those Minifig items which do not fall into any
-            # of the above categories.
-            if description.startswith("Minifig "):
-                description = description[8:]
-                if description.startswith("(") and description.endswith(")"):
-                    description = description[1:-1]
-                self.parts['minifig']['accessories'][description] = code
+        description = description[8:]
+        if description.startswith("(") and description.endswith(")"):
+            description = description[1:-1]
+        self.parts['minifig'][section][description] = code
         return code, description
 
     def part(self, description=None, code=None):
@@ -213,41 +260,106 @@ class Parts(object):
             return None
         return self._load_part(code)
 
-    def _find_parts_subdirs(self, directory):
-        for item in os.listdir(directory):
-            obj = os.path.join(directory, item)
-            if os.path.isdir(obj):
-                self.parts_subdirs[item] = obj
-                self.parts_subdirs[item.lower()] = obj
-                self.parts_subdirs[item.upper()] = obj
+    def search(self, query, limit=10):
+        """
+        Searches the parts by the words of their descriptions and keywords
+        :param query: words to search, like "brick 2 x 4", the last one can be a prefix
+        :param limit: maximum number of results
+        :return: list of (code, description) of the matching parts, best first
+        """
+        if self._search_index is None:
+            self._search_index = self._load_search_index()
+        return self._search_index.search(query, limit)
+
+    def _load_search_index(self):
+        data = self.headers.load(self.path, 'search') if self.headers is not None else None
+        if data is not None:
+            return SearchIndex.from_dict(data)
+
+        def entries():
+            for code, description in self.parts_by_code_name:
+                try:
+                    keywords = self.part(code=code).header.keywords
+                except PartError:
+                    keywords = ()
+                yield code, description, keywords
+
+        search_index = SearchIndex.build(entries())
+        if self.headers is not None:
+            self.headers.store(self.path, search_index.to_dict(), 'search')
+        return search_index
+
+    def refresh_index(self, force=False):
+        """
+        Builds the index of part files, or rebuilds it if a parts directory changed since it was built
+        :param force: rebuild even if no directory changed
+        :return: True if the index was rebuilt
+        """
+        if not force and self._dirs_mtimes is not None:
+            try:
+                changed = any(os.stat(directory).st_mtime_ns != mtime
+                              for directory, mtime in self._dirs_mtimes.items())
+            except OSError:
+                changed = True
+            if not changed:
+                return False
+        self.parts_subdirs = {}
+        self.paths_by_code = {}
+        self._dirs_mtimes = {}
+        for parts_dir in self.parts_dirs:
+            if os.path.isdir(parts_dir):
+                self._index_parts_dir(parts_dir)
+        if self.archive is not None:
+            self._index_archive()
+        return True
+
+    def _index_parts_dir(self, directory, prefix=""):
+        self._dirs_mtimes[directory] = os.stat(directory).st_mtime_ns
+        for entry in os.scandir(directory):
+            name = entry.name.lower()
+            if entry.is_dir():
+                if not prefix:
+                    self.parts_subdirs[entry.name] = entry.path
+                    self.parts_subdirs[name] = entry.path
+                    self.parts_subdirs[entry.name.upper()] = entry.path
+                    self._index_parts_dir(entry.path, name + "\\")
+            elif name.endswith(os.extsep + "dat"):
+                self.paths_by_code.setdefault(prefix + name[:-4], entry.path)
+
+    def _index_archive(self):
+        # the parts directory first, like the directories of the extracted files
+        names = sorted(self.archive.members, key=lambda n: n.split('/')[0].lower() != 'parts')
+        for name in names:
+            pieces = name.split('/')
+            if pieces[0].lower() not in ('parts', 'p') or len(pieces) > 3 or \
+                    not pieces[-1].lower().endswith(os.extsep + "dat"):
+                continue
+            path = self.archive.member_path(name)
+            if len(pieces) == 3:
+                subdir = self.archive.member_path('/'.join(pieces[:2]))
+                for key in (pieces[1], pieces[1].lower(), pieces[1].upper()):
+                    self.parts_subdirs.setdefault(key, subdir)
+            key = "\\".join(pieces[1:]).lower()[:-4]
+            self.paths_by_code.setdefault(key, path)
 
     def _load_part(self, code):
-        code = code.replace("\\", os.sep)
-        code = code.replace("/", os.sep)
-        if os.sep in code:
-            pieces = code.split(os.sep)
-            if len(pieces) != 2:
-                return None
-            try:
-                parts_dirs = [self.parts_subdirs[pieces[0]]]
-            except KeyError:
-                return None
-            code = pieces[1]
-        else:
-            parts_dirs = self.parts_dirs
-        paths = []
-        for parts_dir in parts_dirs:
-            paths.append(os.path.join(parts_dir, code.lower()) + os.extsep + "dat")
-            paths.append(os.path.join(parts_dir, code.upper()) + os.extsep + "DAT")
-        for path in paths:
-            if os.path.exists(path):
-                return Part(path)
-            continue
-        raise PartError('part file not found: %s' % code)
+        if self._dirs_mtimes is None:
+            self.refresh_index()
+        pieces = code.replace("/", "\\").split("\\")
+        if len(pieces) > 2 or len(pieces) == 2 and pieces[0] not in self.parts_subdirs:
+            return None
+        key = "\\".join(pieces).lower()
+        try:
+            path = self.paths_by_code[key]
+        except KeyError:
+            if not self.refresh_index() or key not in self.paths_by_code:
+                raise PartError('part file not found: %s' % pieces[-1])
+            path = self.paths_by_code[key]
+        return Part(path, self.cache, self.archive)
 
     def _load_colours(self, path):
         try:
-            colours_part = Part(path)
+            colours_part = Part(path, archive=self.archive)
         except PartError:
             return
         for obj in colours_part.objects:
@@ -292,9 +404,11 @@ class Parts(object):
 
     def _load_primitives(self, path):
         try:
-            part_path = codecs.open(path, 'r', encoding='utf-8')
-            for line in part_path.readlines():
-                pieces = re.split(DOT_DAT, line)
+            with open_part_file(path, self.archive) as part_path:
+                lines = part_path.read().splitlines()
+            split = DOT_DAT.split
+            for line in lines:
+                pieces = split(line)
                 if len(pieces) != 2:
                     break
                 code = pieces[0]
@@ -305,13 +419,28 @@ class Parts(object):
             raise PartError("Failed to load primitives file: %s" % path)
 
 
+# the Colours of the colour strings of the part lines
+_COLOURS_BY_STR = {}
+COLOURS_BY_STR_SIZE = 4096
+
+
 def colour_from_str(colour_str):
-    """ gets a Colour from a string """
+    """ gets the shared Colour of a colour string, a code or a direct colour 0x2RRGGBB """
+    try:
+        return _COLOURS_BY_STR[colour_str]
+    except KeyError:
+        pass
     try:
-        return int(colour_str)
+        code = int(colour_str)
     except ValueError:
-        if colour_str.startswith('0x2'):
-            return Colour(rgb="#" + colour_str[3:], alpha=255)
+        try:
+            code = int(colour_str, 16) if colour_str.startswith('0x2') else None
+        except ValueError:
+            code = None
+    colour = get_colour(code)
+    if len(_COLOURS_BY_STR) < COLOURS_BY_STR_SIZE:
+        _COLOURS_BY_STR[colour_str] = colour
+    return colour
 
 
 def _comment_or_meta(pieces):
@@ -322,123 +451,214 @@ def _comment_or_meta(pieces):
     return Comment(" ".join(pieces))
 
 
-def _sub_file(pieces):
-    if len(pieces) != 14:
-        raise PartError("Invalid part data")
-    colour = colour_from_str(pieces[0])
-    position = list(map(float, pieces[1:4]))
-    rows = [list(map(float, pieces[4:7])),
-            list(map(float, pieces[7:10])),
-            list(map(float, pieces[10:13]))]
-    part = pieces[13].upper()
-    if re.search(ENDS_DOT_DAT, part):
-        part = part[:-4]
-    return Piece(Colour(colour), Vector(*position), Matrix(rows), part)
-
-
-def _line(pieces):
-    if len(pieces) != 7:
-        raise PartError("Invalid line data")
-    colour = colour_from_str(pieces[0])
-    point1 = map(float, pieces[1:4])
-    point2 = map(float, pieces[4:7])
-    return Line(Colour(colour), Vector(*point1), Vector(*point2))
-
-
-def _triangle(pieces):
-    if len(pieces) != 10:
-        raise PartError("Invalid triangle data")
-    colour = colour_from_str(pieces[0])
-    point1 = map(float, pieces[1:4])
-    point2 = map(float, pieces[4:7])
-    point3 = map(float, pieces[7:10])
-    return Triangle(Colour(colour), Vector(*point1), Vector(*point2), Vector(*point3))
-
-
-def _quadrilateral(pieces):
-    if len(pieces) != 13:
-        raise PartError("Invalid quadrilateral data")
-    colour = colour_from_str(pieces[0])
-    point1 = map(float, pieces[1:4])
-    point2 = map(float, pieces[4:7])
-    point3 = map(float, pieces[7:10])
-    point4 = map(float, pieces[10:13])
-    return Quadrilateral(Colour(colour), Vector(*point1), Vector(*point2),
-                         Vector(*point3), Vector(*point4))
-
-
-def _optional_line(pieces):
-    if len(pieces) != 13:
-        raise PartError("Invalid line data")
-    colour = colour_from_str(pieces[0])
-    point1 = map(float, pieces[1:4])
-    point2 = map(float, pieces[4:7])
-    point3 = map(float, pieces[7:10])
-    point4 = map(float, pieces[10:13])
-    return OptionalLine(Colour(colour), Vector(*point1), Vector(*point2),
-                        Vector(*point3), Vector(*point4))
-
-
-HANDLERS = {
-    "0": _comment_or_meta,
-    "1": _sub_file,
-    "2": _line,
-    "3": _triangle,
-    "4": _quadrilateral,
-    "5": _optional_line
+# the kinds of lines with a fixed number of values: number of values after
+# the command, number of coordinates, and name used in error messages
+LINE_KINDS = {
+    "1": (14, 12, "part"),
+    "2": (7, 6, "line"),
+    "3": (10, 9, "triangle"),
+    "4": (13, 12, "quadrilateral"),
+    "5": (13, 12, "line"),
+}
+
+PRIMITIVE_CLASSES = {
+    "2": Line,
+    "3": Triangle,
+    "4": Quadrilateral,
+    "5": OptionalLine,
 }
 
 
+class Tokens(object):
+    """
+    The lines of a part file, scanned at once: comments and meta commands are kept
+    as split lines, the other lines are grouped by kind into lists of line numbers
+    and colours, with the coordinates of all the lines of a kind in a single array
+    """
+
+    def __init__(self, text, path):
+        self.path = path
+        self.comments = []
+        self.numbers = {kind: [] for kind in LINE_KINDS}
+        self.colours = {kind: [] for kind in LINE_KINDS}
+        self.names = []
+        self.size = 0
+        values = {kind: [] for kind in LINE_KINDS}
+        for number, line in enumerate(text.splitlines(), 1):
+            pieces = line.split()
+            if not pieces:
+                continue
+            command = pieces[0]
+            self.size = number
+            if command == "0":
+                self.comments.append((number, pieces[1:]))
+                continue
+            try:
+                arity, size, name = LINE_KINDS[command]
+            except KeyError:
+                raise PartError("Unknown command (%s) in %s at line %i" % (command, path, number))
+            if len(pieces) != arity + 1:
+                raise PartError("Invalid %s data in %s at line %i" % (name, path, number))
+            self.numbers[command].append(number)
+            self.colours[command].append(pieces[1])
+            values[command].extend(pieces[2:2 + size])
+            if command == "1":
+                self.names.append(pieces[14])
+        self.coordinates = {kind: self._floats(kind, kind_values)
+                            for kind, kind_values in values.items()}
+
+    def _floats(self, kind, values):
+        if not values:
+            return numpy.zeros(0)
+        try:
+            return numpy.array(values, dtype=float)
+        except ValueError:
+            pass
+        # report the first line with an invalid number
+        _, size, name = LINE_KINDS[kind]
+        for row, number in enumerate(self.numbers[kind]):
+            try:
+                [float(value) for value in values[row * size:(row + 1) * size]]
+            except ValueError:
+                raise PartError("Invalid %s data in %s at line %i" % (name, self.path, number))
+        return numpy.array([float(value) for value in values])
+
+    def objects(self):
+        """ the objects of the lines, in file order """
+        objects = [None] * (self.size + 1)
+        for number, pieces in self.comments:
+            objects[number] = _comment_or_meta(pieces)
+
+        rows = self.coordinates["1"].reshape(-1, 12).tolist()
+        for number, colour, row, part in zip(self.numbers["1"], self.colours["1"], rows, self.names):
+            part = part.upper()
+            if part.endswith(".DAT"):
+                part = part[:-4]
+            objects[number] = Piece(colour_from_str(colour), Vector(*row[:3]),
+                                    Matrix([row[3:6], row[6:9], row[9:12]]), part)
+
+        for kind, cls in PRIMITIVE_CLASSES.items():
+            size = LINE_KINDS[kind][1]
+            coordinates = array("d")
+            coordinates.frombytes(self.coordinates[kind].tobytes())
+            for row, (number, colour) in enumerate(zip(self.numbers[kind], self.colours[kind])):
+                objects[number] = cls.from_coordinates(colour_from_str(colour),
+                                                       coordinates[row * size:(row + 1) * size])
+
+        return [obj for obj in objects if obj is not None]
+
+
+PartHeader = namedtuple("PartHeader", ["description", "name", "author", "type", "category",
+                                       "keywords", "history", "bfc"])
+PartHeader.__doc__ = """ The metadata found in the header of a part file """
+
+
+def open_part_file(path, archive=None):
+    """ opens a part file, or a member of a LibraryArchive, for reading text """
+    if archive is not None and path in archive:
+        return archive.open_text(path)
+    return codecs.open(path, 'r', encoding='utf-8')
+
+
+def read_header(path, archive=None):
+    """
+    Reads the metadata of a part file from its leading comments and meta commands,
+    stopping at the first line of another type: the geometry is never parsed.
+    :param path: path of the part file
+    :param archive: the LibraryArchive holding the part file, if any
+    :return: a PartHeader
+    """
+    description = None
+    fields = dict(name=None, author=None, type=None, category=None, bfc=None)
+    keywords = []
+    history = []
+    try:
+        with open_part_file(path, archive) as part_file:
+            for line in part_file:
+                pieces = line.split()
+                if description is None:
+                    description = ' '.join(pieces[1:])
+                if not pieces:
+                    continue
+                if pieces[0] != "0":
+                    break
+                if len(pieces) < 2:
+                    continue
+                command, text = pieces[1], ' '.join(pieces[2:])
+                if command == "Name:":
+                    fields['name'] = text
+                elif command == "Author:":
+                    fields['author'] = text
+                elif command == "!LDRAW_ORG":
+                    fields['type'] = text
+                elif command == "!CATEGORY":
+                    fields['category'] = text
+                elif command == "!KEYWORDS":
+                    keywords.extend(keyword.strip() for keyword in text.split(',') if keyword.strip())
+                elif command == "!HISTORY":
+                    history.append(text)
+                elif command == "BFC" and fields['bfc'] is None:
+                    fields['bfc'] = text
+    except IOError:
+        raise PartError("Failed to read part file: %s" % path)
+    return PartHeader(description=description or '', keywords=tuple(keywords),
+                      history=tuple(history), **fields)
+
+
 class Part(object):
     """
-    Contains data from a LDraw part file
+    Contains data from a LDraw part file, read from a LibraryArchive if given
     """
 
-    def __init__(self, path):
+    def __init__(self, path, cache=None, archive=None):
         self.path = path
-        self._category = None
-        self._description = None
+        self.cache = cache
+        self.archive = archive
+        self._header = None
 
     @property
     def lines(self):
         try:
-            for line in codecs.open(self.path, 'r', encoding='utf-8'):
-                yield line
+            with open_part_file(self.path, self.archive) as part_file:
+                for line in part_file:
+                    yield line
         except IOError:
             raise PartError("Failed to read part file: %s" % self.path)
 
     @property
     def objects(self):
-        """ Load the Part from its path """
-        for number, line in enumerate(self.lines):
-            pieces = line.split()
-            if not pieces:
-                # self.objects.append(BlankLine)
-                continue
-            try:
-                handler = HANDLERS[pieces[0]]
-            except KeyError:
-                raise PartError("Unknown command (%s) in %s at line %i" % (self.path, pieces[0], number))
-            try:
-                yield handler(pieces[1:])
-            except PartError as parse_error:
-                raise PartError(parse_error.message + ' in %s at line %i' % (self.path, number))
+        """
+        Load the Part from its path, or from the cache if there is one.
+        The objects of the cache are shared, copies of them are returned
+        """
+        if self.cache is None:
+            return self._parse()
+        objects = self.cache.load(self.path)
+        if objects is None:
+            objects = tuple(self._parse())
+            self.cache.store(self.path, objects)
+        return (obj.copy() for obj in objects)
+
+    def _parse(self):
+        try:
+            with open_part_file(self.path, self.archive) as part_file:
+                text = part_file.read()
+        except IOError:
+            raise PartError("Failed to read part file: %s" % self.path)
+        for obj in Tokens(text, self.path).objects():
+            yield obj
+
+    @property
+    def header(self):
+        """ the metadata of the header of the part file, read once """
+        if self._header is None:
+            self._header = read_header(self.path, self.archive)
+        return self._header
 
     @property
     def description(self):
-        if self._description is None:
-            self._description = ' '.join(next(self.lines).split()[1:])
-        return self._description
+        return self.header.description
 
     @property
     def category(self):
-        if self._category is None:
-            for obj in self.objects:
-                if not isinstance(obj, Comment) and not isinstance(obj, MetaCommand):
-                    self._category = None
-                    break
-                elif isinstance(obj, MetaCommand) and obj.type == 'CATEGORY':
-                    self._category = obj.text
-                    break
-
-        return self._category
+        return self.header.category
@@ -0,0 +1,200 @@
+"""
+Generation, reading and writing of parts.lst files, in the same format as mklist
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from ldraw.dirs import get_cache_dir
+from ldraw.utils import ensure_exists
+
+# width of the file name column of a parts.lst line
+FILENAME_WIDTH = 30
+LINE_FORMAT = '{filename:<%i} {description}' % FILENAME_WIDTH
+NOT_ALPHANUMERIC = re.compile(r"[\W_]+", re.UNICODE)
+# number of threads reading the part files
+READ_JOBS = 8
+# bump this when the content of the headers cache changes
+HEADERS_VERSION = 1
+
+
+def read_first_line(path):
+    """
+    The first line of a part file, read like mklist does
+    :return: the line, or None if the file isn't UTF-8
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as part_file:
+            return part_file.readline()
+    except UnicodeDecodeError:
+        return None
+
+
+def line_format(**row):
+    """ the parts.lst line of a row """
+    return LINE_FORMAT.format(**row)
+
+
+def do_sort(rows, mode):
+    """ sorts rows in place by their mode column, ignoring case and punctuation, then by line """
+    rows.sort(key=lambda row: line_format(**row))
+    rows.sort(key=lambda row: NOT_ALPHANUMERIC.sub('', row[mode]).lower())
+
+
+def _read_first_lines(paths):
+    return [read_first_line(path) for path in paths]
+
+
+def header_row(filename, header):
+    """
+    The parts.lst row of a part file from its first line
+    :return: the row, or None for the moved parts
+    """
+    if '~Moved' in header:
+        return None
+    return {'filename': filename,
+            'number': os.path.splitext(filename)[0],
+            'description': header[2:]}
+
+
+def sort_rows(rows, mode='description'):
+    """ the rows in the parts.lst order: the parts, then the _ and the ~ parts """
+    parts_dict = {'_': [], '~': []}
+    parts_lst = []
+    for row in rows:
+        if '_' in row['description']:
+            parts_dict['_'].append(row)
+        elif '~' in row['description']:
+            parts_dict['~'].append(row)
+        else:
+            parts_lst.append(row)
+    do_sort(parts_lst, mode)
+    do_sort(parts_dict['_'], mode)
+    do_sort(parts_dict['~'], mode)
+    return parts_lst + parts_dict['_'] + parts_dict['~']
+
+
+def read_rows(parts_lst_path):
+    """ the rows of a parts.lst """
+    rows = []
+    with open(parts_lst_path, 'r', encoding='utf-8') as parts_lst_file:
+        for line in parts_lst_file:
+            filename = line.split(' ', 1)[0]
+            rows.append({'filename': filename,
+                         'number': os.path.splitext(filename)[0],
+                         'description': line[max(FILENAME_WIDTH, len(filename)) + 1:]})
+    return rows
+
+
+def write_rows(rows, parts_lst_path):
+    """ writes the rows of a parts.lst """
+    with open(parts_lst_path, 'w', newline='\r\n', encoding='utf-8') as parts_lst_file:
+        parts_lst_file.writelines(line_format(**row) for row in rows)
+
+
+def update_rows(rows, headers, mode='description'):
+    """
+    The rows of a parts.lst after some part files changed
+    :param rows: the rows of the parts.lst
+    :param headers: {file name: first line of the part file, None if removed or unreadable}
+    :return: the sorted rows
+    """
+    updated = {row['filename']: row for row in rows if row['filename'] not in headers}
+    for filename, header in headers.items():
+        row = header_row(filename, header) if header is not None else None
+        if row is not None:
+            updated[filename] = row
+    return sort_rows(updated.values(), mode)
+
+
+def _headers_path(parts_dir, cache_dir):
+    digest = hashlib.sha1(os.path.abspath(parts_dir).encode('utf-8')).hexdigest()
+    return os.path.join(ensure_exists(cache_dir), digest + os.extsep + 'partslst.json')
+
+
+def _load_headers(path):
+    try:
+        with open(path, 'r') as headers_file:
+            headers = json.load(headers_file)
+        if headers['version'] == HEADERS_VERSION:
+            return headers['files']
+    except (OSError, IOError, ValueError, KeyError, TypeError):
+        pass
+    return {}
+
+
+def _store_headers(path, files):
+    tmp_path = '%s.%i.tmp' % (path, os.getpid())
+    try:
+        with open(tmp_path, 'w') as headers_file:
+            json.dump({'version': HEADERS_VERSION, 'files': files}, headers_file,
+                      separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except (OSError, IOError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def read_headers(parts_dir, jobs=READ_JOBS, cache_dir=None):
+    """
+    The first lines of the part files of a directory, read by a pool of threads.
+    The lines are cached with the modification times of the files,
+    only the files that changed since the last call are read again.
+    :param parts_dir: the parts directory
+    :param jobs: number of threads reading the files
+    :param cache_dir: where the lines are cached, in the cache dir if None
+    :return: {file name: first line, None if the file isn't UTF-8}
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(get_cache_dir(), 'headers')
+    headers_path = _headers_path(parts_dir, cache_dir)
+    cached = _load_headers(headers_path)
+
+    files = {}
+    stale = []
+    for entry in os.scandir(parts_dir):
+        # the files that glob('*.dat') finds
+        if entry.name.startswith('.') or not entry.name.endswith('.dat') or not entry.is_file():
+            continue
+        stat = entry.stat()
+        try:
+            mtime, size, header = cached[entry.name]
+            if mtime == stat.st_mtime_ns and size == stat.st_size:
+                files[entry.name] = [mtime, size, header]
+                continue
+        except (KeyError, TypeError, ValueError):
+            pass
+        files[entry.name] = [stat.st_mtime_ns, stat.st_size, None]
+        stale.append(entry.name)
+
+    if stale:
+        # each thread reads a batch of files, their reads overlap while waiting for the disk
+        paths = [os.path.join(parts_dir, name) for name in stale]
+        size = -(-len(paths) // max(1, jobs))
+        batches = [paths[i:i + size] for i in range(0, len(paths), size)]
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            headers = [header for batch in executor.map(_read_first_lines, batches)
+                       for header in batch]
+        for name, header in zip(stale, headers):
+            files[name][2] = header
+    if stale or len(files) != len(cached):
+        _store_headers(headers_path, files)
+    return {name: header for name, (_, _, header) in files.items()}
+
+
+def generate_parts_lst(mode, parts_dir, parts_lst_path, jobs=READ_JOBS, cache_dir=None):
+    """
+    Writes the parts.lst of a parts directory, the same as
+    mklist.generate.generate_parts_lst writes it
+    :param mode: 'description' or 'number', the sort order of the parts
+    :param parts_dir: the parts directory
+    :param parts_lst_path: the parts.lst to write
+    :param jobs: number of threads reading the part files
+    :param cache_dir: where the first lines of the part files are cached, see read_headers
+    """
+    headers = read_headers(parts_dir, jobs, cache_dir)
+    write_rows(update_rows([], headers, mode), parts_lst_path)
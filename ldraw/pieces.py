@@ -28,6 +28,8 @@ class Piece:
     a Piece, which is a Part with a certain colour
     at a certain position and rotation
     """
+    __slots__ = ('position', 'colour', 'matrix', 'part', 'group')
+
     def __init__(self, colour, position, matrix, part, group=None):
         self.position = position
         self.colour = colour
@@ -37,6 +39,10 @@ class Piece:
         if group:
             group.add_piece(self)
 
+    def copy(self):
+        """ a copy of this piece, with its own position and matrix, not in a group """
+        return Piece(self.colour, self.position.copy(), self.matrix.copy(), self.part)
+
     def __repr__(self):
         if self.group:
             position = self.group.position + self.group.matrix * self.position
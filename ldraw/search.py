@@ -0,0 +1,117 @@
+"""
+Search of parts by the words of their descriptions and keywords
+"""
+import bisect
+import heapq
+import re
+from collections import defaultdict
+
+# words are runs of letters or of digits, so that "2x4" is the same as "2 x 4"
+WORD = re.compile(r"[^\W\d_]+|\d+")
+
+
+def words(text):
+    """ the lowercase words of a text """
+    return WORD.findall(text.lower())
+
+
+class SearchIndex(object):
+    """
+    Inverted index of the words of the descriptions and keywords of parts.
+    A query matches the parts having all of its words, the last word of the query
+    also matching as a prefix. Parts matching with their description come first,
+    shortest descriptions first.
+    """
+
+    def __init__(self, codes, descriptions, description_words, keyword_words):
+        # the parts are numbered best first, in the order of the search results
+        self.codes = codes
+        self.descriptions = descriptions
+        self.description_words = description_words
+        self.keyword_words = keyword_words
+        self.vocabulary = sorted(set(description_words) | set(keyword_words))
+        self._in_descriptions = {word: frozenset(numbers)
+                                 for word, numbers in description_words.items()}
+        self._in_keywords = {word: frozenset(numbers).union(self._in_descriptions.get(word, ()))
+                             for word, numbers in keyword_words.items()}
+
+    @classmethod
+    def build(cls, entries):
+        """
+        Builds the index
+        :param entries: iterable of (code, description, keywords) of the parts
+        :return: a SearchIndex
+        """
+        parts = []
+        for code, description, keywords in entries:
+            found = set(words(description))
+            parts.append((len(found), len(parts), code, description, found,
+                          set(words(' '.join(keywords))) - found))
+        parts.sort(key=lambda part: part[:2])
+
+        description_words = defaultdict(list)
+        keyword_words = defaultdict(list)
+        for number, (_, _, _, _, found, keywords) in enumerate(parts):
+            for word in found:
+                description_words[word].append(number)
+            for word in keywords:
+                keyword_words[word].append(number)
+        return cls([part[2] for part in parts], [part[3] for part in parts],
+                   dict(description_words), dict(keyword_words))
+
+    @classmethod
+    def from_dict(cls, data):
+        """ a SearchIndex from the result of to_dict """
+        return cls(data['codes'], data['descriptions'],
+                   data['description_words'], data['keyword_words'])
+
+    def to_dict(self):
+        """ the index as a JSON serializable dict """
+        return dict(codes=self.codes, descriptions=self.descriptions,
+                    description_words=self.description_words,
+                    keyword_words=self.keyword_words)
+
+    def _word_matches(self, word, prefix):
+        matched = [word]
+        if prefix:
+            start = bisect.bisect_left(self.vocabulary, word)
+            end = bisect.bisect_left(self.vocabulary, word + u'\U0010ffff')
+            matched = self.vocabulary[start:end]
+        in_descriptions = [self._in_descriptions.get(matched_word, frozenset())
+                           for matched_word in matched]
+        in_keywords = [self._in_keywords.get(matched_word, in_description)
+                       for matched_word, in_description in zip(matched, in_descriptions)]
+        if len(matched) == 1:
+            return in_descriptions[0], in_keywords[0]
+        return frozenset().union(*in_descriptions), frozenset().union(*in_keywords)
+
+    def _matches(self, query_words):
+        """ the parts matching with their description, and with their description or keywords """
+        in_descriptions, in_keywords = self._word_matches(query_words[-1], True)
+        for word in query_words[:-1]:
+            word_in_descriptions, word_in_keywords = self._word_matches(word, False)
+            # the intersection iterates over the smallest set
+            in_descriptions = in_descriptions & word_in_descriptions
+            in_keywords = in_keywords & word_in_keywords
+        return in_descriptions, in_keywords
+
+    @staticmethod
+    def _best(numbers, limit, excluded):
+        # the parts are numbered best first, the best matches have the smallest numbers
+        return heapq.nsmallest(limit, numbers - excluded)
+
+    def search(self, query, limit=10):
+        """
+        Searches the parts matching a query
+        :param query: words to search, like "brick 2 x 4" or "minifig tor"
+        :param limit: maximum number of results
+        :return: list of (code, description) of the matching parts, best first
+        """
+        query_words = words(query)
+        if not query_words or limit <= 0:
+            return []
+        in_descriptions, in_keywords = self._matches(query_words)
+        best = self._best(in_descriptions, limit, frozenset())
+        if len(best) < limit:
+            best.extend(self._best(in_keywords, limit - len(best), in_descriptions))
+        return [(self.codes[number], self.descriptions[number]) for number in best]
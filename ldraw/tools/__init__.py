@@ -27,7 +27,7 @@ def vector_position(input_str):
 def get_model(ldraw_path):
     """" get model from ldraw path """
     config = get_config()
-    parts = Parts(config['parts.lst'])
+    parts = Parts(config.parts_lst)
     try:
         model = Part(ldraw_path)
     except PartError:
@@ -56,10 +56,11 @@ The optional sky background and stroke colours are PNG colours, either specified
     parser.add_argument('--distance', type=float, default=1.0)
     parser.add_argument('--stroke-colour', dest='stroke_colour', type=ImageColor.getrgb)
     parser.add_argument('--sky', default=ImageColor.getrgb('#000000'), type=ImageColor.getrgb)
+    parser.add_argument('--jobs', type=int, default=1, help='number of processes rendering the image')
 
     args = parser.parse_args()
 
-    png_args = PNGArgs(args.distance, args.image_size, args.stroke_colour, args.sky)
+    png_args = PNGArgs(args.distance, args.image_size, args.stroke_colour, args.sky, args.jobs)
 
     ldr2png(args.ldraw_file, args.png_file, args.look_at_position, args.camera_position, png_args)
 
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""
+ldrcache.py - Pre-warms the parse cache of the LDraw parts library.
+
+This file is part of the ldraw Python package.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import sys
+
+from progress.bar import Bar
+
+from ldraw.cache import PartCache
+from ldraw.config import get_config
+from ldraw.parts import Part, Parts, PartError
+
+
+def main():
+    """ ldrcache main function """
+    description = """Parses every part file of the LDraw library and stores
+the result in the parse cache, so that later runs skip the text parsing.
+
+"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--parts-lst', dest='parts_lst', help='path of the parts.lst file')
+    parser.add_argument('--clear', action='store_true', help='empty the cache before warming it')
+
+    args = parser.parse_args()
+
+    ldrcache(args.parts_lst, args.clear)
+
+
+def ldrcache(parts_lst=None, clear=False):
+    """ actual ldrcache implementation """
+    if parts_lst is None:
+        parts_lst = get_config().parts_lst
+    cache = PartCache()
+    if clear:
+        cache.clear()
+    parts = Parts(parts_lst, cache=cache)
+    parts.refresh_index()
+
+    paths = sorted(set(parts.paths_by_code.values()))
+    progress_bar = Bar('warming the parse cache ...', max=len(paths))
+    for path in paths:
+        if cache.load(path) is None:
+            try:
+                cache.store(path, tuple(Part(path, archive=parts.archive).objects))
+            except PartError as parse_error:
+                sys.stderr.write("%s\n" % parse_error)
+        progress_bar.next()
+    progress_bar.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""
+ldrupdate.py - Applies the ldraw.org updates to the LDraw parts library.
+
+This file is part of the ldraw Python package.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import argparse
+import os
+
+from ldraw.config import get_config
+from ldraw.updates import update, update_level
+
+
+def main():
+    """ ldrupdate main function """
+    description = """Downloads and applies the update archives of ldraw.org that are newer
+than the LDraw parts library, then updates its parts.lst.
+
+"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--parts-lst', dest='parts_lst', help='path of the parts.lst file')
+    parser.add_argument('--source', help='URL or directory of the update archives')
+    parser.add_argument('--since', help='update level YYNN of a library whose level is unknown')
+    args = parser.parse_args()
+
+    ldrupdate(args.parts_lst, args.source, args.since)
+
+
+def ldrupdate(parts_lst=None, source=None, since=None):
+    """ actual ldrupdate implementation """
+    if parts_lst is None:
+        parts_lst = get_config().parts_lst
+    library_dir = os.path.dirname(parts_lst)
+    applied = update(library_dir, source, since=since)
+    if applied:
+        print('applied the updates %s' % ', '.join(applied))
+    else:
+        print('the library is up to date (level %s)' % update_level(library_dir))
+
+
+if __name__ == "__main__":
+    main()
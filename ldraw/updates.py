@@ -0,0 +1,154 @@
+"""
+Incremental updates of the LDraw parts library with the update archives of ldraw.org
+(lcadYYNN.zip), applied on top of an extracted library or of a complete.zip
+"""
+import json
+import os
+import re
+from urllib.parse import urljoin
+from urllib.request import urlopen
+
+from ldraw.archive import ARCHIVE_NAME, LibraryArchive
+from ldraw.cache import HeaderIndex
+from ldraw.config import UPDATES_URL, get_config
+from ldraw.dirs import get_cache_dir
+from ldraw.fetch import DownloadError, extract, fetch
+from ldraw.partslst import read_first_line, read_rows, update_rows, write_rows
+
+UPDATE_NAME = re.compile(r'lcad(\d{4})\.zip', flags=re.IGNORECASE)
+# the release notes of the updates included in a library, like models/Note2301CA.txt
+NOTE_NAME = re.compile(r'^models/note(\d{4})', flags=re.IGNORECASE)
+# the update level of a library, stored next to its parts.lst
+UPDATE_LEVEL = 'update_level.json'
+
+
+def level_key(level):
+    """ sort key of an update level YYNN, the updates started in 1997 """
+    year = int(level[:2])
+    return 1900 + year if year >= 90 else 2000 + year, int(level[2:])
+
+
+def archive_level(names):
+    """ the level of the last update included in the files of a library or an archive """
+    levels = [match.group(1) for match in map(NOTE_NAME.match, names) if match]
+    return max(levels, key=level_key) if levels else None
+
+
+def update_level(library_dir):
+    """ the level of the last update applied to a library, None if unknown """
+    try:
+        with open(os.path.join(library_dir, UPDATE_LEVEL), 'r') as level_file:
+            return json.load(level_file)['level']
+    except (OSError, IOError, ValueError, KeyError, TypeError):
+        pass
+    models_dir = os.path.join(library_dir, 'models')
+    if os.path.isdir(models_dir):
+        return archive_level('models/' + name for name in os.listdir(models_dir))
+    archive_path = os.path.join(library_dir, ARCHIVE_NAME)
+    if os.path.isfile(archive_path):
+        with LibraryArchive(archive_path) as archive:
+            return archive_level(archive.members)
+    return None
+
+
+def record_level(library_dir, level):
+    """ stores the level of the last update applied to a library """
+    if level is None:
+        return
+    with open(os.path.join(library_dir, UPDATE_LEVEL), 'w') as level_file:
+        json.dump({'level': level}, level_file)
+
+
+def list_updates(source):
+    """
+    The update archives available in a source
+    :param source: a directory holding update archives, or the URL of a page linking to them
+    :return: {level: path or URL of the archive}
+    """
+    if os.path.isdir(source):
+        names = os.listdir(source)
+        return {match.group(1): os.path.join(source, name)
+                for match, name in zip(map(UPDATE_NAME.match, names), names)
+                if match and match.end() == len(name)}
+    try:
+        with urlopen(source) as response:
+            page = response.read().decode('utf-8', 'replace')
+    except (OSError, IOError) as error:
+        raise DownloadError('Failed to list the updates of %s: %s' % (source, error))
+    return {match.group(2): urljoin(source, match.group(1))
+            for match in re.finditer(r'href="([^"]*?lcad(\d{4})\.zip)"', page, flags=re.IGNORECASE)}
+
+
+def _changed_headers(library_dir, names):
+    """ {file name: first line} of the changed part files listed in the parts.lst """
+    headers = {}
+    for name in names:
+        directory, _, filename = name.rpartition('/')
+        if directory.lower() == 'parts' and filename.endswith('.dat'):
+            headers[filename] = read_first_line(os.path.join(library_dir, 'parts', filename))
+    return headers
+
+
+def update(library_dir, source=None, headers=None, since=None):
+    """
+    Applies the updates newer than the level of a library: their files are extracted over
+    the library, then only the changed lines of the parts.lst and the changed entries of the
+    header index are rebuilt. The generated library is then generated again on the next import,
+    and only its sections that changed are written.
+    If an update fails, the parts.lst is still rebuilt for the updates applied before it,
+    and the level of the last of them is recorded.
+    :param library_dir: directory of the parts.lst of the library
+    :param source: directory or URL of the updates, the ``updates`` option of the config if None
+    :param headers: HeaderIndex of the library, created from the config if None
+    :param since: level YYNN of the library, only used if it has no known level
+    :return: the levels of the applied updates
+    :raise ValueError: if the level of the library is unknown and since is None
+    """
+    config = get_config()
+    if source is None:
+        source = config.updates
+    if headers is None and config.header_index:
+        headers = HeaderIndex()
+    level = update_level(library_dir)
+    if level is None:
+        if since is None:
+            raise ValueError('the update level of %s is unknown, give the level '
+                             'to update from' % library_dir)
+        level = since
+    available = list_updates(source)
+    pending = sorted((update_name for update_name in available
+                      if level_key(update_name) > level_key(level)), key=level_key)
+
+    applied = []
+    changed = set()
+    try:
+        for update_name in pending:
+            location = available[update_name]
+            if not os.path.isfile(location):
+                print('retrieve the update %s from %s ...' % (update_name, location))
+                path = os.path.join(get_cache_dir(), os.path.basename(location))
+                fetch(location, path)
+                location = path
+            changed.update(extract(location, library_dir, prefix='ldraw/'))
+            applied.append(update_name)
+    finally:
+        # the level is only recorded once the parts.lst has the parts of the applied updates
+        _update_parts_lst(library_dir, changed, headers)
+        if applied:
+            record_level(library_dir, applied[-1])
+    return applied
+
+
+def _update_parts_lst(library_dir, changed, headers):
+    """ rebuilds the lines of the parts.lst and the header index entries of the changed files """
+    parts_lst = os.path.join(library_dir, 'parts.lst')
+    if not changed or not os.path.isfile(parts_lst):
+        return
+    changed_headers = _changed_headers(library_dir, changed)
+    categories = headers.load(parts_lst) if headers is not None else None
+    write_rows(update_rows(read_rows(parts_lst), changed_headers), parts_lst)
+    if categories is not None:
+        # the categories of the parts that didn't change are kept
+        changed_codes = {os.path.splitext(filename)[0] for filename in changed_headers}
+        headers.store(parts_lst, {code: category for code, category in categories.items()
+                                  if code not in changed_codes})
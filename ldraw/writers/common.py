@@ -3,130 +3,83 @@ Common code for all the Writers
 """
 import sys
 
-from ldraw.geometry import Identity, Vector
+import numpy
+
+from ldraw.geometry import Vector, degenerate_triangles, in_front, project_points
 from ldraw.library.colours import White, Main_Colour
-from ldraw.lines import Triangle, Quadrilateral, Line
 from ldraw.pieces import Piece
+from ldraw.writers.mesh import Mesh, PRIMITIVES, get_mesh_cache
 
 
 def _current_colour(colour, current_colour):
     return current_colour if colour == Main_Colour else colour.code
 
 
-class Current(object):
-    """ an instance of this is passed around during rendering """
-    # pylint: disable=too-few-public-methods
-
-    def __init__(self, matrix, colour, position):
-        self.matrix = matrix
-        self.colour = colour
-        self.position = position
-
-
 class Writer(object):
     # pylint: disable=too-many-arguments, too-few-public-methods
     """ Common logic for PNG, SVG, POV writers """
+    render_lines = False
 
-    def __init__(self, camera_position, system, parts):
+    def __init__(self, camera_position, system, parts, meshes=None):
         self.camera_position = camera_position
         self.system = system
         self.parts = parts
+        self.meshes = meshes if meshes is not None else get_mesh_cache(parts)
 
     def _opacity_from_colour(self, colour):
-        return self.parts.alpha_values.get(colour, 255) / 255.0
-
-    def _polygons_from_objects(self,
-                               model,
-                               top_level_piece=None,
-                               current=Current(Identity(), White.code, Vector(0, 0, 0))):
-        # Extract polygons from objects, filtering out those behind the camera.
-        polygons = []
+        return self.parts.colours_by_code[colour].rgba[3] / 255.0
 
-        poly_handlers = {
-            Piece: self._subpart_get_poly,
-            Line: self._line_get_poly,
-            Triangle: self._triangle_get_poly,
-            Quadrilateral: self._quadrilateral_get_poly,
-        }
+    def _polygons_from_objects(self, model):
+        return list(self._iter_polygons(model))
 
+    def _iter_polygons(self, model):
+        # Extract polygons from objects, filtering out those behind the camera.
         for obj in model.objects:
-            if isinstance(obj, Piece) and obj.part == "LIGHT":
-                continue
-            try:
-                args = (obj,
-                        top_level_piece or obj,
-                        current)
-                poly = poly_handlers[type(obj)](*args)
-            except KeyError:
-                continue
-            if poly:
-                polygons.extend(poly)
+            if isinstance(obj, Piece):
+                if obj.part == "LIGHT":
+                    continue
+                mesh = self.meshes.get(obj.part)
+                if mesh is None:
+                    sys.stderr.write("Part not found: %s\n" % obj.part)
+                    continue
+                colour = _current_colour(obj.colour, White.code)
+                points = mesh.transformed(obj.matrix, obj.position)
+            elif type(obj) in PRIMITIVES:
+                mesh = Mesh.from_primitives([obj])
+                colour = White.code
+                points = mesh.points
             else:
                 continue
+            for polygon in self._polygons_from_mesh(obj, mesh, points, mesh.coloured(colour)):
+                yield polygon
 
-        return polygons
-
-    def _line_get_poly(self,
-                       obj,
-                       top_level_piece,
-                       current):
-        pass
-
-    def _subpart_get_poly(self,
-                          obj,
-                          top_level_piece,
-                          current):
-        colour = _current_colour(obj.colour, current.colour)
-        part = self.parts.part(code=obj.part)
-        if part:
-            matrix = obj.matrix
-            new_current = Current(current.matrix * matrix,
-                                  colour,
-                                  current.position + current.matrix * obj.position)
-            return self._polygons_from_objects(part,
-                                               top_level_piece,
-                                               new_current)
-        sys.stderr.write("Part not found: %s\n" % obj.part)
-        return False
-
-    def _triangle_get_poly(self,
-                           obj,
-                           top_level_piece,
-                           current):
-        camera_position = self.camera_position
-
-        points = [current.matrix * p + current.position - camera_position for p in obj.points]
-        if abs((points[2] - points[0]).cross(points[1] - points[0])) == 0:
-            return False
-
-        return self._common_get_poly(obj, top_level_piece, current.colour, points)
-
-    def _common_get_poly(self,
-                         obj,
-                         top_level_piece,
-                         current_colour,
-                         points):
-        projections = [self.system.project(p) for p in points]
-        if any(p.z >= 0 for p in projections):
-            return False
-        colour = _current_colour(obj.colour, current_colour)
-
-        return self._get_polygon(top_level_piece, colour, projections)
-
-    def _quadrilateral_get_poly(self,
-                                obj,
-                                top_level_piece,
-                                current):
+    def _polygons_from_mesh(self, top_level_piece, mesh, points, colours):
         camera_position = self.camera_position
-
-        points = [current.matrix * p + current.position - camera_position for p in obj.points]
-
-        if abs((points[2] - points[0]).cross(points[1] - points[0])) == 0:
-            return False
-        if abs((points[2] - points[0]).cross(points[3] - points[0])) == 0:
-            return False
-
-        return self._common_get_poly(obj, top_level_piece, current.colour, points)
+        points = points - (camera_position.x, camera_position.y, camera_position.z)
+        sizes = mesh.sizes
+
+        # Discard the triangles and quadrilaterals with no area.
+        keep = sizes > 2
+        keep &= ~degenerate_triangles(points[:, 0], points[:, 1], points[:, 2])
+        quadrilaterals = sizes == 4
+        keep[quadrilaterals] &= ~degenerate_triangles(points[quadrilaterals, 0],
+                                                      points[quadrilaterals, 3],
+                                                      points[quadrilaterals, 2])
+        if self.render_lines:
+            keep |= sizes == 2
+
+        projections = project_points(points, self.system)
+        keep &= in_front(projections, sizes)
+
+        indices = numpy.flatnonzero(keep)
+        return self._get_polygons(top_level_piece, colours[indices], projections[indices], sizes[indices])
+
+    def _get_polygons(self, top_level_piece, colours, projections, sizes):
+        polygons = []
+        for colour, points, size in zip(colours, projections.tolist(), sizes.tolist()):
+            vectors = [Vector(*point) for point in points[:size]]
+            polygons.extend(self._get_polygon(top_level_piece, colour, vectors))
+        return polygons
 
     def _get_polygon(self, top_level_piece, colour, projections):
         pass
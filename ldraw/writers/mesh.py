@@ -0,0 +1,149 @@
+"""
+Flattened geometry of parts, used by the Writers
+"""
+import sys
+import weakref
+
+import numpy
+
+from ldraw.geometry import transform_points
+from ldraw.lines import Triangle, Quadrilateral, Line
+from ldraw.pieces import Piece
+
+MAIN_COLOUR = 16
+
+PRIMITIVES = {
+    Line: 2,
+    Triangle: 3,
+    Quadrilateral: 4,
+}
+
+
+def _colour_code(colour):
+    # the main colour is kept symbolic, to be resolved when the mesh is placed
+    return MAIN_COLOUR if colour == MAIN_COLOUR else colour.code
+
+
+class Mesh(object):
+    """
+    The geometry of a part, with all its sub-files resolved, in the part's own frame.
+
+    Each primitive (line, triangle or quadrilateral) is a row of ``points``,
+    padded to 4 points, ``sizes`` holds the number of points of each primitive
+    and ``colours`` their colour codes. The primitives are kept in drawing order.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, points, sizes, colours):
+        self.points = points
+        self.sizes = sizes
+        self.colours = colours
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @classmethod
+    def from_primitives(cls, primitives):
+        """ a Mesh from a list of Line, Triangle or Quadrilateral """
+        points = numpy.zeros((len(primitives), 4, 3))
+        sizes = numpy.empty(len(primitives), dtype=numpy.int8)
+        colours = numpy.empty(len(primitives), dtype=object)
+        for i, obj in enumerate(primitives):
+            size = len(obj.coordinates) // 3
+            points[i, :size] = numpy.frombuffer(obj.coordinates).reshape(size, 3)
+            sizes[i] = size
+            colours[i] = _colour_code(obj.colour)
+        return cls(points, sizes, colours)
+
+    @classmethod
+    def concatenate(cls, meshes):
+        """ a Mesh made of several meshes, in order """
+        meshes = [mesh for mesh in meshes if len(mesh)]
+        if not meshes:
+            return EMPTY_MESH
+        if len(meshes) == 1:
+            return meshes[0]
+        return cls(numpy.concatenate([mesh.points for mesh in meshes]),
+                   numpy.concatenate([mesh.sizes for mesh in meshes]),
+                   numpy.concatenate([mesh.colours for mesh in meshes]))
+
+    def transformed(self, matrix, position):
+        """ the points of the mesh transformed by a Matrix, then moved at a Vector position """
+        return transform_points(self.points, matrix, position)
+
+    def coloured(self, colour):
+        """ the colours of the mesh, with the main colour resolved to a colour code """
+        colours = self.colours.copy()
+        colours[colours == MAIN_COLOUR] = colour
+        return colours
+
+    def placed(self, piece):
+        """ this mesh as a sub-file of another part, referenced by a Piece """
+        return Mesh(self.transformed(piece.matrix, piece.position),
+                    self.sizes,
+                    self.coloured(_colour_code(piece.colour)))
+
+
+EMPTY_MESH = Mesh(numpy.zeros((0, 4, 3)),
+                  numpy.zeros(0, dtype=numpy.int8),
+                  numpy.zeros(0, dtype=object))
+
+
+class MeshCache(object):
+    """
+    Resolves each part code once into its flattened Mesh
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.meshes = {}
+
+    def get(self, code):
+        """ the Mesh of a part, None if the part can't be found """
+        key = code.upper()
+        try:
+            return self.meshes[key]
+        except KeyError:
+            pass
+        part = self.parts.part(code=code)
+        mesh = self.from_objects(part.objects) if part else None
+        self.meshes[key] = mesh
+        return mesh
+
+    def from_objects(self, objects):
+        """ the flattened Mesh of a sequence of parsed objects """
+        meshes = []
+        primitives = []
+        for obj in objects:
+            if isinstance(obj, Piece):
+                if obj.part == "LIGHT":
+                    continue
+                mesh = self.get(obj.part)
+                if mesh is None:
+                    sys.stderr.write("Part not found: %s\n" % obj.part)
+                    continue
+                if primitives:
+                    meshes.append(Mesh.from_primitives(primitives))
+                    primitives = []
+                if len(mesh):
+                    meshes.append(mesh.placed(obj))
+            elif type(obj) in PRIMITIVES:
+                primitives.append(obj)
+        if primitives:
+            meshes.append(Mesh.from_primitives(primitives))
+        return Mesh.concatenate(meshes)
+
+    def clear(self):
+        """ forget all the meshes """
+        self.meshes.clear()
+
+
+_MESH_CACHES = weakref.WeakKeyDictionary()
+
+
+def get_mesh_cache(parts):
+    """ the MeshCache shared by all the writers using a Parts object """
+    try:
+        return _MESH_CACHES[parts]
+    except KeyError:
+        return _MESH_CACHES.setdefault(parts, MeshCache(parts))
@@ -18,13 +18,19 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import shutil
 import sys
+import tempfile
 
 from ldraw.library.colours import Main_Colour as Current
 from ldraw.geometry import Vector
 from ldraw.lines import Quadrilateral, Triangle
+from ldraw.parts import PartError
 from ldraw.pieces import Piece
 
+# size of the scene kept in memory before it is spooled to disk
+SCENE_SPOOL_SIZE = 1 << 22
+
 POV_OBJECT2 = """object {
 %s
 """
@@ -67,13 +73,6 @@ POV_FORMAT_STRING = """matrix <%1.3f, %1.3f, %1.3f,
 %1.3f, %1.3f, %1.3f>"""
 
 
-def _rgb_line(alpha, red, green, blue):
-    rgb = (red, green, blue)
-    if alpha:
-        return "rgbt <%1.1f, %1.1f, %1.1f, %1.1f>" % (rgb + (alpha,))
-    return "rgb <%1.1f, %1.1f, %1.1f>" % rgb
-
-
 def _object_name(part):
     # Replace forbidden characters to produce a valid object name.
     return "part" + part.replace("-", "_").replace("\\", "_").replace("#", "_")
@@ -107,26 +106,34 @@ class POVRayWriter(object):
         :return:
         """
 
-        # Define objects for the pieces first.
+        # Define the objects for the pieces as they come, discarding any that
+        # are invalid in any way, while the scene is spooled to a temporary file.
         objects = {}
-        ordered_objects = []
-        for obj in model.objects:
-            if isinstance(obj, Piece):
-                ordered_objects += self._create_piece_objects(obj, objects)
-        # Write the objects, discarding any that are invalid in any way.
-        for part in ordered_objects:
-            if not self._write_object_definition(part, objects):
-                del objects[part]
-        # Write the pieces using the objects.
-        self.pov_file.write(POV_PREAMBLE)
-        for obj in model.objects:
-            if isinstance(obj, Piece):
-                self._write_piece(obj, objects)
-            elif isinstance(obj, Triangle):
-                self._write_triangle_1(obj)
-            elif isinstance(obj, Quadrilateral):
-                self._write_triangle_1(obj)
-                self._write_triangle_2(obj)
+        # the parts that couldn't be defined, not tried again
+        failed = set()
+        with tempfile.SpooledTemporaryFile(SCENE_SPOOL_SIZE, mode='w+') as scene:
+            pov_file, self.pov_file = self.pov_file, scene
+            try:
+                for obj in model.objects:
+                    if isinstance(obj, Piece):
+                        self.pov_file = pov_file
+                        for part in self._create_piece_objects(obj, objects, failed):
+                            if not self._write_object_definition(part, objects):
+                                del objects[part]
+                                failed.add(part)
+                        self.pov_file = scene
+                        self._write_piece(obj, objects)
+                    elif isinstance(obj, Triangle):
+                        self._write_triangle_1(obj)
+                    elif isinstance(obj, Quadrilateral):
+                        self._write_triangle_1(obj)
+                        self._write_triangle_2(obj)
+            finally:
+                self.pov_file = pov_file
+            # Write the pieces using the objects.
+            self.pov_file.write(POV_PREAMBLE)
+            scene.seek(0)
+            shutil.copyfileobj(scene, self.pov_file)
         self.pov_file.write(POV_POSTAMBLE)
 
     def _write_triangle_2(self, obj):
@@ -163,23 +170,11 @@ class POVRayWriter(object):
         self._write_colour(obj.colour, 2)
         self.pov_file.write("  }\n")
 
-    def _rgb_from_colour(self, colour):
-        colour = self.parts.colours.get(colour.code, "#FFFFFF")
-        red = int(colour[1:3], 16) / 255.0
-        green = int(colour[3:5], 16) / 255.0
-        blue = int(colour[5:7], 16) / 255.0
-        return red, green, blue
-
-    def _alpha_from_colour(self, colour):
-        return self.parts.alpha_values.get(colour.code, 0) / 255.0
-
     def _colour_string(self, colour):
-        red, green, blue = self._rgb_from_colour(colour)
-        alpha = self._alpha_from_colour(colour)
-        return _rgb_line(alpha, red, green, blue)
+        return self.parts.colours_by_code[colour.code].pov_pigment
 
     def _finish_string(self, colour):
-        attributes = self.parts.colour_attributes.get(colour.code, [])
+        attributes = self.parts.colours_by_code[colour.code].colour_attributes
         if attributes:
             attributes = POVRayWriter.ColourAttributes.get(attributes[0], [])
             return "\n    ".join(attributes)
@@ -216,12 +211,14 @@ class POVRayWriter(object):
             if obj.part not in objects:
                 self.warnings.append(("Discarding reference to %s", obj.part))
                 continue
-            if obj.matrix.fix_diagonal():
+            # parsed objects can be shared through the parts cache, fix a copy
+            matrix = obj.matrix.copy()
+            if matrix.fix_diagonal():
                 self.warnings.append(("Correcting diagonal matrix elements for %s.", obj.part))
-            if obj.matrix.det() == 0.0:
+            if matrix.det() == 0.0:
                 self.warnings.append(("Discarding %s with singular matrix.", obj.part))
                 continue
-            allowed.append(obj)
+            allowed.append(Piece(obj.colour, obj.position, matrix, obj.part))
         if not allowed:
             return False
         self.pov_file.write("// Part %s\n\n" % part)
@@ -248,19 +245,23 @@ class POVRayWriter(object):
             self.pov_file.write(indent * " ")
             self.pov_file.write("finish { %s }\n" % finish)
 
-    def _create_piece_objects(self, this_obj, objects):
-        if this_obj.part in objects:
+    def _create_piece_objects(self, this_obj, objects, failed):
+        if this_obj.part in objects or this_obj.part in failed:
             return []
-        part = self.parts.part(code=this_obj.part)
+        try:
+            part = self.parts.part(code=this_obj.part)
+        except PartError:
+            part = None
         if not part:
             sys.stderr.write("Part not found: %s\n" % this_obj.part)
+            failed.add(this_obj.part)
             return []
         definition = []
         ordered_objects = []
         for obj in part.objects:
             if isinstance(obj, Piece):
                 # Define this piece, too.
-                ordered_objects = ordered_objects + self._create_piece_objects(obj, objects)
+                ordered_objects = ordered_objects + self._create_piece_objects(obj, objects, failed)
                 # Record the object as part of the piece's definition.
                 definition.append(obj)
             elif isinstance(obj, Triangle):
@@ -275,4 +276,6 @@ class POVRayWriter(object):
         if definition:
             objects[this_obj.part] = definition
             ordered_objects.append(this_obj.part)
+        else:
+            failed.add(this_obj.part)
         return ordered_objects
@@ -0,0 +1,350 @@
+"""
+Scanline rasterisation of polygons into numpy colour and depth buffers, used by the PNG writer
+
+The polygons are rasterised in batches: the spans of all the rows of all the polygons
+of a batch are computed at once, then their pixels (fragments) are written into the
+buffers one depth layer at a time, which gives the same result as drawing the polygons
+one after the other.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+from PIL import Image
+
+from ldraw.writers.geometry import Z_MAX
+
+DEPTH_MAX = 1 << 32 - 1
+BATCH_SIZE = 4096
+FRAGMENTS_CHUNK = 1 << 22
+TILES_PER_JOB = 4
+
+OPAQUE, TRANSLUCENT, STROKE = 0, 1, 2
+
+
+class Polygons(object):
+    """
+    A batch of polygons to rasterise, in camera space: ``points`` holds the
+    points of each polygon, padded to 4 points, ``sizes`` the number of points,
+    ``rgb`` the colour and ``alpha`` the opacity of each polygon
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, points, sizes, rgb, alpha):
+        self.points = points
+        self.sizes = sizes
+        self.rgb = rgb
+        self.alpha = alpha
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def take(self, indices):
+        """ the polygons at some indices, in that order """
+        return Polygons(self.points[indices], self.sizes[indices],
+                        self.rgb[indices], self.alpha[indices])
+
+    @classmethod
+    def concatenate(cls, batches):
+        """ several batches of polygons, in order """
+        batches = list(batches)
+        if not batches:
+            return cls(numpy.zeros((0, 4, 3)), numpy.zeros(0, dtype=numpy.int8),
+                       numpy.zeros((0, 3), dtype=int), numpy.zeros(0))
+        return cls(numpy.concatenate([batch.points for batch in batches]),
+                   numpy.concatenate([batch.sizes for batch in batches]),
+                   numpy.concatenate([batch.rgb for batch in batches]),
+                   numpy.concatenate([batch.alpha for batch in batches]))
+
+
+def _expand(starts, counts):
+    """ for runs of consecutive integers: the index of the run and the value of each integer """
+    owners = numpy.repeat(numpy.arange(len(counts)), counts)
+    offsets = numpy.cumsum(counts) - counts
+    return owners, starts[owners] + (numpy.arange(len(owners)) - offsets[owners])
+
+
+class _Edges(object):
+    """ The edges of a batch of polygons on screen, sorted like the original scanline renderer """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, screen, sizes):
+        count = len(sizes)
+        index = numpy.arange(4)
+        following = (index + 1) % sizes[:, None]
+        point1 = screen
+        point2 = screen[numpy.arange(count)[:, None], following]
+
+        # Discard the edges that do not cross a row of pixels, orient the others downwards.
+        row1 = numpy.trunc(point1[..., 1])
+        row2 = numpy.trunc(point2[..., 1])
+        valid = (index < sizes[:, None]) & (row1 != row2)
+        downwards = (row1 < row2)[..., None]
+        top = numpy.where(downwards, point1, point2)
+        bottom = numpy.where(downwards, point2, point1)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            height = numpy.where(valid, bottom[..., 1] - top[..., 1], 1.0)
+            dx_dy = numpy.where(valid, (bottom[..., 0] - top[..., 0]) / height, 0.0)
+            dz_dy = numpy.where(valid, (bottom[..., 2] - top[..., 2]) / height, 0.0)
+
+        # Sort the edges of each polygon by (y1, y2, x1, dx/dy, z1, dz/dy), unused ones last.
+        order = numpy.lexsort((dz_dy.ravel(), top[..., 2].ravel(),
+                               dx_dy.ravel(), top[..., 0].ravel(),
+                               bottom[..., 1].ravel(), top[..., 1].ravel(),
+                               ~valid.ravel(), numpy.repeat(numpy.arange(count), 4)))
+        self.y1 = top[..., 1].ravel()[order].reshape(count, 4)
+        self.y2 = bottom[..., 1].ravel()[order].reshape(count, 4)
+        self.x1 = top[..., 0].ravel()[order].reshape(count, 4)
+        self.z1 = top[..., 2].ravel()[order].reshape(count, 4)
+        self.dx_dy = dx_dy.ravel()[order].reshape(count, 4)
+        self.dz_dy = dz_dy.ravel()[order].reshape(count, 4)
+        self.count = valid.sum(axis=1)
+
+    def at_rows(self, polygons, edges, rows):
+        """ the x and z coordinates of some edges of some polygons at some rows """
+        dy = rows - self.y1[polygons, edges]
+        return (self.x1[polygons, edges] + dy * self.dx_dy[polygons, edges],
+                self.z1[polygons, edges] + dy * self.dz_dy[polygons, edges])
+
+    def segments(self, height):
+        """
+        Walks down the edges of all the polygons at once: returns the runs of rows
+        (polygon, first edge, second edge, first row, end row) spanned by the same pair of edges
+        """
+        # pylint: disable=too-many-locals
+        polygons = numpy.flatnonzero(self.count >= 2)
+        end_y = self.y2[polygons, self.count[polygons] - 1]
+        keep = (end_y >= 0) & (self.y1[polygons, 0] < height)
+        polygons, end_y = polygons[keep], end_y[keep]
+
+        row = numpy.trunc(self.y1[polygons, 0])
+        row += (row < self.y1[polygons, 0]) | (row < self.y1[polygons, 1])
+        end_row = numpy.minimum(numpy.floor(end_y) + 1, height)
+        edge1 = numpy.zeros(len(polygons), dtype=int)
+        edge2 = numpy.ones(len(polygons), dtype=int)
+        following = numpy.full(len(polygons), 2)
+
+        segments = []
+        while len(polygons):
+            # Retrieve new edges as required, stopping when there are none left.
+            alive = row < end_row
+            for edge in (edge1, edge2):
+                expired = row >= self.y2[polygons, edge]
+                alive &= ~expired | (following < self.count[polygons])
+                replace = expired & alive
+                edge[replace] = following[replace]
+                following += replace
+            polygons, row, end_row = polygons[alive], row[alive], end_row[alive]
+            edge1, edge2, following = edge1[alive], edge2[alive], following[alive]
+
+            # The same edges are used until one of them ends.
+            stop = numpy.ceil(numpy.minimum(self.y2[polygons, edge1], self.y2[polygons, edge2]))
+            stop = numpy.minimum(numpy.maximum(stop, row + 1), end_row)
+            segments.append((polygons, edge1.copy(), edge2.copy(), row, stop))
+            row = stop
+
+        return [numpy.concatenate(column) for column in zip(*segments)] if segments else None
+
+
+class Raster(object):
+    """
+    Colour and depth buffers of an image, or of a horizontal tile
+    of an image spanning the rows first_row to end_row - 1
+    """
+
+    def __init__(self, width, height, background_colour=None, rows=None):
+        self.width = width
+        self.height = height
+        self.first_row, self.end_row = rows if rows is not None else (0, height)
+        size = (self.end_row - self.first_row) * width
+        self.colour = numpy.zeros((size, 4), dtype=numpy.int32)
+        if background_colour is not None:
+            background_colour = tuple(background_colour)
+            self.colour[:] = background_colour + (255,) * (4 - len(background_colour))
+        self.depth = numpy.empty(size, "f")
+        self.depth[:] = DEPTH_MAX
+
+    def image(self):
+        """ the buffers as a PIL image """
+        colour = self.colour.astype(numpy.uint8).reshape(self.end_row - self.first_row, self.width, 4)
+        return Image.fromarray(colour, 'RGBA')
+
+    def screen_points(self, points, distance):
+        """ project points in camera space to screen coordinates, keeping the depth """
+        viewport_scale = min(float(self.width), float(self.height))
+        x, y, z = points[..., 0], points[..., 1], points[..., 2]
+        screen = numpy.empty(points.shape)
+        screen[..., 0] = self.width / 2 + ((distance * x) / (distance + -z)) * viewport_scale
+        screen[..., 1] = self.height / 2 - ((distance * y) / (distance + -z)) * viewport_scale
+        screen[..., 2] = -z
+        return screen
+
+    def draw(self, polygons, distance, stroke_colour=None):
+        """
+        Rasterises polygons, opaque ones first then translucent ones,
+        each of them in order
+        :type polygons: Polygons
+        :param distance: distance from the eye to the viewport
+        :param stroke_colour: RGBA colour of the edges, None to not draw them
+        """
+        order = numpy.argsort(polygons.alpha < 1.0, kind='stable')
+        for start in range(0, len(order), BATCH_SIZE):
+            self._draw_batch(polygons.take(order[start:start + BATCH_SIZE]),
+                             distance, stroke_colour)
+
+    def _draw_batch(self, polygons, distance, stroke_colour):
+        # pylint: disable=too-many-locals
+        width = self.width
+        edges = _Edges(self.screen_points(polygons.points, distance), polygons.sizes)
+        segments = edges.segments(self.height)
+        if segments is None:
+            return
+        polygon, edge1, edge2, first, stop = segments
+
+        # The rows of each segment, those outside of the buffers are skipped.
+        first = numpy.maximum(first, self.first_row)
+        stop = numpy.minimum(stop, self.end_row)
+        owners, rows = _expand(first, numpy.maximum(stop - first, 0).astype(int))
+        order = numpy.lexsort((rows, polygon[owners]))
+        owners, rows = owners[order], rows[order]
+        polygon = polygon[owners]
+
+        # Calculate the starting and finishing coordinates of the span of each row.
+        x1, z1 = edges.at_rows(polygon, edge1[owners], rows)
+        x2, z2 = edges.at_rows(polygon, edge2[owners], rows)
+        swap = x1 > x2
+        x1, x2 = numpy.where(swap, x2, x1), numpy.where(swap, x1, x2)
+        z1, z2 = numpy.where(swap, z2, z1), numpy.where(swap, z1, z2)
+
+        # Do not render the spans that lie outside the image or have values
+        # that cannot be stored in the depth buffer.
+        start_x = numpy.trunc(x1)
+        start_x += start_x < x1
+        end_x = numpy.trunc(x2)
+        drawn = ~(((z1 <= 0) & (z2 <= 0)) | ((z1 >= Z_MAX) & (z2 >= Z_MAX)))
+        drawn &= (start_x < width) & (end_x >= 0)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            dz_dx = numpy.where(x1 != x2, (z2 - z1) / (x2 - x1), 0.0)
+        start_x = numpy.maximum(start_x, 0)
+        end_x = numpy.minimum(end_x, width - 1)
+        lengths = numpy.where(drawn, numpy.maximum(end_x - start_x + 1, 0), 0).astype(int)
+
+        strokes = []
+        if stroke_colour is not None:
+            for x, z in ((x1, z1), (x2, z2)):
+                visible = numpy.flatnonzero(drawn & (x >= 0) & (x < width))
+                strokes.append((visible, numpy.trunc(x[visible]).astype(int), z[visible]))
+
+        if not len(rows):
+            return
+        rows = rows.astype(int) - self.first_row
+        kind = numpy.where(polygons.alpha < 1.0, TRANSLUCENT, OPAQUE)
+        spans = (start_x, x1, z1, dz_dx)
+
+        # Write the fragments in chunks of whole rows, in drawing order.
+        total = numpy.cumsum(lengths + 2)
+        bounds = numpy.searchsorted(total, numpy.arange(FRAGMENTS_CHUNK, total[-1], FRAGMENTS_CHUNK))
+        for chunk_start, chunk_stop in zip([0] + bounds.tolist(), bounds.tolist() + [len(rows)]):
+            if chunk_start == chunk_stop:
+                continue
+            chunk = slice(chunk_start, chunk_stop)
+            fragments = [self._span_fragments(chunk, spans, lengths, rows, polygon, kind)]
+            for position, (visible, x, z) in enumerate(strokes, width):
+                lo, hi = numpy.searchsorted(visible, (chunk_start, chunk_stop))
+                fragments.append((rows[visible[lo:hi]] * width + x[lo:hi], z[lo:hi],
+                                  numpy.full(hi - lo, STROKE), polygon[visible[lo:hi]],
+                                  visible[lo:hi] * (width + 2) + position))
+            self._write(polygons, stroke_colour,
+                        *[numpy.concatenate(column) for column in zip(*fragments)])
+
+    def _span_fragments(self, chunk, spans, lengths, rows, polygon, kind):
+        # pylint: disable=too-many-arguments
+        start_x, x1, z1, dz_dx = spans
+        owners, x = _expand(start_x[chunk], lengths[chunk])
+        owners += chunk.start
+        z = z1[owners] + dz_dx[owners] * (x - x1[owners])
+        x = x.astype(int)
+        return (rows[owners] * self.width + x, z, kind[polygon[owners]], polygon[owners],
+                owners * (self.width + 2) + x)
+
+    def _write(self, polygons, stroke_colour, pixels, depths, kinds, owners, sequence):
+        """ writes fragments into the buffers as if they were drawn in sequence order """
+        # pylint: disable=too-many-arguments, too-many-locals
+        if not len(pixels):
+            return
+        order = numpy.lexsort((sequence, pixels))
+        sorted_pixels = pixels[order]
+        starts = numpy.flatnonzero(numpy.r_[True, sorted_pixels[1:] != sorted_pixels[:-1]])
+        group_sizes = numpy.diff(numpy.r_[starts, len(order)])
+        layer = numpy.arange(len(order)) - numpy.repeat(starts, group_sizes)
+        by_layer = order[numpy.argsort(layer, kind='stable')]
+        layer_bounds = numpy.cumsum(numpy.bincount(layer))
+
+        # Each pixel appears at most once in a layer.
+        for fragments in numpy.split(by_layer, layer_bounds[:-1]):
+            pixel, depth, kind = pixels[fragments], depths[fragments], kinds[fragments]
+            passed = (depth > 0) & (depth <= self.depth[pixel])
+
+            opaque = passed & (kind == OPAQUE)
+            self.depth[pixel[opaque]] = depth[opaque]
+            self.colour[pixel[opaque], :3] = polygons.rgb[owners[fragments[opaque]]]
+            self.colour[pixel[opaque], 3] = 255
+
+            translucent = passed & (kind == TRANSLUCENT)
+            if translucent.any():
+                owner = owners[fragments[translucent]]
+                alpha = polygons.alpha[owner][:, None]
+                blended = (1 - alpha) * self.colour[pixel[translucent], :3] + alpha * polygons.rgb[owner]
+                self.colour[pixel[translucent], :3] = blended.astype(int)
+                self.colour[pixel[translucent], 3] = 255
+
+            stroke = passed & (kind == STROKE)
+            if stroke.any():
+                self.colour[pixel[stroke]] = stroke_colour
+
+
+def tiles(first_row, end_row, count):
+    """ splits rows of an image in at most count horizontal tiles """
+    bounds = numpy.linspace(first_row, end_row, min(count, end_row - first_row) + 1).astype(int)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _draw_tile(task):
+    width, height, rows, colour, depth, polygons, distance, stroke_colour = task
+    raster = Raster(width, height, rows=rows)
+    raster.colour, raster.depth = colour, depth
+    raster.draw(polygons, distance, stroke_colour)
+    return raster.colour, raster.depth
+
+
+def draw_tiles(raster, polygons, distance, stroke_colour=None, jobs=1):
+    """
+    Rasterises polygons into a Raster, split in horizontal tiles drawn in parallel
+    by a pool of processes. Each tile only gets the polygons that may cover its rows,
+    in the same order, so that the result is the same as with Raster.draw
+    :param jobs: number of processes, the polygons are drawn in this process if 1
+    """
+    # pylint: disable=too-many-arguments, too-many-locals
+    if jobs <= 1:
+        raster.draw(polygons, distance, stroke_colour)
+        return
+
+    width = raster.width
+    rows = numpy.floor(raster.screen_points(polygons.points, distance)[..., 1])
+    used = numpy.arange(4) < polygons.sizes[:, None]
+    top = numpy.where(used, rows, numpy.inf).min(axis=1)
+    bottom = numpy.where(used, rows, -numpy.inf).max(axis=1)
+
+    bounds = tiles(raster.first_row, raster.end_row, jobs * TILES_PER_JOB)
+    tasks = []
+    for first_row, end_row in bounds:
+        pixels = slice((first_row - raster.first_row) * width, (end_row - raster.first_row) * width)
+        binned = numpy.flatnonzero((top < end_row) & (bottom >= first_row))
+        tasks.append((width, raster.height, (first_row, end_row),
+                      raster.colour[pixels], raster.depth[pixels],
+                      polygons.take(binned), distance, stroke_colour))
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for (first_row, end_row), (colour, depth) in zip(bounds, executor.map(_draw_tile, tasks)):
+            pixels = slice((first_row - raster.first_row) * width, (end_row - raster.first_row) * width)
+            raster.colour[pixels] = colour
+            raster.depth[pixels] = depth
@@ -18,10 +18,16 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import heapq
+import pickle
+import tempfile
 
-from ldraw.geometry import Vector2D
+from ldraw.geometry import Vector, Vector2D
 from ldraw.writers.common import Writer
 
+# number of polygons sorted in memory, larger models are sorted in runs on disk
+SORT_RUN_SIZE = 100000
+
 
 class Polygon(object):
     """Polygon used for SVG rendering"""
@@ -87,7 +93,6 @@ def _project_polygons(width, height, polygons):
     pixel_y = 0.5
     half_width = width / 2.0
     half_height = height / 2.0
-    new_polygons = []
     for polygon in polygons:
         new_points = []
         for point in polygon.points:
@@ -95,8 +100,49 @@ def _project_polygons(width, height, polygons):
             point_y = half_height * (point.y / (half_height + pixel_y * -point.z))
             new_point = Vector2D(point_x, point_y)
             new_points.append(new_point)
-        new_polygons.append((new_points, polygon))
-    return new_polygons
+        yield new_points, polygon
+
+
+def _write_run(polygons):
+    run = tempfile.TemporaryFile()
+    for polygon in polygons:
+        points = [(point.x, point.y, point.z) for point in polygon.points]
+        pickle.dump((polygon.zmin, points, polygon.colour), run, pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    with run:
+        while True:
+            try:
+                zmin, points, colour = pickle.load(run)
+            except EOFError:
+                return
+            yield Polygon(zmin, [Vector(*point) for point in points], colour, None)
+
+
+def _sorted_polygons(polygons, run_size=None):
+    """
+    Sorts polygons like sorted() does, keeping at most run_size polygons in memory:
+    sorted runs of polygons are written to temporary files then merged.
+    The polygons read back from the runs lose their piece.
+    """
+    if run_size is None:
+        run_size = SORT_RUN_SIZE
+    runs = []
+    run = []
+    for polygon in polygons:
+        run.append(polygon)
+        if len(run) == run_size:
+            run.sort()
+            runs.append(_read_run(_write_run(run)))
+            run = []
+    run.sort()
+    if not runs:
+        return iter(run)
+    # heapq.merge takes the first of equal items from the first runs, keeping the sort stable
+    return heapq.merge(*(runs + [iter(run)]), key=lambda polygon: polygon.zmin)
 
 
 def write_preamble(args, svg_file):
@@ -111,12 +157,12 @@ def write_preamble(args, svg_file):
 
 class SVGWriter(Writer):
     """Writes a model into a SVG"""
+    render_lines = True
 
     # pylint: disable=too-few-public-methods
     def write(self, model, svg_file, svg_args):
         """Writes the SVG """
-        polygons = self._polygons_from_objects(model)
-        polygons.sort()
+        polygons = _sorted_polygons(self._iter_polygons(model))
         shapes = _project_polygons(svg_args.width, svg_args.height, polygons)
         self._write(shapes, svg_file, svg_args)
 
@@ -127,12 +173,12 @@ class SVGWriter(Writer):
 
         shift = Vector2D(args.width / 2.0, args.height / 2.0)
         for points, polygon in shapes:
-            rgb = self.parts.colours.get(polygon.colour, "#ffffff")
-            stroke_colour = args.stroke_colour if args.stroke_colour else rgb
-            context = dict(rgb=rgb,
+            colour = self.parts.colours_by_code[polygon.colour]
+            stroke_colour = args.stroke_colour if args.stroke_colour else colour.svg_fill
+            context = dict(rgb=colour.svg_fill,
                            stroke_width=stroke_width,
                            stroke_colour=stroke_colour,
-                           opacity=self._opacity_from_colour(polygon.colour))
+                           opacity=colour.rgba[3] / 255.0)
             if len(points) == 2:
                 context['point1'] = Vector2D(points[0].x, -points[0].y) + shift
                 context['point2'] = Vector2D(points[1].x, -points[1].y) + shift
@@ -147,15 +193,6 @@ class SVGWriter(Writer):
         svg_file.write("</svg>\n")
         svg_file.close()
 
-    def _line_get_poly(self, obj,
-                       top_level_piece,
-                       current):
-        camera_position = self.camera_position
-
-        points = [current.matrix * p + current.position - camera_position for p in obj.points]
-
-        return self._common_get_poly(obj, top_level_piece, current.colour, points)
-
     def _get_polygon(self, top_level_piece, colour, projections):  # pylint: disable=no-self-use
         return [Polygon(min(p.z for p in projections),
                         projections,
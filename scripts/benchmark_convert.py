@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Time and peak memory of ldr2pov and ldr2svg on a large generated model
+
+  python scripts/benchmark_convert.py --lines 100000
+
+The model is made of bricks of the configured parts library and of quads,
+each conversion runs in its own process so that its peak RSS is reported alone.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from ldraw.tools import vector_position
+from ldraw.tools.ldr2pov import ldr2pov
+from ldraw.tools.ldr2svg import ldr2svg
+from ldraw.writers.svg import SVGArgs
+
+BRICKS = ['3001', '3003', '3004', '3010', '3020', '3024']
+COLOURS = [1, 2, 4, 7, 14, 15, 47]
+
+
+def write_model(path, lines):
+    """ a model with lines bricks and quadrilaterals at random positions """
+    rand = random.Random(0)
+    with open(path, 'w') as model:
+        for _ in range(lines):
+            colour = rand.choice(COLOURS)
+            x, y, z = (rand.randint(-50, 50) * 20 for _ in range(3))
+            if rand.random() < 0.8:
+                model.write('1 %i %i %i %i 1 0 0 0 1 0 0 0 1 %s.dat\n'
+                            % (colour, x, y, z, rand.choice(BRICKS)))
+            else:
+                model.write('4 %i %i %i %i %i %i %i %i %i %i %i %i %i\n'
+                            % (colour, x, y, z, x + 20, y, z, x + 20, y, z + 20, x, y, z + 20))
+
+
+def peak_rss():
+    """ peak resident set size of this process, in MB """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def convert(output_format, model_path, output_path, queue):
+    """ runs one conversion, puts its duration and peak RSS in the queue """
+    start = time.time()
+    if output_format == 'pov':
+        ldr2pov(model_path, output_path, vector_position('2000,2000,2000'),
+                vector_position('0,0,0'), '#123456')
+    else:
+        ldr2svg(model_path, output_path, vector_position('2000,2000,2000'),
+                vector_position('0,0,0'), SVGArgs(800, 800))
+    queue.put((time.time() - start, peak_rss()))
+
+
+def main():
+    """ benchmark main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--formats', nargs='+', default=['pov', 'svg'], choices=['pov', 'svg'])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='pyldraw-benchmark-')
+    for lines in args.lines:
+        model_path = os.path.join(directory, 'model%i.ldr' % lines)
+        write_model(model_path, lines)
+        for output_format in args.formats:
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=convert,
+                args=(output_format, model_path, model_path + '.' + output_format, queue))
+            process.start()
+            duration, rss = queue.get()
+            process.join()
+            print('%s %7i lines: %7.2fs, peak RSS %7.1f MB' % (output_format, lines, duration, rss))
+
+
+if __name__ == '__main__':
+    main()
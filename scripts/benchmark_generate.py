@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Time of the library generation with each template engine
+
+  python scripts/benchmark_generate.py --parts-lst path/to/parts.lst
+
+Every engine generates the whole library in its own directory,
+the generated files are then checked to be the same.
+"""
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+from ldraw import generate
+from ldraw.config import get_config
+from ldraw.generation.emitter import ENGINES
+
+
+def generated_files(output_dir):
+    """ the paths of the generated files, relative to output_dir """
+    return sorted(os.path.relpath(os.path.join(dirpath, filename), output_dir)
+                  for dirpath, _, filenames in os.walk(output_dir)
+                  for filename in filenames)
+
+
+def main():
+    """ benchmark main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts-lst', default=None, help='parts.lst, the configured one by default')
+    parser.add_argument('--jobs', type=int, default=1)
+    args = parser.parse_args()
+    parts_lst = args.parts_lst if args.parts_lst is not None else get_config().parts_lst
+
+    directory = tempfile.mkdtemp(prefix='pyldraw-benchmark-')
+    outputs = {}
+    for engine in ENGINES:
+        output_dir = os.path.join(directory, engine)
+        start = time.time()
+        generate(parts_lst, output_dir, force=True, jobs=args.jobs, engine=engine)
+        print('%-10s %7.2fs' % (engine, time.time() - start))
+        outputs[engine] = output_dir
+
+    reference, *others = ENGINES
+    for engine in others:
+        files = generated_files(outputs[reference])
+        _, mismatch, errors = filecmp.cmpfiles(outputs[reference], outputs[engine], files, shallow=False)
+        print('%s and %s: %s' % (reference, engine,
+                                'same files' if not mismatch + errors else 'differ: %s' % (mismatch + errors)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Time of the loading of a parts.lst by Parts, against the line by line loader it replaced
+
+  python scripts/benchmark_parts_lst.py --parts-lst path/to/parts.lst
+
+Both loaders fill the parts dicts from the same file, the dicts are then checked to be the same.
+"""
+import argparse
+import codecs
+import time
+
+from ldraw.config import get_config
+from attrdict import AttrDict
+
+from ldraw.parts import DOT_DAT, MINIFIG_SECTIONS, Parts
+
+MINIFIG_DESCRIPTIONS = {
+    'torsos': 'Torso',
+    'hips': 'Hip',
+    'arms': 'Arm',
+    'heads': 'Head',
+    'accessories': 'Accessory',
+    'hands': 'Hand',
+    'hats': 'Hat',
+    'legs': 'Leg'
+}
+
+
+def legacy_section_find(parts, pieces):
+    """ the section_find of the line by line loader """
+    code = pieces[0]
+    description = pieces[1].strip()
+    if not description.startswith("Minifig "):
+        return code, description
+    for key, section in parts.parts['minifig'].items():
+        searched = MINIFIG_DESCRIPTIONS[key]
+        index_find = description.find(searched)
+        if index_find != -1 and (
+                index_find + len(searched) == len(description) or
+                description[index_find + len(searched)] == " "):
+            if description.startswith("Minifig "):
+                description = description[8:]
+                if description.startswith("(") and description.endswith(")"):
+                    description = description[1:-1]
+                section[description] = code
+            break
+    else:
+        if description.startswith("Minifig "):
+            description = description[8:]
+            if description.startswith("(") and description.endswith(")"):
+                description = description[1:-1]
+            parts.parts['minifig']['accessories'][description] = code
+    return code, description
+
+
+def legacy_load(parts, parts_lst):
+    """ the line by line loader """
+    parts_lst_file = codecs.open(parts_lst, 'r', encoding='utf-8')
+    for line in parts_lst_file.readlines():
+        pieces = DOT_DAT.split(line)
+        if len(pieces) != 2:
+            break
+        code, description = legacy_section_find(parts, pieces)
+        parts.parts_by_name[description] = code
+        parts.parts_by_code[code] = description
+        parts.parts_by_code_name[(code, description)] = None
+
+
+def load(parts_lst, loader, repeat):
+    """ the best time of a loader, and the dicts it filled """
+    best = None
+    for _ in range(repeat):
+        parts = Parts(parts_lst, headers=None)
+        for attribute in ('parts_by_name', 'parts_by_code', 'parts_by_code_name'):
+            setattr(parts, attribute, {})
+        parts.parts = AttrDict(minifig=AttrDict((key, {}) for key, _ in MINIFIG_SECTIONS))
+        start = time.time()
+        loader(parts, parts_lst)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, (parts.parts_by_name, parts.parts_by_code, list(parts.parts_by_code_name),
+                  {key: dict(section) for key, section in parts.parts['minifig'].items()})
+
+
+def main():
+    """ benchmark main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts-lst', default=None, help='parts.lst, the configured one by default')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    parts_lst = args.parts_lst if args.parts_lst is not None else get_config().parts_lst
+
+    results = {}
+    for name, loader in (('line by line', legacy_load), ('single pass', Parts.try_load)):
+        elapsed, results[name] = load(parts_lst, loader, args.repeat)
+        print('%-13s %7.2fms' % (name, elapsed * 1000))
+    print('same parts' if results['line by line'] == results['single pass'] else 'different parts')
+
+
+if __name__ == '__main__':
+    main()
@@ -30,12 +30,13 @@ setup(
             "ldr2png = ldraw.tools.ldr2png:main",
             "ldr2pov = ldraw.tools.ldr2pov:main",
             "ldr2svg = ldraw.tools.ldr2svg:main",
+            "ldrcache = ldraw.tools.ldrcache:main",
+            "ldrupdate = ldraw.tools.ldrupdate:main",
         ],
     },
     install_requires=[
         "appdirs",
         "numpy",
-        "pymklist",
         "pystache",
         "attrdict",
         "progress",
@@ -0,0 +1,10 @@
+import mock
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmp_path_factory):
+    """ the parse cache and the other cached files are written to a temporary directory """
+    path = str(tmp_path_factory.mktemp('cache'))
+    with mock.patch('appdirs.user_cache_dir', side_effect=lambda *args, **kwargs: path):
+        yield path
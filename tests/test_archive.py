@@ -0,0 +1,107 @@
+import os
+import zipfile
+
+import pytest
+from mklist.generate import generate_parts_lst, get_parts_lst as mklist_get_parts_lst
+
+from ldraw.archive import ARCHIVE_NAME, LibraryArchive, get_parts_lst, write_parts_lst
+from ldraw.cache import LRUPartCache
+from ldraw.parts import Part, Parts, PartError
+from ldraw.pieces import Piece
+
+
+@pytest.fixture
+def complete_zip(tmp_path):
+    """ a complete.zip of the test library, with deflated and stored members """
+    path = os.path.join(str(tmp_path), ARCHIVE_NAME)
+    with zipfile.ZipFile(path, 'w') as archive:
+        for root, _, files in os.walk('tests/test_ldraw'):
+            for name in sorted(files):
+                if name in ('parts.lst', 'p.lst'):
+                    continue
+                file_path = os.path.join(root, name)
+                member = 'ldraw/' + os.path.relpath(file_path, 'tests/test_ldraw').replace(os.sep, '/')
+                compression = zipfile.ZIP_STORED if name == 'stud.dat' else zipfile.ZIP_DEFLATED
+                archive.write(file_path, member, compression)
+    return path
+
+
+def test_archive_read(complete_zip):
+    with LibraryArchive(complete_zip) as archive:
+        assert 'parts/s/3001s01.dat' in archive.members
+        for name in ('parts/3001.dat', 'p/stud.dat'):
+            with open(os.path.join('tests/test_ldraw', name), 'rb') as part_file:
+                content = part_file.read()
+            assert bytes(archive.read(name)) == content
+            assert bytes(archive.read(archive.member_path(name))) == content
+            assert archive.read(name, 10) == content[:10]
+        assert archive.first_line('parts/3001.dat') == '0 Brick  2 x  4\n'
+        pytest.raises(IOError, lambda: archive.read('parts/3002.dat'))
+
+
+def test_archive_parts_lst(complete_zip, tmp_path):
+    with LibraryArchive(complete_zip) as archive:
+        write_parts_lst(archive, os.path.join(str(tmp_path), 'parts.lst'))
+    generate_parts_lst('description', 'tests/test_ldraw/parts',
+                       os.path.join(str(tmp_path), 'mklist.lst'))
+    with open(os.path.join(str(tmp_path), 'parts.lst'), 'rb') as parts_lst, \
+            open(os.path.join(str(tmp_path), 'mklist.lst'), 'rb') as mklist_lst:
+        assert parts_lst.read() == mklist_lst.read()
+
+
+def test_archive_parts_lst_not_utf8(tmp_path):
+    parts_dir = os.path.join(str(tmp_path), 'parts')
+    os.mkdir(parts_dir)
+    contents = {
+        '1.dat': b'0 Brick 1\n0 Name: 1.dat\n0 Author: \xe9\n',
+        '2.dat': b'0 Brick 2\n0 Name: 2.dat\n0 Author: \xc3\xa9\n',
+        # the non UTF-8 byte is after the first buffer mklist decodes
+        '3.dat': b'0 Brick 3\n' + b'0\n' * 5000 + b'0 Author: \xe9\n',
+    }
+    path = os.path.join(str(tmp_path), ARCHIVE_NAME)
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, content in contents.items():
+            with open(os.path.join(parts_dir, name), 'wb') as part_file:
+                part_file.write(content)
+            archive.writestr('ldraw/parts/' + name, content, zipfile.ZIP_DEFLATED)
+
+    with LibraryArchive(path) as archive:
+        rows = get_parts_lst(archive)
+        pytest.raises(UnicodeDecodeError, lambda: archive.first_line('parts/1.dat'))
+    assert rows == mklist_get_parts_lst(parts_dir, 'description')
+    assert [row['filename'] for row in rows] == ['2.dat', '3.dat']
+
+
+@pytest.mark.parametrize('next_to_parts_lst', [False, True])
+def test_parts_from_archive(complete_zip, tmp_path, next_to_parts_lst):
+    if next_to_parts_lst:
+        parts_lst = os.path.join(str(tmp_path), 'parts.lst')
+        with LibraryArchive(complete_zip) as archive:
+            write_parts_lst(archive, parts_lst)
+        parts = Parts(parts_lst, cache=LRUPartCache())
+    else:
+        parts = Parts(complete_zip, cache=LRUPartCache())
+    extracted = Parts('tests/test_ldraw/parts.lst')
+
+    assert parts.parts_by_code == extracted.parts_by_code
+    assert parts.colours_by_code.keys() == extracted.colours_by_code.keys()
+
+    part = parts.part(code='3001')
+    assert part.path == os.path.join(complete_zip, 'parts', '3001.dat')
+    objects = list(part.objects)
+    extracted_objects = list(extracted.part(code='3001').objects)
+    assert [type(obj) for obj in objects] == [type(obj) for obj in extracted_objects]
+    assert [obj.part for obj in objects if isinstance(obj, Piece)] == \
+           [obj.part for obj in extracted_objects if isinstance(obj, Piece)]
+    assert part.description == 'Brick 2 x 4'
+    assert parts.part(code='s\\3001s01').path == os.path.join(complete_zip, 'parts', 's', '3001s01.dat')
+    assert parts.part(code='STUD').path == os.path.join(complete_zip, 'p', 'stud.dat')
+    assert parts.part(code='unknown\\3001s01') is None
+    pytest.raises(PartError, lambda: parts.part(code='3002'))
+
+
+def test_part_from_archive_errors(complete_zip):
+    with LibraryArchive(complete_zip) as archive:
+        part = Part(archive.member_path('parts/3002.dat'), archive=archive)
+        pytest.raises(PartError, lambda: part.header)
+        pytest.raises(PartError, lambda: list(part.objects))
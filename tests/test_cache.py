@@ -0,0 +1,158 @@
+import os
+import shutil
+
+import pytest
+from mock import patch
+
+from ldraw.cache import HeaderIndex, LRUPartCache, PartCache
+from ldraw.geometry import Identity, Vector
+from ldraw.lines import Quadrilateral
+from ldraw.parts import Part, Parts
+from ldraw.pieces import Piece
+
+
+@pytest.fixture
+def part_path(tmp_path):
+    path = os.path.join(str(tmp_path), '3001.dat')
+    shutil.copy(os.path.join('tests', 'test_ldraw', 'parts', '3001.dat'), path)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PartCache(os.path.join(str(tmp_path), 'cache'))
+
+
+def test_cache_roundtrip(cache, part_path):
+    assert cache.load(part_path) is None
+
+    objects = list(Part(part_path, cache).objects)
+    cached = cache.load(part_path)
+
+    assert len(cached) == len(objects)
+    assert isinstance(cached[-4], Piece)
+    assert cached[-4].part == 'S\\3001S01'
+    assert isinstance(cached[-2], Quadrilateral)
+
+
+def test_cache_skips_parsing(cache, part_path):
+    list(Part(part_path, cache).objects)
+
+    with patch.object(Part, '_parse', side_effect=AssertionError):
+        part = Part(part_path, cache)
+        assert len(list(part.objects)) == len(cache.load(part_path))
+        assert part.category is None
+
+
+def test_cache_invalidated(cache, part_path):
+    list(Part(part_path, cache).objects)
+
+    with open(part_path, 'a') as part_file:
+        part_file.write('2 24 0 0 0 1 1 1\n')
+
+    assert cache.load(part_path) is None
+    assert len(list(Part(part_path, cache).objects)) == len(cache.load(part_path))
+
+
+def test_cache_clear(cache, part_path):
+    list(Part(part_path, cache).objects)
+    cache.clear()
+
+    assert cache.load(part_path) is None
+
+
+def test_parts_use_cache(cache):
+    parts = Parts('tests/test_ldraw/parts.lst', cache=cache)
+    part = parts.part(code='3001')
+
+    assert part.cache is cache
+    list(part.objects)
+    assert cache.load(part.path) is not None
+
+
+def test_lru_eviction():
+    cache = LRUPartCache(max_parts=2, max_objects=5)
+    cache.store('a', [1, 2])
+    cache.store('b', [3])
+    assert cache.load('a') == (1, 2)
+    cache.store('c', [4])
+
+    assert 'b' not in cache
+    assert len(cache) == 2
+    cache.store('d', [5, 6, 7, 8])
+
+    assert 'a' not in cache and 'c' in cache
+    assert cache.size == 5
+    cache.store('e', [9])
+
+    assert list(cache._entries) == ['d', 'e']
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert cache.load('a') is None
+    assert cache.misses == 1
+
+
+def test_lru_backend(cache, part_path):
+    lru = LRUPartCache(backend=cache)
+    objects = list(Part(part_path, lru).objects)
+
+    assert cache.load(part_path) is not None
+    assert lru.load(part_path) is lru.load(part_path)
+    assert lru.hits == 2
+
+    lru.clear()
+    assert len(lru) == 0
+    assert len(lru.load(part_path)) == len(objects)
+    assert part_path in lru
+
+
+def test_parts_lru():
+    parts = Parts('tests/test_ldraw/parts.lst')
+    list(parts.part(code='3001').objects)
+    hits = parts.cache.hits
+    list(parts.part(code='3001').objects)
+
+    assert parts.cache.hits == hits + 1
+
+
+def test_header_index(tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree('tests/test_ldraw', library)
+    parts_lst = os.path.join(library, 'parts.lst')
+    headers = HeaderIndex(os.path.join(str(tmp_path), 'headers'))
+    assert headers.load(parts_lst) is None
+
+    parts = Parts(parts_lst, headers=headers)
+    assert headers.load(parts_lst) == {'3001': None}
+
+    with patch.object(Part, 'category', property(lambda self: 1 / 0)):
+        assert Parts(parts_lst, headers=headers).parts_by_category == parts.parts_by_category
+
+    with open(parts_lst, 'a') as parts_lst_file:
+        parts_lst_file.write('3002.dat                  Brick  2 x  3\n')
+    assert headers.load(parts_lst) is None
+
+    headers.store(parts_lst, {'3001': None})
+    headers.clear()
+    assert headers.load(parts_lst) is None
+
+
+def test_lru_objects_not_shared(part_path):
+    lru = LRUPartCache()
+    objects = list(Part(part_path, lru).objects)
+    piece = next(obj for obj in objects if isinstance(obj, Piece))
+    quadrilateral = next(obj for obj in objects if isinstance(obj, Quadrilateral))
+    piece.position.x = 100
+    piece.matrix.rows[0][0] = 2
+    quadrilateral.colour = 4
+    quadrilateral.point1 = Vector(1, 2, 3)
+    objects[0].text = 'changed'
+
+    again = list(Part(part_path, lru).objects)
+    assert lru.hits == 1
+    piece = next(obj for obj in again if isinstance(obj, Piece))
+    quadrilateral = next(obj for obj in again if isinstance(obj, Quadrilateral))
+    assert piece.position == Vector(0, 0, 0)
+    assert piece.matrix == Identity()
+    assert quadrilateral.colour == 16
+    assert quadrilateral.point1 == Vector(-40, 0, -20)
+    assert again[0].text == 'Brick 2 x 4'
@@ -1,4 +1,10 @@
-from ldraw.colour import Colour
+import pickle
+
+import pytest
+
+from ldraw.colour import Colour, Colours, get_colour
+from ldraw.parts import colour_from_str
+
 
 def test_colour_equality():
 
@@ -16,4 +22,40 @@ def test_colour_hash():
     c1 = Colour(code=12)
     c2 = Colour(code=12)
 
-    assert len({c1,c2}) == 1
\ No newline at end of file
+    assert len({c1,c2}) == 1
+
+def test_colour_interned():
+    assert get_colour(12) is get_colour(12)
+    assert colour_from_str('12') is get_colour(12)
+    assert colour_from_str('0x2FF8000') is get_colour(0x2FF8000)
+
+
+def test_colour_immutable():
+    colour = Colour(code=12)
+    with pytest.raises(AttributeError):
+        colour.rgb = "#000000"
+
+
+def test_direct_colour():
+    colour = colour_from_str('0x2FF8000')
+    assert colour.code == 0x2FF8000
+    assert colour.svg_fill == "#FF8000"
+    assert colour.rgba == (255, 128, 0, 255)
+    assert colour.pov_pigment == "rgb <1.0, 0.5, 0.0>"
+
+
+def test_colour_pickle():
+    assert pickle.loads(pickle.dumps(get_colour(12))) is get_colour(12)
+    colour = Colour(189, "Reddish_Gold", "#AC8247", 255, ['PEARLESCENT'])
+    unpickled = pickle.loads(pickle.dumps(colour))
+    assert (unpickled.name, unpickled.rgba, unpickled.colour_attributes) == \
+        ("Reddish_Gold", (172, 130, 71, 255), ['PEARLESCENT'])
+
+
+def test_colours_missing():
+    colours = Colours()
+    colours[4] = Colour(4, "Red", "#C91A09", 255, [])
+    assert colours[4].svg_fill == "#C91A09"
+    assert colours[12] is get_colour(12)
+    assert colours[12].svg_fill == "#ffffff"
+    assert 12 not in colours
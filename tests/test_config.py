@@ -1,14 +1,23 @@
 import os
 import tempfile
 
+import pytest
 import yaml
 from mock import patch, mock_open
 from yaml import YAMLError
 
-from ldraw.config import get_config, write_config
+from ldraw import config
+from ldraw.config import Config, get_config, reload_config, write_config
 from ldraw.dirs import get_data_dir
 
 
+@pytest.fixture(autouse=True)
+def no_cached_config():
+    config._CONFIGS.clear()
+    yield
+    config._CONFIGS.clear()
+
+
 def fails(*args, **kwargs):
     raise YAMLError()
 
@@ -38,4 +47,26 @@ def test_write_config(config_file_path_mock):
     data = {'parts.lst':'2468'}
     write_config(data)
 
-    assert yaml.load(open(tmp, 'r'), Loader=yaml.SafeLoader) == data
\ No newline at end of file
+    assert yaml.load(open(tmp, 'r'), Loader=yaml.SafeLoader) == data
+
+
+def test_config_cached(tmp_path):
+    path = os.path.join(str(tmp_path), 'config.yml')
+    with open(path, 'w') as config_file:
+        config_file.write('parts.lst: /home/file_path\njobs: 4\n')
+
+    with patch('ldraw.config.get_config_file_path', side_effect=lambda: path):
+        loaded = get_config()
+        assert isinstance(loaded, Config)
+        assert (loaded.parts_lst, loaded.jobs, loaded.library_layout) == ('/home/file_path', 4, 'modules')
+        with patch('yaml.load', side_effect=fails):
+            assert get_config() is loaded
+        assert reload_config() == loaded and reload_config() is not loaded
+
+        with open(path, 'w') as config_file:
+            config_file.write('parts.lst: /home/other_path\n')
+        os.utime(path, ns=(0, 0))
+        assert get_config() == {'parts.lst': '/home/other_path'}
+
+        write_config(Config({'parts.lst': '/home/written'}))
+        assert get_config().parts_lst == '/home/written'
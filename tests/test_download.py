@@ -1,33 +1,221 @@
+import hashlib
+import importlib
 import os
+import threading
 import zipfile
+from http.server import HTTPServer, SimpleHTTPRequestHandler
 
 import appdirs
+import pytest
 from mock import *
 
 from ldraw import download, LDRAW_URL
+from ldraw.config import Config
+from ldraw.fetch import DownloadError, VALIDATOR_SUFFIX, extract, fetch
 
 
-@patch('os.path.exists', side_effect=lambda s: False)
-@patch('zipfile.ZipFile', spec=zipfile.ZipFile)
-@patch('ldraw.urlretrieve')
+@patch('ldraw.get_config', side_effect=lambda: Config())
+@patch('ldraw.fetch')
+@patch('ldraw.extract')
 @patch('ldraw.generate_parts_lst')
-@patch('ldraw.copy_tree')
-def test_download(copy_tree_mock, generate_parts_lst_mock, urlretrieve_mock,
-                  zip_mock, os_path_exists_mock, tmp_path):
+def test_download(generate_parts_lst_mock, extract_mock, fetch_mock, get_config_mock, tmp_path):
     output_dir = str(tmp_path)
     tmp_ldraw = appdirs.user_cache_dir('pyldraw')
     parts_lst_path = os.path.join(output_dir, 'parts.lst')
     output_2 = os.path.join(output_dir, 'parts')
     download(output_dir)
 
-    urlretrieve_mock.assert_called_once_with(LDRAW_URL,
-                                             filename=os.path.join(tmp_ldraw, 'complete.zip'))
+    fetch_mock.assert_called_once_with(LDRAW_URL, os.path.join(tmp_ldraw, 'complete.zip'), None)
 
-    zip_mock.assert_called_once_with(os.path.join(tmp_ldraw, 'complete.zip'), 'r')
-
-    copy_tree_mock.assert_called_once_with(os.path.join(tmp_ldraw,'ldraw'), output_dir)
+    extract_mock.assert_called_once_with(os.path.join(tmp_ldraw, 'complete.zip'), output_dir,
+                                         prefix='ldraw/')
 
     generate_parts_lst_mock.assert_called_once_with('description', output_2, parts_lst_path)
 
 
+class RangeHandler(SimpleHTTPRequestHandler):
+    """
+    serves files, and the end of a file for a range request if its If-Range
+    is the Last-Modified of the file
+    """
+    # the status codes of the responses
+    statuses = []
+
+    def send_response(self, code, message=None):
+        RangeHandler.statuses.append(code)
+        SimpleHTTPRequestHandler.send_response(self, code, message)
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        last_modified = self.date_time_string(int(os.path.getmtime(path)))
+        range_header = self.headers.get('Range')
+        if range_header is None or self.headers.get('If-Range') != last_modified:
+            return SimpleHTTPRequestHandler.send_head(self)
+        start = int(range_header[len('bytes='):].rstrip('-'))
+        size = os.path.getsize(path)
+        if start >= size:
+            self.send_response(416)
+            self.send_header('Content-Range', 'bytes */%i' % size)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+        served = open(path, 'rb')
+        served.seek(start)
+        self.send_response(206)
+        self.send_header('Content-Length', str(size - start))
+        self.send_header('Content-Range', 'bytes %i-%i/%i' % (start, size - 1, size))
+        self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        return served
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    served_dir = tmp_path / 'served'
+    served_dir.mkdir()
+    complete_zip = str(served_dir / 'complete.zip')
+    with zipfile.ZipFile(complete_zip, 'w') as archive:
+        archive.writestr('ldraw/LDConfig.ldr', '0 LDraw.org Configuration File\n')
+        for i in range(10):
+            archive.writestr('ldraw/parts/%i.dat' % i, '0 Part %i\n' % i)
+            archive.writestr('ldraw/p/prim%i.dat' % i, '0 Primitive %i\n' % i)
+        archive.writestr('ldraw/parts/s/1s01.dat', '0 ~Subpart\n')
+    cwd = os.getcwd()
+    os.chdir(str(served_dir))
+    RangeHandler.statuses = []
+    server = HTTPServer(('127.0.0.1', 0), RangeHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:%i/complete.zip' % server.server_port, complete_zip
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        os.chdir(cwd)
+
+
+def _content(complete_zip):
+    with open(complete_zip, 'rb') as served:
+        return served.read()
+
+
+def _fetched(retrieved):
+    assert not os.path.exists(retrieved + '.part')
+    assert not os.path.exists(retrieved + '.part' + VALIDATOR_SUFFIX)
+    with open(retrieved, 'rb') as fetched:
+        return fetched.read()
+
+
+def test_fetch_resume(mirror, tmp_path):
+    url, complete_zip = mirror
+    content = _content(complete_zip)
+    sha256 = hashlib.sha256(content).hexdigest()
+    retrieved = str(tmp_path / 'complete.zip')
+    # an interrupted download
+    # Bar.goto calls next, the download is interrupted after two chunks
+    # ldraw.fetch is also the name of the function in the ldraw package
+    fetch_module = importlib.import_module('ldraw.fetch')
+    with patch.object(fetch_module, 'CHUNK_SIZE', 100), \
+            patch.object(fetch_module.Bar, 'next', side_effect=[None, None, IOError('interrupted')]):
+        with pytest.raises(IOError):
+            fetch(url, retrieved, sha256)
+    assert os.path.getsize(retrieved + '.part') == 200
+    assert os.path.exists(retrieved + '.part' + VALIDATOR_SUFFIX)
+
+    fetch(url, retrieved, sha256)
+
+    assert RangeHandler.statuses == [200, 206]
+    assert _fetched(retrieved) == content
+
+
+def test_fetch_resume_complete(mirror, tmp_path):
+    url, complete_zip = mirror
+    content = _content(complete_zip)
+    retrieved = str(tmp_path / 'complete.zip')
+    fetch(url, retrieved)
+    # the download was interrupted after the last chunk
+    os.rename(retrieved, retrieved + '.part')
+    with open(retrieved + '.part' + VALIDATOR_SUFFIX, 'w') as validator:
+        validator.write(RangeHandler.date_time_string(None, int(os.path.getmtime(complete_zip))))
+
+    fetch(url, retrieved, hashlib.sha256(content).hexdigest())
+
+    assert RangeHandler.statuses == [200, 416]
+    assert _fetched(retrieved) == content
+
+
+@pytest.mark.parametrize('validator', [
+    # the partial file of another version of the file
+    'Thu, 01 Jan 1970 00:00:00 GMT',
+    # the partial file of an unknown version of the file
+    None,
+])
+def test_fetch_restart(mirror, tmp_path, validator):
+    url, complete_zip = mirror
+    content = _content(complete_zip)
+    retrieved = str(tmp_path / 'complete.zip')
+    with open(retrieved + '.part', 'w') as partial_file:
+        partial_file.write('stale')
+    if validator is not None:
+        with open(retrieved + '.part' + VALIDATOR_SUFFIX, 'w') as validator_file:
+            validator_file.write(validator)
+
+    fetch(url, retrieved)
+
+    assert RangeHandler.statuses == [200]
+    assert _fetched(retrieved) == content
+
+
+def test_fetch_restart_bigger(mirror, tmp_path):
+    url, complete_zip = mirror
+    content = _content(complete_zip)
+    retrieved = str(tmp_path / 'complete.zip')
+    # the partial file of the same version of the file, but longer than the file
+    with open(retrieved + '.part', 'wb') as partial:
+        partial.write(content + b'garbage')
+    with open(retrieved + '.part' + VALIDATOR_SUFFIX, 'w') as validator:
+        validator.write(RangeHandler.date_time_string(None, int(os.path.getmtime(complete_zip))))
+
+    fetch(url, retrieved, hashlib.sha256(content).hexdigest())
+
+    assert RangeHandler.statuses == [416, 200]
+    assert _fetched(retrieved) == content
+
+
+def test_fetch_checksum(mirror, tmp_path):
+    url, _ = mirror
+    retrieved = str(tmp_path / 'complete.zip')
+    with pytest.raises(DownloadError):
+        fetch(url, retrieved, '0' * 64)
+    assert not os.path.exists(retrieved)
+    assert not os.path.exists(retrieved + '.part')
+    assert not os.path.exists(retrieved + '.part' + VALIDATOR_SUFFIX)
+
+
+def test_extract(mirror, tmp_path):
+    _, complete_zip = mirror
+    output_dir = str(tmp_path / 'ldraw')
+    extract(complete_zip, output_dir, jobs=3)
+
+    assert sorted(os.listdir(output_dir)) == ['LDConfig.ldr', 'p', 'parts']
+    assert sorted(os.listdir(os.path.join(output_dir, 'parts'))) == \
+           sorted(['%i.dat' % i for i in range(10)] + ['s'])
+    with open(os.path.join(output_dir, 'p', 'prim3.dat')) as primitive:
+        assert primitive.read() == '0 Primitive 3\n'
+    assert os.path.exists(os.path.join(output_dir, 'parts', 's', '1s01.dat'))
+
+
+@patch('ldraw.get_config', side_effect=lambda: Config())
+def test_download_archive(get_config_mock, mirror, tmp_path):
+    url, _ = mirror
+    output_dir = str(tmp_path / 'ldraw')
+    with patch('ldraw.get_cache_dir', side_effect=lambda: str(tmp_path)):
+        download(output_dir, url, extract_library=False)
 
+    assert sorted(os.listdir(output_dir)) == ['complete.zip', 'parts.lst']
+    with open(os.path.join(output_dir, 'parts.lst')) as parts_lst:
+        assert parts_lst.readline().startswith('0.dat')
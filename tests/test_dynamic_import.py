@@ -5,15 +5,18 @@ import os
 import mock
 import pytest
 
+import ldraw
+
 from ldraw import download, CustomImporter
 from ldraw.colour import Colour
+from ldraw.config import Config
 
 
 @pytest.fixture
 def mocked_parts_lst():
     parts_lst_path = os.path.join('tests', 'test_ldraw', 'parts.lst')
     library_path = tempfile.mkdtemp()
-    with mock.patch('ldraw.get_config', side_effect=lambda: {'parts.lst': parts_lst_path, 'library': library_path}):
+    with mock.patch('ldraw.get_config', side_effect=lambda: Config({'parts.lst': parts_lst_path, 'library': library_path})):
         yield parts_lst_path
 
 
@@ -23,4 +26,19 @@ def test_dynamic_import(mocked_parts_lst):
     assert Reddish_Gold == Colour(189, "Reddish_Gold", "#AC8247", 255, ['PEARLESCENT'])
     assert Brick2X4 == "3001"
 
-    CustomImporter.clean()
\ No newline at end of file
+    CustomImporter.clean()
+
+def test_dynamic_import_validates_once(mocked_parts_lst):
+    CustomImporter.clean()
+    with mock.patch('ldraw.try_download_generate_lib', wraps=ldraw.try_download_generate_lib) as validate:
+        from ldraw.library import colours
+        from ldraw.library.parts import others
+        from ldraw.library import parts
+
+    assert validate.call_count == 1
+    assert others.__name__ == 'ldraw.library.parts.others'
+    assert parts.others is others
+    assert colours.__spec__.origin == os.path.join(CustomImporter.library_path, 'library', 'colours.py')
+
+    CustomImporter.clean()
+    assert CustomImporter.library_path is None
@@ -1,5 +1,6 @@
 import contextlib
 import glob
+import importlib
 import os
 import sys
 import tempfile
@@ -10,6 +11,7 @@ import pytest
 
 from ldraw import CustomImporter
 from ldraw.compat import do_execfile
+from ldraw.config import Config
 
 
 @pytest.fixture(scope='module')
@@ -17,14 +19,14 @@ def mocked_parts_lst():
     parts_lst_path = os.path.join('tests', 'test_ldraw2', 'parts.lst')
     library_path = tempfile.mkdtemp()
 
-    def get_config(): return {
+    def get_config(): return Config({
         'parts.lst': parts_lst_path,
         'library': library_path,
         'others_threshold': 0
-    }
+    })
 
     with mock.patch('ldraw.parts.get_config', side_effect=get_config):
-        CustomImporter().load_module('ldraw.library')
+        importlib.import_module('ldraw.library')
         yield parts_lst_path
 
     CustomImporter.clean()
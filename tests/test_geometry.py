@@ -1,8 +1,11 @@
 import math
+import numpy
 import pytest
 import random
 
 from ldraw.geometry import Identity, Vector, MatrixError, Matrix, XAxis, YAxis, ZAxis, _rows_multiplication, Radians
+from ldraw.geometry import (CoordinateSystem, as_array, transform_points, project_points,
+                            degenerate_triangles, in_front)
 
 
 def test_matrix_rmul():
@@ -59,4 +62,36 @@ def test_mul_matrix_vector():
     m = Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
     v = Vector(42, 1, 0)
     v2 = m * v
-    assert v2 == Vector(44, 173, 302)
\ No newline at end of file
+    assert v2 == Vector(44, 173, 302)
+
+def test_transform_points(random_matrix):
+    vectors = [Vector(*row()) for i in range(10)]
+    position = Vector(1, -2, 3)
+    transformed = transform_points(as_array(vectors), random_matrix, position)
+
+    assert transformed.shape == (10, 3)
+    assert [Vector(*p) for p in transformed.tolist()] == [random_matrix * v + position for v in vectors]
+
+
+def test_project_points():
+    system = CoordinateSystem(Vector(0, 0, 1), Vector(1, 0, 0), Vector(0, 1, 0))
+    vectors = [Vector(*row()) for i in range(10)]
+    projected = project_points(as_array(vectors).reshape(5, 2, 3), system)
+
+    assert projected.shape == (5, 2, 3)
+    assert [Vector(*p) for p in projected.reshape(-1, 3).tolist()] == [system.project(v) for v in vectors]
+
+
+def test_degenerate_triangles():
+    points = numpy.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                          [[0, 0, 0], [1, 1, 1], [2, 2, 2]]], dtype=float)
+
+    assert degenerate_triangles(points[:, 0], points[:, 1], points[:, 2]).tolist() == [False, True]
+
+
+def test_in_front():
+    projections = numpy.full((3, 4, 3), -1.0)
+    projections[0, 3, 2] = 1.0
+    projections[1, 2, 2] = 0.0
+
+    assert in_front(projections, [3, 3, 4]).tolist() == [True, False, True]
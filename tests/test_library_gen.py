@@ -1,13 +1,18 @@
+import codecs
+import io
 import os
 from os.path import join
 
 import shutil
 import tempfile
 import mock
+import pystache
 import pytest
 
 from ldraw import CustomImporter, generate
 from ldraw.colour import Colour
+from ldraw.config import Config
+from ldraw.generation.emitter import Template
 
 
 @pytest.fixture
@@ -15,7 +20,7 @@ def mocked_library_path():
     part_lst_path = os.path.join('tests', 'test_ldraw', 'parts.lst')
     library_path = tempfile.mkdtemp()
     generate(part_lst_path, library_path)
-    with mock.patch('ldraw.get_config', side_effect=lambda: {'parts.lst': part_lst_path, 'library': library_path}):
+    with mock.patch('ldraw.get_config', side_effect=lambda: Config({'parts.lst': part_lst_path, 'library': library_path})):
         yield library_path
 
 
@@ -28,12 +33,91 @@ def test_library_gen_files(mocked_library_path):
                'colours.py',
                'license.txt',
                '__hash__',
+               '__manifest__',
                join('parts', '__init__.py'),
                join('parts', 'others.py')}
 
     assert content == {join('library', el) for el in library}
 
 
+def test_library_gen_incremental(tmp_path):
+    """ generating again only writes the files that changed """
+    ldraw_dir = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree(os.path.join('tests', 'test_ldraw'), ldraw_dir)
+    part_lst_path = os.path.join(ldraw_dir, 'parts.lst')
+    library_path = os.path.join(str(tmp_path), 'generated')
+    generate(part_lst_path, library_path)
+
+    generated = {name: os.path.join(library_path, 'library', name)
+                 for name in ('colours.py', join('parts', '__init__.py'), join('parts', 'others.py'))}
+    for path in generated.values():
+        os.utime(path, (0, 0))
+    shutil.copy(os.path.join(ldraw_dir, 'parts', '3001.dat'), os.path.join(ldraw_dir, 'parts', '3002.dat'))
+    with open(part_lst_path, 'a') as parts_lst:
+        parts_lst.write('3002.dat                  Brick  2 x  3\n')
+    generate(part_lst_path, library_path)
+
+    written = {name for name, path in generated.items() if os.stat(path).st_mtime != 0}
+    assert written == {join('parts', 'others.py')}
+    with open(generated[join('parts', 'others.py')]) as others:
+        assert 'Brick2X3 = "3002"' in others.read()
+
+    generate(part_lst_path, library_path, force=True)
+    assert os.stat(generated['colours.py']).st_mtime != 0
+
+
+def generated_files(library_path):
+    files = {}
+    for dirpath, _, filenames in os.walk(library_path):
+        for filename in filenames:
+            with open(os.path.join(dirpath, filename), 'rb') as generated:
+                files[os.path.relpath(os.path.join(dirpath, filename), library_path)] = generated.read()
+    return files
+
+
+def test_library_gen_jobs(tmp_path):
+    """ the library generated by a pool of processes is the same """
+    part_lst_path = os.path.join('tests', 'test_ldraw', 'parts.lst')
+    libraries = []
+    for jobs in (1, 2):
+        library_path = os.path.join(str(tmp_path), str(jobs))
+        generate(part_lst_path, library_path, jobs=jobs)
+        libraries.append(generated_files(library_path))
+
+    assert libraries[0] == libraries[1]
+
+
+def test_library_gen_engines(tmp_path):
+    """ the emitter generates the same library as pystache """
+    part_lst_path = os.path.join('tests', 'test_ldraw', 'parts.lst')
+    libraries = []
+    for engine in ('emitter', 'pystache'):
+        library_path = os.path.join(str(tmp_path), engine)
+        generate(part_lst_path, library_path, engine=engine)
+        libraries.append(generated_files(library_path))
+
+    assert libraries[0] == libraries[1]
+    pytest.raises(ValueError, lambda: generate(part_lst_path, str(tmp_path), engine='jinja'))
+
+
+@pytest.mark.parametrize('template', ['colours', 'parts', 'parts__init__'])
+def test_emitter_templates(template):
+    """ the emitter renders the templates like pystache """
+    path = os.path.join('ldraw', 'templates', template + '.mustache')
+    with codecs.open(path, 'r', encoding='utf-8') as template_file:
+        text = template_file.read()
+    context = {
+        'parts': [{'class_name': 'Brick2X4', 'code': '3001'}, {'class_name': '%s<&"', 'code': 5}],
+        'sections': [{'module_name': 'a<b"c'}, {'module_name': 'others'}],
+        'colours': [{'code': 189, 'full_name': 'A&"B', 'name': 'A<B', 'alpha': None,
+                     'rgb': '#AC8247', 'colour_attributes': ['PEARLESCENT']}],
+    }
+    for tested in (context, {}):
+        output = io.StringIO()
+        Template(text).write(tested, output)
+        assert output.getvalue() == pystache.render(text, tested)
+
+
 def test_library_gen_import(mocked_library_path):
     """ generated library is importable """
     from ldraw import library
@@ -56,3 +140,27 @@ def test_library_gen_import(mocked_library_path):
     assert ColoursByName == {expected_color.name: expected_color}
 
     assert Reddish_Gold == expected_color
+
+
+def test_library_gen_lazy(tmp_path):
+    """ the lazy library reads its parts from the index """
+    part_lst_path = os.path.join('tests', 'test_ldraw', 'parts.lst')
+    library_path = str(tmp_path)
+    generate(part_lst_path, library_path, layout='lazy')
+    assert os.path.exists(join(library_path, 'library', 'parts', '__index__.json'))
+
+    config = Config({'parts.lst': part_lst_path, 'library': library_path, 'library_layout': 'lazy'})
+    CustomImporter.clean()
+    with mock.patch('ldraw.get_config', side_effect=lambda: config):
+        from ldraw.library import parts
+        from ldraw.library.parts.others import Brick2X4
+        from ldraw.library.parts import others
+
+    try:
+        assert Brick2X4 == "3001"
+        assert parts.__all__ == ['others']
+        assert others.__all__ == ['Brick2X4']
+        assert 'Brick2X4' in dir(others) and 'others' in dir(parts)
+        pytest.raises(AttributeError, lambda: others.Brick2X3)
+    finally:
+        CustomImporter.clean()
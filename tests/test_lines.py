@@ -0,0 +1,68 @@
+import pickle
+
+from ldraw.cache import LRUPartCache
+from ldraw.geometry import Vector, Identity
+from ldraw.lines import Line, OptionalLine, Quadrilateral, Triangle
+from ldraw.parts import Part
+from ldraw.pieces import Piece
+
+
+def test_triangle_points():
+    triangle = Triangle(4, Vector(0, 0, 0), Vector(1, 0, 0), Vector(0, 1, 0))
+
+    assert triangle.colour == 4
+    assert triangle.point2 == Vector(1, 0, 0)
+    assert triangle.points == [Vector(0, 0, 0), Vector(1, 0, 0), Vector(0, 1, 0)]
+
+    triangle.point3 = Vector(0, 0, 2.5)
+    assert triangle.points[2] == Vector(0, 0, 2.5)
+
+
+def test_primitives_compact():
+    line = Line(1, Vector(0, 0, 0), Vector(1, 2, 3))
+    optional_line = OptionalLine(1, Vector(0, 0, 0), Vector(1, 2, 3), Vector(4, 5, 6), Vector(7, 8, 9))
+    quadrilateral = Quadrilateral(1, Vector(0, 0, 0), Vector(1, 0, 0), Vector(1, 1, 0), Vector(0, 1, 0))
+    piece = Piece(1, Vector(0, 0, 0), Identity(), '3001')
+
+    for obj in (line, optional_line, quadrilateral, piece, piece.position, piece.matrix):
+        assert not hasattr(obj, '__dict__')
+    assert optional_line.point4 == Vector(7, 8, 9)
+    assert len(quadrilateral.coordinates) == 12
+
+
+def test_primitives_pickle():
+    quadrilateral = Quadrilateral(1, Vector(0, 0, 0), Vector(1, 0, 0), Vector(1, 1, 0), Vector(0, 1, 0))
+    piece = Piece(1, Vector(1, 2, 3), Identity(), '3001')
+
+    quadrilateral, piece = pickle.loads(pickle.dumps((quadrilateral, piece), pickle.HIGHEST_PROTOCOL))
+
+    assert quadrilateral.points[2] == Vector(1, 1, 0)
+    assert piece.position == Vector(1, 2, 3)
+    assert piece.matrix == Identity()
+    assert piece.part == '3001'
+
+
+def test_primitive_points_write_back():
+    triangle = Triangle(4, Vector(0, 0, 0), Vector(1, 0, 0), Vector(0, 2, 0))
+
+    triangle.point2.x = 3
+    triangle.points[2].norm()
+    triangle.point1 += Vector(1, 1, 1)
+    assert triangle.points == [Vector(1, 1, 1), Vector(3, 0, 0), Vector(0, 1, 0)]
+
+    point = triangle.point2.copy()
+    point.x = 5
+    assert triangle.point2 == Vector(3, 0, 0)
+    assert pickle.loads(pickle.dumps(triangle.point2)) == Vector(3, 0, 0)
+
+
+def test_primitive_points_not_cached():
+    cache = LRUPartCache()
+    path = 'tests/test_ldraw/parts/3001.dat'
+    quadrilateral = next(obj for obj in Part(path, cache=cache).objects if isinstance(obj, Quadrilateral))
+    quadrilateral.point1.x = 0
+    quadrilateral.points[1].norm()
+    assert quadrilateral.point1 == Vector(0, 0, -20)
+
+    again = next(obj for obj in Part(path, cache=cache).objects if isinstance(obj, Quadrilateral))
+    assert again.points[:2] == [Vector(-40, 0, -20), Vector(-40, 24, -20)]
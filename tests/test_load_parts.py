@@ -1,8 +1,13 @@
+import os
+import shutil
+
 import pytest
 from mock import patch
 
 import ldraw
-from ldraw.parts import Parts, PartError
+from ldraw.lines import Comment, Quadrilateral
+from ldraw.parts import Part, PartHeader, Parts, PartError, read_header
+from ldraw.pieces import Piece
 
 
 def test_load_parts():
@@ -37,4 +42,122 @@ def new_try_load(path):
 
 @patch.object(ldraw.parts.Parts, 'try_load', side_effect=new_try_load)
 def test_cantreadpartslst(mocked):
-    pytest.raises(PartError, lambda: Parts('tests/test_ldraw/parts.lst') )
\ No newline at end of file
+    pytest.raises(PartError, lambda: Parts('tests/test_ldraw/parts.lst') )
+
+def test_part_lookup_case_insensitive():
+    p = Parts('tests/test_ldraw/parts.lst')
+
+    assert p.part(code='BOX5').path == 'tests/test_ldraw/p/box5.dat'
+    assert p.part(code='S\\3001S01').path == os.path.join('tests/test_ldraw/parts', 's', '3001s01.dat')
+    assert p.part(code='s/3001s01').path == os.path.join('tests/test_ldraw/parts', 's', '3001s01.dat')
+    assert p.part(code='unknown\\3001s01') is None
+    pytest.raises(PartError, lambda: p.part(code='3001s01'))
+    pytest.raises(PartError, lambda: p.part(code='3002'))
+
+
+def test_part_index_refresh(tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree('tests/test_ldraw', library)
+    p = Parts(os.path.join(library, 'parts.lst'))
+    assert p.part(code='3001').path == os.path.join(library, 'parts', '3001.dat')
+    assert p.refresh_index() is False
+
+    shutil.copy(os.path.join(library, 'parts', '3001.dat'),
+                os.path.join(library, 'parts', '3002.DAT'))
+    os.utime(os.path.join(library, 'parts'), ns=(0, 0))
+
+    assert p.part(code='3002').path == os.path.join(library, 'parts', '3002.DAT')
+
+
+def test_part_parse_errors(tmp_path):
+    path = os.path.join(str(tmp_path), 'bad.dat')
+    with open(path, 'w') as part_file:
+        part_file.write('0 Bad part\n\n3 16 0 0 0 1 0 0 0 1 0\n4 16 0 0 0 1 0 0 1 1 0 0 x 0\n')
+    with pytest.raises(PartError) as error:
+        list(Part(path).objects)
+    assert str(error.value) == 'Invalid quadrilateral data in %s at line 4' % path
+
+    with open(path, 'w') as part_file:
+        part_file.write('0 Bad part\n3 16 0 0 0 1 0 0 0 1\n')
+    with pytest.raises(PartError) as error:
+        list(Part(path).objects)
+    assert str(error.value) == 'Invalid triangle data in %s at line 2' % path
+
+    with open(path, 'w') as part_file:
+        part_file.write('0 Bad part\n7 16\n')
+    with pytest.raises(PartError) as error:
+        list(Part(path).objects)
+    assert str(error.value) == 'Unknown command (7) in %s at line 2' % path
+
+
+def test_part_parse_order():
+    objects = list(Part('tests/test_ldraw/parts/3001.dat').objects)
+    pieces = [obj for obj in objects if isinstance(obj, Piece)]
+    quadrilaterals = [obj for obj in objects if isinstance(obj, Quadrilateral)]
+
+    assert isinstance(objects[0], Comment)
+    assert pieces[0].part == 'S\\3001S01'
+    assert pieces[0].matrix.rows == [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    assert len(quadrilaterals[0].points) == 4
+
+
+def test_read_header(tmp_path):
+    path = os.path.join(str(tmp_path), 'header.dat')
+    with open(path, 'w') as part_file:
+        part_file.write('0 ~Brick  2 x  4 Header\n'
+                        '0 Name: header.dat\n'
+                        '0 Author: James Jessiman\n'
+                        '0 !LDRAW_ORG Part UPDATE 2004-03\n'
+                        '\n'
+                        '0 BFC CERTIFY CCW\n'
+                        '0 !CATEGORY Brick\n'
+                        '0 !KEYWORDS bricks, 2x4\n'
+                        '0 !KEYWORDS classic\n'
+                        '0 !HISTORY 2002-05-07 [unknown] BFC Certification\n'
+                        '0 !HISTORY 2004-02-08 [Steffen] Used s\\3001s01.dat\n'
+                        '1 16 0 0 0 1 0 0 0 1 0 0 0 1 s\\3001s01.dat\n'
+                        '0 !CATEGORY Plate\n'
+                        '0 BFC INVERTNEXT\n'
+                        '4 16 0 0 0 1 0 0 1 1 0 0 x 0\n')
+
+    header = read_header(path)
+    assert header == PartHeader(description='~Brick 2 x 4 Header', name='header.dat',
+                                author='James Jessiman', type='Part UPDATE 2004-03',
+                                category='Brick', keywords=('bricks', '2x4', 'classic'),
+                                history=('2002-05-07 [unknown] BFC Certification',
+                                         '2004-02-08 [Steffen] Used s\\3001s01.dat'),
+                                bfc='CERTIFY CCW')
+    part = Part(path)
+    assert part.header == header
+    assert (part.description, part.category) == ('~Brick 2 x 4 Header', 'Brick')
+    pytest.raises(AttributeError, lambda: setattr(header, 'category', 'Plate'))
+    pytest.raises(PartError, lambda: read_header(path + '.missing'))
+
+
+def test_minifig_sections(tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree('tests/test_ldraw', library)
+    with open(os.path.join(library, 'parts.lst'), 'ab') as parts_lst:
+        parts_lst.write('973.dat                        Minifig Torso\r\n'
+                        '3626.DAT                       Minifig Head with Hat\r\n'
+                        '3624.dat                       Minifig Hats Police\r\n'
+                        '970.dat                        Minifig (Hips and Legs)\r\n'
+                        '2343.dat                       Minifig Goblet\r\n'
+                        '3000.dat                       Not a .dat Minifig Leg\r\n'
+                        '3001.dat                       Not loaded after the invalid line\r\n'
+                        .encode('utf-8'))
+    for code in ('973', '3626', '3624', '970', '2343'):
+        with open(os.path.join(library, 'parts', code + '.dat'), 'w') as part_file:
+            part_file.write('0 Minifig part\n')
+    p = Parts(os.path.join(library, 'parts.lst'), others_threshold=0)
+    minifig = p.parts['minifig']
+
+    assert minifig['torsos'] == {'Torso': '973'}
+    # the first words are looked for in the order of the sections
+    assert minifig['hats'] == {'Head with Hat': '3626'}
+    # a word must be followed by a space or end the description
+    assert minifig['hips'] == {}
+    assert minifig['accessories'] == {'Hats Police': '3624', 'Hips and Legs': '970', 'Goblet': '2343'}
+    assert p.parts_by_code['3626'] == 'Head with Hat'
+    assert p.parts_by_code['3001'] == 'Brick  2 x  4'
+    assert '3000' not in p.parts_by_code
@@ -0,0 +1,68 @@
+import os
+
+import numpy
+import pytest
+
+from ldraw.cache import LRUPartCache
+from ldraw.colour import Colour
+from ldraw.geometry import Identity, Vector
+from ldraw.lines import Triangle
+from ldraw.parts import Parts
+from ldraw.writers.mesh import Mesh, MeshCache
+
+FILES = {
+    'parts.lst': 'a.dat                          Thing\n',
+    os.path.join('parts', 'a.dat'): '0 Thing\n'
+                                    '3 16 0 0 0 1 0 0 0 0 1\n'
+                                    '1 4 10 0 0 1 0 0 0 1 0 0 0 1 b.dat\n'
+                                    '1 15 0 0 0 1 0 0 0 1 0 0 0 1 light.dat\n'
+                                    '2 24 0 0 0 0 1 0\n',
+    os.path.join('parts', 'light.dat'): '0 Light\n'
+                                        '3 16 0 0 0 1 0 0 0 0 1\n',
+    os.path.join('p', 'b.dat'): '0 B\n'
+                                '4 16 0 0 0 1 0 0 1 1 0 0 1 0\n'
+                                '5 24 0 0 0 1 0 0 1 1 0 0 1 0\n'
+                                '1 16 0 0 0 2 0 0 0 2 0 0 0 2 c.dat\n',
+    os.path.join('p', 'c.dat'): '0 C\n'
+                                '3 2 0 0 0 1 0 0 0 0 1\n'
+                                '3 16 0 0 0 1 0 0 0 1 0\n',
+}
+
+
+@pytest.fixture
+def parts(tmp_path):
+    for name, content in FILES.items():
+        path = os.path.join(str(tmp_path), name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as part_file:
+            part_file.write(content)
+    return Parts(os.path.join(str(tmp_path), 'parts.lst'), cache=LRUPartCache())
+
+
+def test_mesh_flattened(parts):
+    meshes = MeshCache(parts)
+    mesh = meshes.get('a')
+
+    assert mesh.sizes.tolist() == [3, 4, 3, 3, 2]
+    assert mesh.colours.tolist() == [16, 4, 2, 4, 24]
+    # c.dat is scaled by 2 in b.dat, which is moved by 10 in a.dat
+    assert mesh.points[3, :3].tolist() == [[10, 0, 0], [12, 0, 0], [10, 2, 0]]
+    assert meshes.get('A') is mesh
+    assert meshes.get('c') is meshes.meshes['C']
+
+
+def test_mesh_placed(parts):
+    mesh = MeshCache(parts).get('c')
+    points = mesh.transformed(Identity().scale(1, 2, 3), Vector(1, 1, 1))
+
+    assert points[1, :3].tolist() == [[1, 1, 1], [2, 1, 1], [1, 3, 1]]
+    assert mesh.coloured(7).tolist() == [2, 7]
+
+
+def test_mesh_from_primitives():
+    mesh = Mesh.from_primitives([Triangle(Colour(16), Vector(0, 0, 0), Vector(1, 0, 0), Vector(0, 1, 0))])
+
+    assert len(mesh) == 1
+    assert numpy.array_equal(mesh.points[0, 3], [0, 0, 0])
+    assert mesh.coloured(Colour(code=3)).tolist() == [3]
@@ -0,0 +1,65 @@
+import os
+
+from mock import patch
+from mklist import generate
+
+from ldraw import partslst
+from ldraw.partslst import generate_parts_lst, read_rows, write_rows
+
+PART_FILES = {
+    '3001.dat': b'0 Brick  2 x  4\r\n0 Name: 3001.dat\r\n',
+    '3002.dat': b'0 Brick  2 x  3\n',
+    '3003.dat': b'0 Brick  2 x  2\r1 16 0 0 0 1 0 0 0 1 0 0 0 1 s\\3003s01.dat\r',
+    '3005.dat': b'0 ~Moved to 3001\n',
+    '3006.dat': b'0 Brick  2 x 10 \xe9\n',
+    '3007.dat': b'0 _Brick  2 x  4 with Pattern\n',
+    '3008.dat': b'0 ~Brick  2 x  4 without Studs\n',
+    '30000000000000000000000000000009.dat': b'0 Plate  1 x  1',
+    '3010.DAT': b'0 Not found by glob\n',
+    '.3011.dat': b'0 Hidden\n',
+    'notes.txt': b'0 Not a part\n',
+}
+
+
+def write_parts(parts_dir):
+    os.mkdir(parts_dir)
+    for name, content in PART_FILES.items():
+        with open(os.path.join(parts_dir, name), 'wb') as part_file:
+            part_file.write(content)
+
+
+def test_generate_parts_lst(tmp_path):
+    parts_dir = os.path.join(str(tmp_path), 'parts')
+    write_parts(parts_dir)
+    for mode in ('description', 'number'):
+        generate_parts_lst(mode, parts_dir, os.path.join(str(tmp_path), 'parts.lst'), jobs=3,
+                           cache_dir=os.path.join(str(tmp_path), 'cache'))
+        generate.generate_parts_lst(mode, parts_dir, os.path.join(str(tmp_path), 'mklist.lst'))
+        with open(os.path.join(str(tmp_path), 'parts.lst'), 'rb') as parts_lst, \
+                open(os.path.join(str(tmp_path), 'mklist.lst'), 'rb') as mklist_lst:
+            assert parts_lst.read() == mklist_lst.read()
+
+    rows = read_rows(os.path.join(str(tmp_path), 'parts.lst'))
+    write_rows(rows, os.path.join(str(tmp_path), 'rows.lst'))
+    with open(os.path.join(str(tmp_path), 'parts.lst'), 'rb') as parts_lst, \
+            open(os.path.join(str(tmp_path), 'rows.lst'), 'rb') as rows_lst:
+        assert parts_lst.read() == rows_lst.read()
+
+
+def test_generate_parts_lst_incremental(tmp_path):
+    parts_dir = os.path.join(str(tmp_path), 'parts')
+    write_parts(parts_dir)
+    cache_dir = os.path.join(str(tmp_path), 'cache')
+    parts_lst = os.path.join(str(tmp_path), 'parts.lst')
+    generate_parts_lst('description', parts_dir, parts_lst, cache_dir=cache_dir)
+
+    with open(os.path.join(parts_dir, '3002.dat'), 'w') as part_file:
+        part_file.write('0 Brick  2 x  3 Updated\n')
+    os.remove(os.path.join(parts_dir, '3007.dat'))
+    with patch.object(partslst, 'read_first_line', wraps=partslst.read_first_line) as read_mock:
+        generate_parts_lst('description', parts_dir, parts_lst, cache_dir=cache_dir)
+    read_mock.assert_called_once_with(os.path.join(parts_dir, '3002.dat'))
+
+    descriptions = [row['description'] for row in read_rows(parts_lst)]
+    assert 'Brick  2 x  3 Updated\n' in descriptions
+    assert '_Brick  2 x  4 with Pattern\n' not in descriptions
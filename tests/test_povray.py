@@ -0,0 +1,43 @@
+import os
+import tempfile
+from io import StringIO
+
+import mock
+import pytest
+
+from ldraw import CustomImporter
+from ldraw.cache import LRUPartCache
+from ldraw.config import Config
+from ldraw.parts import Part, Parts
+
+PARTS_LST = os.path.join('tests', 'test_ldraw2', 'parts.lst')
+
+
+@pytest.fixture
+def mocked_library():
+    library_path = tempfile.mkdtemp()
+    with mock.patch('ldraw.get_config', side_effect=lambda: Config({'parts.lst': PARTS_LST,
+                                                                    'library': library_path})):
+        yield library_path
+    CustomImporter.clean()
+
+
+def test_pov_failed_parts(mocked_library, tmp_path, capsys):
+    from ldraw.writers.povray import POVRayWriter
+    path = os.path.join(str(tmp_path), 'model.ldr')
+    with open(path, 'w') as model_file:
+        for _ in range(3):
+            model_file.write('1 4 0 0 0 1 0 0 0 1 0 0 0 1 9999.dat\n')
+            model_file.write('1 4 0 0 0 1 0 0 0 1 0 0 0 1 3002.dat\n')
+    parts = Parts(PARTS_LST, cache=LRUPartCache(), headers=None)
+    writer = POVRayWriter(parts, StringIO())
+
+    with mock.patch.object(parts, 'part', wraps=parts.part) as part:
+        writer.write(Part(path))
+
+    # the missing part is only looked up and reported once
+    assert [call[1]['code'] for call in part.call_args_list].count('9999') == 1
+    reported = capsys.readouterr().err.splitlines()
+    assert 'Part not found: 9999' in reported
+    assert len(reported) == len(set(reported))
+    assert writer.pov_file.getvalue().count('#declare part3002') == 1
@@ -0,0 +1,62 @@
+import numpy
+
+from ldraw.writers.raster import Polygons, Raster, draw_tiles, tiles
+
+
+def square(z, size=0.5, rgb=(255, 0, 0), alpha=1.0):
+    points = numpy.array([[[-size, -size, z], [size, -size, z], [size, size, z], [-size, size, z]]])
+    return Polygons(points, numpy.array([4], dtype=numpy.int8),
+                    numpy.array([rgb]), numpy.array([alpha]))
+
+
+def test_raster_background():
+    raster = Raster(4, 3, (1, 2, 3))
+    image = numpy.asarray(raster.image())
+
+    assert image.shape == (3, 4, 4)
+    assert (image == (1, 2, 3, 255)).all()
+
+
+def test_raster_depth():
+    near = square(-2.0, rgb=(0, 255, 0))
+    far = square(-4.0, size=1.6)
+    for order in ([near, far], [far, near]):
+        raster = Raster(20, 20, (0, 0, 0))
+        raster.draw(Polygons.concatenate(order), 1.0)
+        image = numpy.asarray(raster.image())
+
+        assert tuple(image[10, 10]) == (0, 255, 0, 255)
+        assert tuple(image[10, 1]) == (0, 0, 0, 255)
+        assert tuple(image[10, 4]) == (255, 0, 0, 255)
+
+
+def test_raster_translucent_and_stroke():
+    polygons = Polygons.concatenate([square(-2.0, rgb=(0, 0, 255), alpha=0.5),
+                                     square(-4.0, size=1.6)])
+    raster = Raster(20, 20, (0, 0, 0))
+    raster.draw(polygons, 1.0, (255, 255, 255, 255))
+    image = numpy.asarray(raster.image())
+
+    assert tuple(image[10, 10]) == (127, 0, 127, 255)
+    assert tuple(image[10, 13]) == (255, 255, 255, 255)
+    assert tuple(image[10, 0]) == (0, 0, 0, 255)
+
+
+def test_raster_tiles():
+    assert tiles(0, 10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert tiles(0, 2, 8) == [(0, 1), (1, 2)]
+
+    random = numpy.random.RandomState(0)
+    count = 200
+    points = random.uniform(-1, 1, (count, 4, 3))
+    points[..., 2] = random.uniform(-6, -2, (count, 1))
+    polygons = Polygons(points, random.randint(3, 5, count).astype(numpy.int8),
+                        random.randint(0, 256, (count, 3)), random.choice([1.0, 0.5], count))
+
+    expected = Raster(40, 30, (0, 0, 0))
+    expected.draw(polygons, 1.0, (255, 255, 255, 255))
+    raster = Raster(40, 30, (0, 0, 0))
+    draw_tiles(raster, polygons, 1.0, (255, 255, 255, 255), jobs=2)
+
+    assert (raster.colour == expected.colour).all()
+    assert (raster.depth == expected.depth).all()
@@ -0,0 +1,56 @@
+import json
+import os
+
+from ldraw.cache import HeaderIndex
+from ldraw.parts import Parts
+from ldraw.search import SearchIndex, words
+
+ENTRIES = [
+    ('3001', 'Brick  2 x  4', ('bricks', 'classic')),
+    ('3003', 'Brick  2 x  2', ()),
+    ('3004', 'Brick  1 x  2', ()),
+    ('2454', 'Brick  1 x  2 x  5', ()),
+    ('973', 'Torso', ('Minifig torso',)),
+    ('3626', 'Head', ('face',)),
+]
+
+
+def test_words():
+    assert words('Brick  2x4, ~Moved') == ['brick', '2', 'x', '4', 'moved']
+
+
+def test_search():
+    index = SearchIndex.build(ENTRIES)
+
+    assert index.search('brick 2 x 4') == [('3001', 'Brick  2 x  4')]
+    assert index.search('2x4 BRICK') == [('3001', 'Brick  2 x  4')]
+    assert index.search('brick 1 x 2') == [('3004', 'Brick  1 x  2'), ('2454', 'Brick  1 x  2 x  5')]
+    assert index.search('brick 2', limit=2) == [('3003', 'Brick  2 x  2'), ('3001', 'Brick  2 x  4')]
+    assert index.search('tor') == [('973', 'Torso')]
+    assert index.search('minifig') == [('973', 'Torso')]
+    assert index.search('classic brick') == [('3001', 'Brick  2 x  4')]
+    assert index.search('he') == [('3626', 'Head')]
+    assert index.search('brick 3') == []
+    assert index.search('') == []
+
+
+def test_search_description_first():
+    index = SearchIndex.build(ENTRIES + [('3068', 'Tile  2 x  2', ('brick',))])
+
+    assert [code for code, _ in index.search('brick 2 x 2')] == ['3003', '3001', '3004', '2454', '3068']
+
+
+def test_search_index_roundtrip():
+    index = SearchIndex.build(ENTRIES)
+    loaded = SearchIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+
+    assert loaded.search('brick') == index.search('brick')
+
+
+def test_parts_search(tmp_path):
+    headers = HeaderIndex(os.path.join(str(tmp_path), 'headers'))
+    parts = Parts('tests/test_ldraw/parts.lst', headers=headers)
+
+    assert parts.search('brick 2x4') == [('3001', 'Brick  2 x  4')]
+    assert headers.load('tests/test_ldraw/parts.lst', 'search') is not None
+    assert Parts('tests/test_ldraw/parts.lst', headers=headers).search('bri') == [('3001', 'Brick  2 x  4')]
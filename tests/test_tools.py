@@ -1,7 +1,10 @@
+import os
 import shutil
 import tempfile
 
-from PIL import ImageColor
+import numpy
+from mock import patch
+from PIL import Image, ImageColor
 
 from ldraw.tools import widthxheight, vector_position
 from ldraw.writers.png import PNGArgs
@@ -31,13 +34,21 @@ def test_ldr2inv(mocked_parts_lst):
     tool_test(lambda f: ldr2inv(INPUT_PATH, f), '.inv')
 
 
-def test_ldr2png(mocked_parts_lst):
+def test_ldr2png(mocked_parts_lst, tmp_path):
     from ldraw.tools.ldr2png import ldr2png
-    tool_test(lambda f: ldr2png(INPUT_PATH, f,
-                                vector_position('0,0,0'),
-                                vector_position('200,200,200'),
-                                PNGArgs(1, widthxheight('200x200'), ImageColor.getrgb('#FF0000'), ImageColor.getrgb('#123456'))),
-              '.png')
+    path = os.path.join(str(tmp_path), 'car.png')
+    ldr2png(INPUT_PATH, path,
+            vector_position('0,0,0'),
+            vector_position('200,200,200'),
+            PNGArgs(1, widthxheight('200x200'), ImageColor.getrgb('#FF0000'), ImageColor.getrgb('#123456')))
+
+    content = numpy.asarray(Image.open(path), dtype=int)
+    expected = numpy.asarray(Image.open('tests/test_data/car.png'), dtype=int)
+    assert content.shape == expected.shape
+    # the points are transformed in batches, their coordinates can differ from the expected
+    # image by about 1e-13: the edges lying exactly on pixel boundaries can move by a pixel,
+    # about 0.25% of the pixels of this model
+    assert (numpy.abs(content - expected).max(axis=2) > 8).mean() < 0.005
 
 
 def test_ldr2pov(mocked_parts_lst):
@@ -56,3 +67,25 @@ def test_ldr2svg(mocked_parts_lst):
                                 vector_position('0,0,0'),
                                 SVGArgs(800, 800, background_colour=ImageColor.getrgb('#123456'))),
               '.svg')
+
+
+def test_ldr2svg_sort_runs(mocked_parts_lst, tmp_path):
+    from ldraw.tools.ldr2svg import ldr2svg
+    from ldraw.writers import svg
+
+    def render(path):
+        ldr2svg(INPUT_PATH, path,
+                vector_position('100,100,100'),
+                vector_position('0,0,0'),
+                SVGArgs(800, 800, background_colour=ImageColor.getrgb('#123456')))
+        with open(path, 'rb') as svg_file:
+            return svg_file.read()
+
+    in_memory = render(os.path.join(str(tmp_path), 'memory.svg'))
+    with patch('ldraw.writers.svg.SORT_RUN_SIZE', 100), \
+            patch('ldraw.writers.svg._write_run', wraps=svg._write_run) as write_run:
+        in_runs = render(os.path.join(str(tmp_path), 'runs.svg'))
+
+    # the polygons were sorted by merging several runs written to temporary files
+    assert write_run.call_count > 1
+    assert in_runs == in_memory
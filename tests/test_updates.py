@@ -0,0 +1,118 @@
+import os
+import shutil
+import zipfile
+
+import pytest
+from mklist.generate import generate_parts_lst
+
+from ldraw.archive import ARCHIVE_NAME, write_parts_lst, LibraryArchive
+from ldraw.cache import HeaderIndex, LRUPartCache
+from ldraw.parts import Parts
+from ldraw.updates import list_updates, record_level, update, update_level
+
+NEW_PART = '0 Brick  1 x  2\n0 Name: 3004.dat\n0 !CATEGORY Brick\n'
+CHANGED_PART = '0 Brick  2 x  4 Updated\n0 Name: 3001.dat\n0 !CATEGORY Brick\n'
+
+
+def write_update(updates_dir, level, files):
+    with zipfile.ZipFile(os.path.join(updates_dir, 'lcad%s.zip' % level), 'w') as archive:
+        archive.writestr('ldraw/models/Note%sCA.txt' % level, 'update %s\n' % level)
+        for name, content in files.items():
+            archive.writestr('ldraw/' + name, content)
+
+
+@pytest.fixture
+def updates_dir(tmp_path):
+    updates_dir = os.path.join(str(tmp_path), 'updates')
+    os.mkdir(updates_dir)
+    # older than the library, not applied
+    write_update(updates_dir, '1801', {'parts/3001.dat': '0 Old\n'})
+    write_update(updates_dir, '1902', {'parts/3004.dat': NEW_PART})
+    write_update(updates_dir, '1903', {'parts/3001.dat': CHANGED_PART})
+    with open(os.path.join(updates_dir, 'readme.txt'), 'w') as readme:
+        readme.write('not an update')
+    return updates_dir
+
+
+def test_list_updates(updates_dir):
+    assert sorted(list_updates(updates_dir)) == ['1801', '1902', '1903']
+
+
+def test_update(updates_dir, tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree('tests/test_ldraw', library)
+    record_level(library, '1901')
+    parts_lst = os.path.join(library, 'parts.lst')
+    headers = HeaderIndex(os.path.join(str(tmp_path), 'headers'))
+    Parts(parts_lst, cache=LRUPartCache(), headers=headers)
+
+    assert update(library, updates_dir, headers) == ['1902', '1903']
+    assert update_level(library) == '1903'
+    assert update(library, updates_dir, headers) == []
+
+    generate_parts_lst('description', os.path.join(library, 'parts'),
+                       os.path.join(str(tmp_path), 'mklist.lst'))
+    with open(parts_lst, 'rb') as updated, open(os.path.join(str(tmp_path), 'mklist.lst'), 'rb') as mklist:
+        assert updated.read() == mklist.read()
+    # the categories of the changed parts are read again
+    assert headers.load(parts_lst) == {}
+
+    parts = Parts(parts_lst, cache=LRUPartCache(), headers=headers)
+    assert parts.parts_by_code['3004'] == 'Brick  1 x  2'
+    assert parts.parts_by_code['3001'] == 'Brick  2 x  4 Updated'
+    assert headers.load(parts_lst) == {'3001': 'Brick', '3004': 'Brick'}
+
+
+def test_update_archive(updates_dir, tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    os.mkdir(library)
+    with zipfile.ZipFile(os.path.join(library, ARCHIVE_NAME), 'w') as archive:
+        for name in ('parts/3001.dat', 'parts/s/3001s01.dat', 'p/stud.dat', 'LDConfig.ldr'):
+            archive.write(os.path.join('tests/test_ldraw', name), 'ldraw/' + name)
+        archive.writestr('ldraw/models/Note1901CA.txt', 'update 1901\n')
+    parts_lst = os.path.join(library, 'parts.lst')
+    with LibraryArchive(os.path.join(library, ARCHIVE_NAME)) as archive:
+        write_parts_lst(archive, parts_lst)
+
+    assert update(library, updates_dir, headers=None) == ['1902', '1903']
+
+    parts = Parts(parts_lst, cache=LRUPartCache(), headers=None)
+    assert sorted(parts.parts_by_code) == ['3001', '3004']
+    assert parts.part(code='3001').path == os.path.join(library, 'parts', '3001.dat')
+    assert parts.part(code='3001').description == 'Brick 2 x 4 Updated'
+    assert parts.part(code='s\\3001s01').path == \
+           os.path.join(library, ARCHIVE_NAME, 'parts', 's', '3001s01.dat')
+    assert parts.colours_by_code
+
+
+def test_update_failed(updates_dir, tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree('tests/test_ldraw', library)
+    record_level(library, '1901')
+    parts_lst = os.path.join(library, 'parts.lst')
+    good_update = os.path.join(updates_dir, 'lcad1903.zip')
+    shutil.move(good_update, good_update + '.bak')
+    with open(good_update, 'wb') as broken:
+        broken.write(b'not a zip archive')
+
+    with pytest.raises(zipfile.BadZipFile):
+        update(library, updates_dir, headers=None)
+    # the update before the broken one is applied, and in the parts.lst
+    assert update_level(library) == '1902'
+    assert Parts(parts_lst, cache=LRUPartCache(), headers=None).parts_by_code['3004'] == 'Brick  1 x  2'
+
+    os.replace(good_update + '.bak', good_update)
+    assert update(library, updates_dir, headers=None) == ['1903']
+    parts = Parts(parts_lst, cache=LRUPartCache(), headers=None)
+    assert parts.parts_by_code['3001'] == 'Brick  2 x  4 Updated'
+
+
+def test_update_unknown_level(updates_dir, tmp_path):
+    library = os.path.join(str(tmp_path), 'ldraw')
+    shutil.copytree('tests/test_ldraw', library)
+    assert update_level(library) is None
+
+    with pytest.raises(ValueError):
+        update(library, updates_dir, headers=None)
+    assert update(library, updates_dir, headers=None, since='1902') == ['1903']
+    assert update_level(library) == '1903'
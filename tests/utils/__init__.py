@@ -5,6 +5,7 @@ import mock
 import pytest
 
 from ldraw import download
+from ldraw.config import Config
 
 
 @pytest.fixture
@@ -13,5 +14,5 @@ def mocked_parts_lst(tmp_path):
     parts_lst_path = os.path.join(output_dir, 'parts.lst')
     library_path = tempfile.mkdtemp()
     download(parts_lst_path)
-    with mock.patch('ldraw.get_config', side_effect=lambda: {'parts.lst': parts_lst_path, 'library': library_path}):
+    with mock.patch('ldraw.get_config', side_effect=lambda: Config({'parts.lst': parts_lst_path, 'library': library_path})):
         yield parts_lst_path